@@ -56,6 +56,8 @@ def create_app():
     from app.routes.appointments import appointments_bp
     from app.routes.availability import availability_bp
     from app.routes.blocked_dates import blocked_dates_bp
+    from app.routes.resources import resources_bp
+    from app.routes.waitlist import waitlist_bp
     from app.routes.ai import ai_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -63,8 +65,20 @@ def create_app():
     app.register_blueprint(appointments_bp, url_prefix='/api/appointments')
     app.register_blueprint(availability_bp, url_prefix='/api/availability')
     app.register_blueprint(blocked_dates_bp, url_prefix='/api/blocked-dates')
+    app.register_blueprint(resources_bp, url_prefix='/api/resources')
+    app.register_blueprint(waitlist_bp, url_prefix='/api/waitlist')
     app.register_blueprint(ai_bp, url_prefix='/api/ai')
 
+    # Slot cache (optional warm-up needs the blueprints' helpers)
+    from app.slot_cache import init_slot_cache
+    init_slot_cache(app)
+
+    from app.service_catalog import init_service_catalog
+    init_service_catalog(app)
+
+    from app.events import init_event_broker
+    init_event_broker(app)
+
     # Health check endpoint
     @app.route('/api/health', methods=['GET'])
     def health_check():
@@ -85,6 +99,7 @@ def create_app():
                 'appointments': '/api/appointments',
                 'availability': '/api/availability',
                 'blocked_dates': '/api/blocked-dates',
+                'resources': '/api/resources',
                 'ai': '/api/ai'
             }
         }), 200
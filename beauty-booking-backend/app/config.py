@@ -44,8 +44,43 @@ class Config:
     BUSINESS_HOURS_END = os.getenv('BUSINESS_HOURS_END', '18:00')
     APPOINTMENT_SLOT_DURATION = int(os.getenv('APPOINTMENT_SLOT_DURATION', 30))
 
+    # Slot Cache Configuration
+    SLOT_CACHE_ENABLED = os.getenv('SLOT_CACHE_ENABLED', 'True').lower() == 'true'
+    SLOT_CACHE_MAX_ENTRIES = int(os.getenv('SLOT_CACHE_MAX_ENTRIES', 2048))
+    SLOT_CACHE_TTL = int(os.getenv('SLOT_CACHE_TTL', 300))  # seconds
+    SLOT_CACHE_WARMUP_DAYS = int(os.getenv('SLOT_CACHE_WARMUP_DAYS', 0))  # 0 disables warm-up
+
+    # Service catalog cache (encoded GET /api/services bodies)
+    SERVICE_CATALOG_ENABLED = os.getenv('SERVICE_CATALOG_ENABLED', 'True').lower() == 'true'
+    SERVICE_CATALOG_TTL = int(os.getenv('SERVICE_CATALOG_TTL', 300))  # seconds before other workers see a change
+
+    # Admin event stream
+    EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', 256))  # events queued per connected stream
+    EVENTS_HISTORY_SIZE = int(os.getenv('EVENTS_HISTORY_SIZE', 1000))  # events kept for Last-Event-ID resume
+    EVENTS_KEEPALIVE = int(os.getenv('EVENTS_KEEPALIVE', 15))  # seconds between keepalive comments
+    EVENTS_TOKEN_MAX_AGE = int(os.getenv('EVENTS_TOKEN_MAX_AGE', 60))  # seconds a stream token can open a stream
+
+    # Slot Holds
+    SLOT_HOLD_TTL = int(os.getenv('SLOT_HOLD_TTL', 300))  # seconds a checkout hold reserves a slot
+
+    # Idempotency keys
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))  # seconds a response is replayed to retries
+    IDEMPOTENCY_WAIT_TIMEOUT = int(os.getenv('IDEMPOTENCY_WAIT_TIMEOUT', 10))  # seconds a retry waits for the first request
+    IDEMPOTENCY_CLAIM_TIMEOUT = int(os.getenv('IDEMPOTENCY_CLAIM_TIMEOUT', 60))  # seconds before a claim without a response is stale
+
+    # Waitlist
+    WAITLIST_OFFER_TTL = int(os.getenv('WAITLIST_OFFER_TTL', 1800))  # seconds a freed slot is held for the offered client
+
+    # Archive of closed appointments (flask archive-appointments)
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))  # closed appointments older than this are archived
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 5000))  # rows moved per transaction
+
+    # Next-available search horizon (days)
+    NEXT_AVAILABLE_MAX_DAYS = int(os.getenv('NEXT_AVAILABLE_MAX_DAYS', 90))
+
     # Pagination
     ITEMS_PER_PAGE = 20
+    MAX_ITEMS_PER_PAGE = 100
 
     # File Upload (for future use)
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
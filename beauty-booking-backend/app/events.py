@@ -0,0 +1,218 @@
+"""
+Change Events
+In-process pub/sub feeding the admin server-sent events stream
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Keeps stream tokens from being valid anywhere else the secret key signs data
+STREAM_TOKEN_SALT = 'appointment-events'
+
+
+class Subscriber:
+    """
+    One connected stream with a bounded buffer
+
+    When the buffer is full the oldest events are dropped and the next read
+    starts with a 'resync' event, telling the client to refetch instead of
+    trusting an incomplete sequence.
+    """
+
+    def __init__(self, buffer_size):
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self.lagged = False
+
+    def push(self, event):
+        """Queue an event, dropping the oldest one when the buffer is full"""
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self.lagged = True
+            self._events.append(event)
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """
+        Wait for queued events
+        Returns: list of (id, type, data) events, empty after the timeout
+        """
+        with self._condition:
+            if not self._events and not self.lagged:
+                self._condition.wait(timeout)
+
+            events = list(self._events)
+            self._events.clear()
+            if self.lagged:
+                self.lagged = False
+                events.insert(0, (None, 'resync', {}))
+            return events
+
+
+class EventBroker:
+    """
+    Fan-out of change events to subscribers, with a short replay history
+
+    Event ids are '<process epoch>:<sequence>'. A subscriber resuming from an
+    id that is no longer in the history (or from another process or restart)
+    is sent 'resync' first. The broker is per process; with several workers
+    each stream only sees the writes handled by its own worker.
+    """
+
+    def __init__(self, buffer_size=256, history_size=1000):
+        self.buffer_size = buffer_size
+        self._epoch = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def configure(self, buffer_size=None, history_size=None):
+        """Apply settings from the app config"""
+        with self._lock:
+            if buffer_size is not None:
+                self.buffer_size = buffer_size
+            if history_size is not None:
+                self._history = deque(self._history, maxlen=history_size)
+
+    def publish(self, event_type, data):
+        """
+        Send an event to every subscriber
+        Call after the write commits so rolled back changes are never announced
+        Args:
+            event_type: e.g. 'appointment.created'
+            data: JSON-serializable payload
+        """
+        with self._lock:
+            self._sequence += 1
+            event = (f'{self._epoch}:{self._sequence}', event_type, data)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            subscriber.push(event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a subscriber, replaying the history after last_event_id
+        Returns: Subscriber
+        """
+        subscriber = Subscriber(self.buffer_size)
+        with self._lock:
+            if last_event_id:
+                missed = self._events_after(last_event_id)
+                if missed is None:
+                    subscriber.lagged = True
+                else:
+                    for event in missed:
+                        subscriber.push(event)
+            self._subscribers.add(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        """Get broker counters"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'last_event_id': f'{self._epoch}:{self._sequence}',
+                'history': len(self._history),
+                'buffer_size': self.buffer_size
+            }
+
+    def _events_after(self, last_event_id):
+        """
+        History events newer than last_event_id (caller holds the lock)
+        Returns: list of events, or None when the id cannot be resumed from
+        """
+        epoch, _, sequence = str(last_event_id).partition(':')
+        if epoch != self._epoch or not sequence.isdigit():
+            return None
+
+        sequence = int(sequence)
+        if sequence >= self._sequence:
+            return []
+
+        oldest = int(self._history[0][0].split(':')[1]) if self._history else self._sequence + 1
+        if sequence < oldest - 1:
+            return None
+
+        return [event for event in self._history if int(event[0].split(':')[1]) > sequence]
+
+
+event_broker = EventBroker()
+
+
+def init_event_broker(app):
+    """Configure the event broker from app config"""
+    event_broker.configure(
+        buffer_size=app.config.get('EVENTS_BUFFER_SIZE'),
+        history_size=app.config.get('EVENTS_HISTORY_SIZE')
+    )
+
+
+def stream_token_serializer():
+    """Serializer signing stream tokens with the app secret key"""
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=STREAM_TOKEN_SALT)
+
+
+def create_stream_token(user_id):
+    """
+    Issue a token that only opens the event stream
+    EventSource cannot send an Authorization header, so the token travels in
+    the URL; unlike the access token it expires within EVENTS_TOKEN_MAX_AGE
+    seconds and is refused by every other endpoint
+    Returns: token string
+    """
+    return stream_token_serializer().dumps(str(user_id))
+
+
+def load_stream_token(token):
+    """
+    Check a stream token
+    Returns: user id, or None when the token is invalid or expired
+    """
+    try:
+        return stream_token_serializer().loads(token, max_age=current_app.config.get('EVENTS_TOKEN_MAX_AGE', 60))
+    except BadSignature:
+        return None
+
+
+def format_event(event):
+    """
+    Encode an event in the text/event-stream format
+    Returns: str
+    """
+    event_id, event_type, data = event
+    lines = [f'id: {event_id}'] if event_id else []
+    lines.append(f'event: {event_type}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_events(subscriber, keepalive):
+    """
+    Generate the text/event-stream body for a subscriber until the client disconnects
+    Args:
+        subscriber: Subscriber from event_broker.subscribe()
+        keepalive: seconds between comment lines that keep proxies from closing the connection
+    """
+    try:
+        yield f'retry: 3000\n: connected {time.time():.0f}\n\n'
+        while True:
+            events = subscriber.wait(keepalive)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            yield ''.join(format_event(event) for event in events)
+    finally:
+        event_broker.unsubscribe(subscriber)
@@ -0,0 +1,270 @@
+"""
+Idempotency Keys
+Replays the stored response to retried create requests instead of running them again
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+from flask import g, request, jsonify, current_app
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError
+from app.models import db, IdempotencyKey
+from app.utils import get_datetime_now
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Seconds between checks while a concurrent request with the same key stores its response
+RESPONSE_POLL_INTERVAL = 0.05
+
+
+def idempotency_scope():
+    """
+    Scope a key to the endpoint and, when a token was sent, to the user
+    Returns: scope string
+    """
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    scope = f'{request.method} {request.path}'
+    return f'{scope} user:{identity}' if identity else scope
+
+
+def advisory_lock_id(scope, key):
+    """Map a scoped key to the signed 64-bit id of a Postgres advisory lock"""
+    digest = hashlib.sha256(f'{scope}\n{key}'.encode()).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
+
+
+def replay(stored, restore=None):
+    """Build the response stored for a key, marked as replayed"""
+    body = stored.response_body
+    if restore is not None:
+        body = current_app.json.dumps(restore(json.loads(body)))
+    response = current_app.response_class(body, status=stored.status_code, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def in_progress():
+    """Error response for a key whose first request has not finished in time (retry later)"""
+    response = jsonify({
+        'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress',
+        'code': 'idempotency_key_in_progress'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 425
+
+
+def unresolved():
+    """
+    Error response for a stale claim: the first request committed its work
+    but its worker stopped before storing the response
+    """
+    return jsonify({
+        'error': f'The first request with this {IDEMPOTENCY_HEADER} did not finish; check its result before sending a new request',
+        'code': 'idempotency_key_unresolved'
+    }), 409
+
+
+def is_stale_claim(stored, now):
+    """Check whether a claim outlived IDEMPOTENCY_CLAIM_TIMEOUT without a response"""
+    timeout = timedelta(seconds=current_app.config['IDEMPOTENCY_CLAIM_TIMEOUT'])
+    return stored.status_code is None and stored.created_at + timeout <= now
+
+
+def load_stored_response(scope, key, request_hash, restore=None):
+    """
+    Look up the unexpired response stored for a key
+    Returns: (response or None, error response or None); a key whose first
+    request is still in progress has no response yet
+    """
+    now = get_datetime_now()
+    stored = db.session.get(IdempotencyKey, (scope, key), populate_existing=True)
+    if stored is None or stored.is_expired(now):
+        return None, None
+
+    if stored.request_hash != request_hash:
+        return None, (jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422)
+
+    if stored.status_code is None:
+        return None, unresolved() if is_stale_claim(stored, now) else None
+
+    return replay(stored, restore), None
+
+
+def lock_key(scope, key, deadline):
+    """
+    Take the key's advisory lock in the request's own transaction
+    Only the wait for this lock is bounded by the deadline; lock waits of
+    the handler keep the server's lock_timeout
+    Returns: True once locked, False when the deadline passed first
+    """
+    timeout_ms = max(int((deadline - time.monotonic()) * 1000), 1)
+    previous = db.session.execute(text("SELECT current_setting('lock_timeout')")).scalar()
+    db.session.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {'timeout': f'{timeout_ms}ms'})
+    try:
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:lock_id)'), {'lock_id': advisory_lock_id(scope, key)})
+    except OperationalError:
+        db.session.rollback()
+        return False
+
+    db.session.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {'timeout': previous})
+    return True
+
+
+def wait_for_response(scope, key, request_hash, deadline, restore=None):
+    """
+    Wait for a request that committed its work with this key to store its response
+    Returns: (response or None, error response or None); neither when the
+    key is free to run
+    """
+    while True:
+        now = get_datetime_now()
+        stored = db.session.get(IdempotencyKey, (scope, key), populate_existing=True)
+        if stored is None or stored.is_expired(now):
+            return None, None
+
+        if stored.request_hash != request_hash:
+            return None, (jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'}), 422)
+
+        if stored.status_code is not None:
+            return replay(stored, restore), None
+
+        if is_stale_claim(stored, now):
+            return None, unresolved()
+
+        if time.monotonic() >= deadline:
+            return None, in_progress()
+
+        time.sleep(RESPONSE_POLL_INTERVAL)
+
+
+def save_key(scope, key, request_hash, status_code=None, response_body=None):
+    """Write a key's row, replacing an expired one (a claim when status_code is None)"""
+    now = get_datetime_now()
+    values = {
+        'request_hash': request_hash,
+        'status_code': status_code,
+        'response_body': response_body,
+        'created_at': now,
+        'expires_at': now + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+    }
+    statement = insert(IdempotencyKey).values(scope=scope, key=key, **values)
+    db.session.execute(statement.on_conflict_do_update(index_elements=['scope', 'key'], set_=values))
+
+
+def store_response(scope, key, request_hash, response, redact=None):
+    """Save the first response for a key, without the fields redact removes"""
+    body = response.get_data(as_text=True)
+    if redact is not None:
+        body = current_app.json.dumps(redact(json.loads(body)))
+    save_key(scope, key, request_hash, response.status_code, body)
+    db.session.commit()
+
+
+def rollback_request():
+    """
+    Undo a request's writes before it answers with an error
+    In an idempotent request this rolls back to the savepoint taken after the
+    key was claimed, so the claim and its lock are held until the response
+    is stored and a queued duplicate replays it instead of running again
+    """
+    savepoint = g.pop('idempotency_savepoint', None)
+    # A failed flush deactivates the savepoint but leaves it open, waiting for this rollback
+    if savepoint is not None and db.session().get_nested_transaction() is savepoint:
+        savepoint.rollback()
+    else:
+        db.session.rollback()
+
+
+def release_claim(scope, key):
+    """Drop a claim whose request will not store a response, so a retry runs it again"""
+    try:
+        IdempotencyKey.query.filter_by(scope=scope, key=key, status_code=None).delete(synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Failed to release an idempotency key')
+
+
+def idempotent(fn=None, redact=None, restore=None):
+    """
+    Decorator making a create endpoint safe to retry with an Idempotency-Key header
+    Usage: @idempotent (below @jwt_required() on routes that need a user), or
+    @idempotent(redact=..., restore=...) to keep fields such as tokens out of
+    the stored body and rebuild them on replay
+    The first request with a key runs normally and its response (unless it
+    is a 5xx) is stored for IDEMPOTENCY_KEY_TTL seconds; retries get that
+    response back with an Idempotent-Replayed header. Requests with the same
+    key queue on a Postgres advisory lock held by the request's own
+    transaction, where the first one also claims the key: the claim commits
+    with the request's write, and rejected requests roll back only to a
+    savepoint (rollback_request), so duplicates never race, even across
+    workers. A retry waits (up to IDEMPOTENCY_WAIT_TIMEOUT seconds in all)
+    for the first request to finish and gets 425 when it has not. A claim
+    left without a response for IDEMPOTENCY_CLAIM_TIMEOUT seconds (its
+    worker died after committing) is answered with 409
+    idempotency_key_unresolved. Requests without the header are not affected
+    """
+    if fn is None:
+        return lambda view: idempotent(view, redact=redact, restore=restore)
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return fn(*args, **kwargs)
+
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        scope = idempotency_scope()
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        deadline = time.monotonic() + current_app.config['IDEMPOTENCY_WAIT_TIMEOUT']
+
+        # Retries after the first request finished are answered without taking the lock
+        stored, error = load_stored_response(scope, key, request_hash, restore)
+        if stored or error:
+            return stored or error
+
+        if not lock_key(scope, key, deadline):
+            return in_progress()
+
+        # The request we queued behind may have committed its work meanwhile
+        stored, error = wait_for_response(scope, key, request_hash, deadline, restore)
+        if stored or error:
+            db.session.rollback()
+            return stored or error
+
+        save_key(scope, key, request_hash)
+        g.idempotency_savepoint = db.session.begin_nested()
+        try:
+            response = current_app.make_response(fn(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            release_claim(scope, key)
+            raise
+
+        # Server errors are not stored, so a retry runs the request again
+        if response.status_code >= 500:
+            db.session.rollback()
+            release_claim(scope, key)
+            return response
+
+        try:
+            store_response(scope, key, request_hash, response, redact)
+        except Exception:
+            # The request itself succeeded; a retry will just run it again
+            db.session.rollback()
+            current_app.logger.exception('Failed to store the response for an idempotency key')
+            release_claim(scope, key)
+
+        return response
+
+    return wrapper
@@ -0,0 +1,293 @@
+"""
+Appointment Import
+Bulk-loads existing bookings (CSV or JSON) with batched conflict detection
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.postgresql import Range
+from app.models import db, Appointment, Service, User, Resource
+from app.occupancy import lock_days_occupancy
+from app.rollups import apply_rollup_changes
+from app.slot_engine import ACTIVE_STATUSES, BusySchedule, load_busy_schedules, time_to_minutes, format_minutes
+from app.utils import parse_date, parse_time
+from app.versions import bump_appointment_versions
+
+IMPORT_STATUSES = ('pending', 'confirmed', 'cancelled', 'completed')
+
+# Columns read from each row; a client is named by client_email or client_id and
+# a service by service_id or service_name
+IMPORT_FIELDS = [
+    'client_email', 'client_id', 'service_id', 'service_name', 'appointment_date',
+    'appointment_time', 'status', 'notes', 'resource_id'
+]
+
+
+class ImportFormatError(ValueError):
+    """Raised when an import file cannot be parsed at all"""
+
+
+def parse_import_file(content, file_format):
+    """
+    Parse the rows of an import file
+    Args:
+        content: file contents as text
+        file_format: 'csv' or 'json' (a JSON list of objects, or {"appointments": [...]})
+    Returns: list of dicts
+    """
+    if file_format == 'csv':
+        return [dict(row) for row in csv.DictReader(io.StringIO(content))]
+
+    if file_format == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise ImportFormatError(f'Invalid JSON: {e}')
+        if isinstance(data, dict):
+            data = data.get('appointments')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ImportFormatError('JSON must be a list of appointment objects')
+        return data
+
+    raise ImportFormatError('format must be csv or json')
+
+
+def resolve_references(rows):
+    """
+    Look up every client, service and resource named in the rows with one query each
+    Returns: (clients by email/id, services by id/lowercased name, resource ids)
+    """
+    # Emails are stored lowercased, so a plain IN can use the unique email index
+    emails = {str(row.get('client_email') or '').strip().lower() for row in rows} - {''}
+    names = {str(row.get('service_name') or '').strip().lower() for row in rows} - {''}
+
+    def uuids(field):
+        values = set()
+        for row in rows:
+            try:
+                values.add(uuid.UUID(str(row.get(field))))
+            except ValueError:
+                pass
+        return values
+
+    clients = {}
+    client_ids = uuids('client_id')
+    if emails or client_ids:
+        for user in User.query.filter(db.or_(User.email.in_(emails), User.id.in_(client_ids))).all():
+            clients[user.email.lower()] = user
+            clients[str(user.id)] = user
+
+    services = {}
+    service_ids = uuids('service_id')
+    if names or service_ids:
+        for service in Service.query.filter(db.or_(
+            func.lower(Service.name).in_(names), func.lower(Service.name_en).in_(names), Service.id.in_(service_ids)
+        )).all():
+            services[str(service.id)] = service
+            for name in (service.name, service.name_en):
+                if name:
+                    services.setdefault(name.lower(), service)
+
+    resource_ids = set()
+    requested_resource_ids = uuids('resource_id')
+    if requested_resource_ids:
+        resource_ids = {
+            str(resource_id)
+            for (resource_id,) in db.session.query(Resource.id).filter(Resource.id.in_(requested_resource_ids))
+        }
+
+    return clients, services, resource_ids
+
+
+def validate_row(row, clients, services, resource_ids):
+    """
+    Validate one row and resolve its references
+    Returns: (candidate dict or None, error message or None)
+    """
+    client = clients.get(str(row.get('client_email') or '').strip().lower()) or clients.get(str(row.get('client_id') or '').strip())
+    if not client:
+        return None, 'Client not found'
+
+    service = services.get(str(row.get('service_id') or '').strip()) or services.get(str(row.get('service_name') or '').strip().lower())
+    if not service:
+        return None, 'Service not found'
+
+    appointment_date = parse_date(str(row.get('appointment_date') or '').strip())
+    if not appointment_date:
+        return None, 'Invalid appointment_date. Use YYYY-MM-DD'
+
+    appointment_time = parse_time(str(row.get('appointment_time') or '').strip())
+    if not appointment_time:
+        return None, 'Invalid appointment_time. Use HH:MM'
+
+    status = str(row.get('status') or 'confirmed').strip().lower()
+    if status not in IMPORT_STATUSES:
+        return None, f'Invalid status. Must be one of: {", ".join(IMPORT_STATUSES)}'
+
+    resource_id = str(row.get('resource_id') or '').strip() or None
+    if resource_id and resource_id not in resource_ids:
+        return None, 'Resource not found'
+
+    start = time_to_minutes(appointment_time)
+    if start + service.duration > 24 * 60:
+        return None, 'Appointment must end on the same day'
+
+    notes = str(row.get('notes') or '').strip() or None
+
+    return {
+        'client_id': client.id,
+        'service': service,
+        'appointment_date': appointment_date,
+        'appointment_time': appointment_time,
+        'start': start,
+        'end': start + service.duration,
+        'status': status,
+        'notes': notes,
+        'resource_id': resource_id
+    }, None
+
+
+def find_batch_conflicts(candidates, schedules):
+    """
+    Reject active candidates that overlap existing bookings or each other
+    Per date, existing bookings are checked by bisection on the day's schedule,
+    then the batch is sorted by start once and swept with a running end per
+    resource lane (an interval without a resource occupies every lane)
+    Args:
+        candidates: list of (row number, candidate dict) with active status
+        schedules: dict of date -> BusySchedule of existing bookings
+    Returns: dict of row number -> error message
+    """
+    errors = {}
+    by_date = {}
+    for row_number, candidate in candidates:
+        by_date.setdefault(candidate['appointment_date'], []).append((row_number, candidate))
+
+    for appointment_date, day_candidates in by_date.items():
+        schedule = schedules.get(appointment_date, BusySchedule())
+        lane_schedules = {}
+
+        accepted = []
+        for row_number, candidate in day_candidates:
+            lane = candidate['resource_id']
+            if lane is None:
+                lane_schedule = schedule
+            else:
+                # Existing intervals on this resource or without a resource
+                if lane not in lane_schedules:
+                    lane_schedules[lane] = BusySchedule(
+                        interval for interval in schedule.intervals
+                        if len(interval) < 4 or interval[3] in (None, lane)
+                    )
+                lane_schedule = lane_schedules[lane]
+
+            conflict = lane_schedule.find_conflict(candidate['start'], candidate['end'])
+            if conflict:
+                errors[row_number] = f'Conflicts with an existing appointment at {format_minutes(conflict[0])}'
+            else:
+                accepted.append((row_number, candidate))
+
+        # Sweep the batch: earlier starts (then earlier rows) win
+        accepted.sort(key=lambda item: (item[1]['start'], item[0]))
+        lane_ends = {}
+        shared_end = (0, None)
+        any_end = (0, None)
+        for row_number, candidate in accepted:
+            lane = candidate['resource_id']
+            blocking = any_end if lane is None else max(lane_ends.get(lane, (0, None)), shared_end)
+            if candidate['start'] < blocking[0]:
+                errors[row_number] = f'Overlaps row {blocking[1]}'
+                continue
+
+            ends = (candidate['end'], row_number)
+            if lane is None:
+                shared_end = max(shared_end, ends)
+            else:
+                lane_ends[lane] = max(lane_ends.get(lane, (0, None)), ends)
+            any_end = max(any_end, ends)
+
+    return errors
+
+
+def import_appointments(rows, dry_run=False):
+    """
+    Validate and bulk insert appointments
+    Rows that fail validation or overlap are rejected; the rest are inserted
+    with one multi-row INSERT in a single transaction, along with their
+    occupancy and rollup updates
+    Args:
+        rows: list of dicts (see IMPORT_FIELDS)
+        dry_run: only validate, insert nothing
+    Returns: report dict with total_rows, imported and rejected [{row, error, data}]
+    """
+    clients, services, resource_ids = resolve_references(rows)
+
+    rejected = {}
+    candidates = []
+    for row_number, row in enumerate(rows, start=1):
+        candidate, error = validate_row(row, clients, services, resource_ids)
+        if error:
+            rejected[row_number] = error
+        else:
+            candidates.append((row_number, candidate))
+
+    # Lock the dates that gain active bookings so concurrent bookings wait for the import
+    active = [(row_number, candidate) for row_number, candidate in candidates if candidate['status'] in ACTIVE_STATUSES]
+    active_dates = sorted({candidate['appointment_date'] for _, candidate in active})
+    occupancies = lock_days_occupancy(active_dates)
+
+    schedules = load_busy_schedules(active_dates[0], active_dates[-1], include_holds=False) if active_dates else {}
+    rejected.update(find_batch_conflicts(active, schedules))
+
+    accepted = [(row_number, candidate) for row_number, candidate in candidates if row_number not in rejected]
+
+    if dry_run or not accepted:
+        db.session.rollback()
+    else:
+        now = datetime.utcnow()
+        values = []
+        for _, candidate in accepted:
+            starts_at = datetime.combine(candidate['appointment_date'], candidate['appointment_time'])
+            candidate['id'] = uuid.uuid4()
+            values.append({
+                'id': candidate['id'],
+                'client_id': candidate['client_id'],
+                'service_id': candidate['service'].id,
+                'resource_id': uuid.UUID(candidate['resource_id']) if candidate['resource_id'] else None,
+                'appointment_date': candidate['appointment_date'],
+                'appointment_time': candidate['appointment_time'],
+                'status': candidate['status'],
+                'notes': candidate['notes'],
+                'time_range': Range(starts_at, starts_at + timedelta(minutes=candidate['service'].duration), bounds='[)'),
+                'created_at': now
+            })
+        db.session.execute(insert(Appointment), values)
+
+        for _, candidate in accepted:
+            if candidate['status'] in ACTIVE_STATUSES:
+                occupancy = occupancies[candidate['appointment_date']]
+                occupancy.intervals = sorted(occupancy.intervals + [
+                    [candidate['start'], candidate['end'], str(candidate['id']), candidate['resource_id']]
+                ])
+
+        apply_rollup_changes(
+            ((candidate['appointment_date'], candidate['service'].id, candidate['status']), 1)
+            for _, candidate in accepted
+        )
+        bump_appointment_versions({candidate['client_id'] for _, candidate in accepted})
+        db.session.commit()
+
+    return {
+        'total_rows': len(rows),
+        'imported': 0 if dry_run else len(accepted),
+        'valid': len(accepted),
+        'dry_run': dry_run,
+        'dates': [active_date.isoformat() for active_date in active_dates] if accepted and not dry_run else [],
+        'rejected': [
+            {'row': row_number, 'error': rejected[row_number], 'data': rows[row_number - 1]}
+            for row_number in sorted(rejected)
+        ]
+    }
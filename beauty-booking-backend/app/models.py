@@ -3,13 +3,19 @@ Database Models
 Defines all database tables and relationships using SQLAlchemy ORM
 """
 import uuid
-from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSRANGE, ExcludeConstraint, Range
+from sqlalchemy.orm import joinedload
 from flask_sqlalchemy import SQLAlchemy
 import bcrypt
 
 db = SQLAlchemy()
 
+# Stand-in resource id so unassigned appointments still exclude each other. The
+# constraint only covers overlap in the same lane: a booking without a resource
+# against one on a resource is checked by the app under the day occupancy lock
+NO_RESOURCE_ID = '00000000-0000-0000-0000-000000000000'
+
 
 class User(db.Model):
     """User model for authentication and profile management"""
@@ -106,6 +112,41 @@ class Service(db.Model):
         return f'<Service {self.name}>'
 
 
+# Services each resource can perform (a resource without rows performs every service)
+resource_services = db.Table(
+    'resource_services',
+    db.Column('resource_id', UUID(as_uuid=True), db.ForeignKey('resources.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('service_id', UUID(as_uuid=True), db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+)
+
+
+class Resource(db.Model):
+    """Resource model for staff members and chairs that perform services in parallel"""
+    __tablename__ = 'resources'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = db.Column(db.String(100), nullable=False)
+    active = db.Column(db.Boolean, default=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    services = db.relationship('Service', secondary=resource_services, lazy='selectin')
+    appointments = db.relationship('Appointment', backref='resource', lazy='dynamic')
+
+    def to_dict(self):
+        """Convert resource object to dictionary"""
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            'active': self.active,
+            'service_ids': [str(service.id) for service in self.services],
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<Resource {self.name}>'
+
+
 class Appointment(db.Model):
     """Appointment model for booking management"""
     __tablename__ = 'appointments'
@@ -113,7 +154,11 @@ class Appointment(db.Model):
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     client_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     service_id = db.Column(UUID(as_uuid=True), db.ForeignKey('services.id'), nullable=False)
-    appointment_date = db.Column(db.Date, nullable=False, index=True)
+    # Staff member/chair performing the appointment (None while the salon runs as a single resource)
+    resource_id = db.Column(UUID(as_uuid=True), db.ForeignKey('resources.id'), nullable=True)
+    # Shared by the occurrences of a recurring series (None for single bookings)
+    series_id = db.Column(UUID(as_uuid=True), nullable=True)
+    appointment_date = db.Column(db.Date, nullable=False)
     appointment_time = db.Column(db.Time, nullable=False)
     status = db.Column(
         db.Enum('pending', 'confirmed', 'cancelled', 'completed', name='appointment_status'),
@@ -121,14 +166,47 @@ class Appointment(db.Model):
         nullable=False
     )
     notes = db.Column(db.Text)
+    # Booked [start, end) timestamps; overlapping pending/confirmed ranges on the same
+    # resource are rejected by the database
+    time_range = db.Column(TSRANGE, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # Indexes for common queries
     __table_args__ = (
-        db.Index('idx_appointment_date_time', 'appointment_date', 'appointment_time'),
-        db.Index('idx_appointment_status', 'status'),
+        # Keyset pagination order (date, time, id); the client variant backs the per-client list
+        db.Index('idx_appointment_date_time_id', 'appointment_date', 'appointment_time', 'id'),
+        db.Index('idx_appointment_client_date_time_id', 'client_id', 'appointment_date', 'appointment_time', 'id'),
+        # Status filters over a date range (admin lists by status, bulk status filters) in page order
+        db.Index('idx_appointment_status_date_time_id', 'status', 'appointment_date', 'appointment_time', 'id'),
+        # Busy intervals of a date: only active rows, covering what the slot engine reads
+        db.Index(
+            'idx_appointment_active_date_time', 'appointment_date', 'appointment_time',
+            postgresql_include=['service_id', 'resource_id'],
+            postgresql_where=db.text("status IN ('pending', 'confirmed')")
+        ),
+        # Same-resource overlap only; see NO_RESOURCE_ID
+        ExcludeConstraint(
+            (db.func.coalesce(db.column('resource_id'), db.literal_column(f"'{NO_RESOURCE_ID}'::uuid")), '='),
+            ('time_range', '&&'),
+            name='no_overlapping_appointments',
+            using='gist',
+            where="status IN ('pending', 'confirmed')"
+        ),
     )
 
+    @classmethod
+    def query_with_relations(cls):
+        """
+        Query appointments with the client and service that to_dict serializes
+        joined into the same statement, so listing N rows takes one query instead of 1 + 2N
+        """
+        return cls.query.options(joinedload(cls.client), joinedload(cls.service))
+
+    def set_time_range(self, duration):
+        """Set the booked range from the appointment date, time and a duration in minutes"""
+        start = datetime.combine(self.appointment_date, self.appointment_time)
+        self.time_range = Range(start, start + timedelta(minutes=duration), bounds='[)')
+
     def to_dict(self, include_relations=True, lang='en'):
         """Convert appointment object to dictionary
 
@@ -140,6 +218,8 @@ class Appointment(db.Model):
             'id': str(self.id),
             'client_id': str(self.client_id),
             'service_id': str(self.service_id),
+            'resource_id': str(self.resource_id) if self.resource_id else None,
+            'series_id': str(self.series_id) if self.series_id else None,
             'appointment_date': self.appointment_date.isoformat() if self.appointment_date else None,
             'appointment_time': self.appointment_time.strftime('%H:%M') if self.appointment_time else None,
             'status': self.status,
@@ -165,6 +245,272 @@ class Appointment(db.Model):
         return f'<Appointment {self.id} - {self.appointment_date} {self.appointment_time}>'
 
 
+class ArchivedAppointment(db.Model):
+    """ArchivedAppointment model for closed appointments moved out of the hot table"""
+    __tablename__ = 'appointments_archive'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True)
+    # Same foreign keys as the hot table, so archiving never changes what a delete is allowed to remove
+    client_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
+    service_id = db.Column(UUID(as_uuid=True), db.ForeignKey('services.id'), nullable=False)
+    resource_id = db.Column(UUID(as_uuid=True), db.ForeignKey('resources.id'), nullable=True)
+    series_id = db.Column(UUID(as_uuid=True), nullable=True)
+    appointment_date = db.Column(db.Date, nullable=False)
+    appointment_time = db.Column(db.Time, nullable=False)
+    status = db.Column(
+        db.Enum('pending', 'confirmed', 'cancelled', 'completed', name='appointment_status'),
+        nullable=False
+    )
+    notes = db.Column(db.Text)
+    time_range = db.Column(TSRANGE, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Same page-order indexes as the hot table, so history pages merge both in index order
+    __table_args__ = (
+        db.Index('idx_appointment_archive_date_time_id', 'appointment_date', 'appointment_time', 'id'),
+        db.Index('idx_appointment_archive_client_date_time_id', 'client_id', 'appointment_date', 'appointment_time', 'id'),
+        db.Index('idx_appointment_archive_status_date_time_id', 'status', 'appointment_date', 'appointment_time', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<ArchivedAppointment {self.id} - {self.appointment_date} {self.appointment_time}>'
+
+
+# Columns readable across the hot table and the archive, in order
+HISTORY_COLUMNS = [
+    'id', 'client_id', 'service_id', 'resource_id', 'series_id', 'appointment_date', 'appointment_time',
+    'status', 'notes', 'created_at'
+]
+
+appointment_history = db.union_all(
+    db.select(*[Appointment.__table__.c[name] for name in HISTORY_COLUMNS]),
+    db.select(*[ArchivedAppointment.__table__.c[name] for name in HISTORY_COLUMNS])
+).subquery('appointment_history')
+
+
+class AppointmentHistory(db.Model):
+    """
+    Read-only mapping of appointments and appointments_archive as one UNION ALL
+    Filters and the (date, time, id) page order are pushed into both tables,
+    so a history page is a merge of two index scans
+    """
+    __table__ = appointment_history
+    __mapper_args__ = {'primary_key': [appointment_history.c.id]}
+
+    client = db.relationship('User', primaryjoin='foreign(AppointmentHistory.client_id) == User.id', viewonly=True)
+    service = db.relationship('Service', primaryjoin='foreign(AppointmentHistory.service_id) == Service.id', viewonly=True)
+
+    @classmethod
+    def query_with_relations(cls):
+        """Query history with the client and service that to_dict serializes joined in"""
+        return cls.query.options(joinedload(cls.client), joinedload(cls.service))
+
+    to_dict = Appointment.to_dict
+
+    def __repr__(self):
+        return f'<AppointmentHistory {self.id} - {self.appointment_date} {self.appointment_time}>'
+
+
+class SlotHold(db.Model):
+    """SlotHold model for short-lived slot reservations during checkout"""
+    __tablename__ = 'slot_holds'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    client_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    service_id = db.Column(UUID(as_uuid=True), db.ForeignKey('services.id'), nullable=False)
+    resource_id = db.Column(UUID(as_uuid=True), db.ForeignKey('resources.id', ondelete='CASCADE'), nullable=True)
+    hold_date = db.Column(db.Date, nullable=False)
+    hold_time = db.Column(db.Time, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Slot reads look up unexpired holds per date
+    __table_args__ = (
+        db.Index('idx_slot_hold_date_expires', 'hold_date', 'expires_at'),
+    )
+
+    def is_expired(self, now=None):
+        """Check whether the hold has lapsed"""
+        return self.expires_at <= (now or datetime.utcnow())
+
+    def to_dict(self):
+        """Convert slot hold object to dictionary"""
+        return {
+            'id': str(self.id),
+            'client_id': str(self.client_id),
+            'service_id': str(self.service_id),
+            'resource_id': str(self.resource_id) if self.resource_id else None,
+            'appointment_date': self.hold_date.isoformat() if self.hold_date else None,
+            'appointment_time': self.hold_time.strftime('%H:%M') if self.hold_time else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<SlotHold {self.id} - {self.hold_date} {self.hold_time}>'
+
+
+class WaitlistEntry(db.Model):
+    """WaitlistEntry model for clients waiting for a slot to free up"""
+    __tablename__ = 'waitlist_entries'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    client_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    service_id = db.Column(UUID(as_uuid=True), db.ForeignKey('services.id', ondelete='CASCADE'), nullable=False)
+    # Acceptable window: the whole appointment must fit between window_start and window_end
+    window_date = db.Column(db.Date, nullable=False)
+    window_start = db.Column(db.Time, nullable=False)
+    window_end = db.Column(db.Time, nullable=False)
+    # Book the freed slot directly instead of offering it as a slot hold
+    auto_book = db.Column(db.Boolean, default=False, nullable=False)
+    status = db.Column(
+        db.Enum('waiting', 'offered', 'booked', name='waitlist_status'),
+        default='waiting',
+        nullable=False
+    )
+    notes = db.Column(db.Text)
+    # Slot hold of a pending offer, and the appointment once booked
+    hold_id = db.Column(UUID(as_uuid=True), nullable=True, index=True)
+    appointment_id = db.Column(UUID(as_uuid=True), db.ForeignKey('appointments.id', ondelete='SET NULL'), nullable=True)
+    matched_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    service = db.relationship('Service')
+
+    # Cancellations look up waiting entries whose window overlaps the freed time
+    __table_args__ = (
+        db.Index(
+            'idx_waitlist_waiting_date_window', 'window_date', 'window_start',
+            postgresql_include=['window_end', 'service_id', 'created_at'],
+            postgresql_where=db.text("status = 'waiting'")
+        ),
+    )
+
+    def to_dict(self):
+        """Convert waitlist entry object to dictionary"""
+        return {
+            'id': str(self.id),
+            'client_id': str(self.client_id),
+            'service_id': str(self.service_id),
+            'date': self.window_date.isoformat() if self.window_date else None,
+            'start_time': self.window_start.strftime('%H:%M') if self.window_start else None,
+            'end_time': self.window_end.strftime('%H:%M') if self.window_end else None,
+            'auto_book': self.auto_book,
+            'status': self.status,
+            'notes': self.notes,
+            'hold_id': str(self.hold_id) if self.hold_id else None,
+            'appointment_id': str(self.appointment_id) if self.appointment_id else None,
+            'matched_at': self.matched_at.isoformat() if self.matched_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<WaitlistEntry {self.id} - {self.window_date} {self.window_start}-{self.window_end}>'
+
+
+class DayOccupancy(db.Model):
+    """DayOccupancy model holding the materialized busy intervals of a date"""
+    __tablename__ = 'day_occupancy'
+
+    occupancy_date = db.Column(db.Date, primary_key=True)
+    # Sorted [start_minute, end_minute, appointment_id, resource_id] entries for pending/confirmed
+    # appointments; resource_id is null for appointments without a resource
+    intervals = db.Column(JSONB, nullable=False, default=list)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert day occupancy object to dictionary"""
+        return {
+            'occupancy_date': self.occupancy_date.isoformat() if self.occupancy_date else None,
+            'intervals': self.intervals,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<DayOccupancy {self.occupancy_date}: {len(self.intervals or [])} intervals>'
+
+
+class DailyServiceStats(db.Model):
+    """DailyServiceStats model holding pre-aggregated appointment figures per service per day"""
+    __tablename__ = 'daily_service_stats'
+
+    stats_date = db.Column(db.Date, primary_key=True)
+    service_id = db.Column(UUID(as_uuid=True), db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+    pending = db.Column(db.Integer, default=0, nullable=False)
+    confirmed = db.Column(db.Integer, default=0, nullable=False)
+    cancelled = db.Column(db.Integer, default=0, nullable=False)
+    completed = db.Column(db.Integer, default=0, nullable=False)
+    # Sum of the service price over completed appointments
+    revenue = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+    # Minutes of pending, confirmed and completed appointments
+    booked_minutes = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert daily stats object to dictionary"""
+        return {
+            'date': self.stats_date.isoformat() if self.stats_date else None,
+            'service_id': str(self.service_id),
+            'by_status': {
+                'pending': self.pending,
+                'confirmed': self.confirmed,
+                'cancelled': self.cancelled,
+                'completed': self.completed
+            },
+            'revenue': float(self.revenue or 0),
+            'booked_minutes': self.booked_minutes
+        }
+
+    def __repr__(self):
+        return f'<DailyServiceStats {self.stats_date} {self.service_id}>'
+
+
+class ChangeVersion(db.Model):
+    """ChangeVersion model holding a counter bumped whenever the data behind a scope changes"""
+    __tablename__ = 'change_versions'
+
+    # 'appointments' (any appointment), 'services', 'client:<user id>' or a slot cache scope
+    # ('slots', 'slots:<date>', 'slots:service:<service id>')
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        """Convert change version object to dictionary"""
+        return {
+            'scope': self.scope,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<ChangeVersion {self.scope}: {self.version}>'
+
+
+class IdempotencyKey(db.Model):
+    """IdempotencyKey model storing the first response to a request sent with an Idempotency-Key header"""
+    __tablename__ = 'idempotency_keys'
+
+    # 'POST /api/appointments user:<id>' (or without the user for anonymous endpoints)
+    scope = db.Column(db.String(128), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    # SHA-256 of the request body, so a key reused for a different request is refused
+    request_hash = db.Column(db.String(64), nullable=False)
+    # Both NULL while the first request holding the key is still running
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def is_expired(self, now=None):
+        """Check whether the stored response may no longer be replayed"""
+        return self.expires_at <= (now or datetime.utcnow())
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.scope} {self.key}: {self.status_code}>'
+
+
 class Availability(db.Model):
     """Availability model for business hours configuration"""
     __tablename__ = 'availability'
@@ -0,0 +1,189 @@
+"""
+Day Occupancy Maintenance
+Keeps the materialized day_occupancy table in step with appointment writes
+"""
+from datetime import date
+from sqlalchemy.dialects.postgresql import insert
+from app.models import db, Appointment, DayOccupancy
+from app.slot_engine import ACTIVE_STATUSES, query_appointment_intervals, time_to_minutes
+
+
+def lock_day_occupancy(occupancy_date):
+    """
+    Lock the occupancy row of a date for the rest of the transaction
+    Creates the row from the appointments table if it does not exist yet
+    Args:
+        occupancy_date: date object
+    Returns: DayOccupancy
+    """
+    intervals = []
+    if db.session.get(DayOccupancy, occupancy_date) is None:
+        intervals = query_appointment_intervals(occupancy_date, occupancy_date).get(occupancy_date, [])
+
+    # A concurrent writer may create the row first; theirs wins and we lock it
+    db.session.execute(
+        insert(DayOccupancy).values(occupancy_date=occupancy_date, intervals=intervals)
+        .on_conflict_do_nothing(index_elements=['occupancy_date'])
+    )
+
+    return DayOccupancy.query.filter_by(
+        occupancy_date=occupancy_date
+    ).with_for_update().populate_existing().one()
+
+
+def lock_days_occupancy(occupancy_dates):
+    """
+    Lock the occupancy rows of several dates with a constant number of queries
+    Missing rows are created from one appointments query; rows are locked in
+    date order, like lock_day_occupancy called on sorted dates
+    Args:
+        occupancy_dates: iterable of date objects
+    Returns: dict of date -> DayOccupancy
+    """
+    dates = sorted(set(occupancy_dates))
+    if not dates:
+        return {}
+
+    existing = {
+        row.occupancy_date for row in db.session.query(DayOccupancy.occupancy_date).filter(
+            DayOccupancy.occupancy_date.in_(dates)
+        )
+    }
+    missing = [occupancy_date for occupancy_date in dates if occupancy_date not in existing]
+    if missing:
+        intervals_by_date = query_appointment_intervals(missing[0], missing[-1])
+        db.session.execute(
+            insert(DayOccupancy).values([
+                {'occupancy_date': occupancy_date, 'intervals': intervals_by_date.get(occupancy_date, [])}
+                for occupancy_date in missing
+            ]).on_conflict_do_nothing(index_elements=['occupancy_date'])
+        )
+
+    rows = DayOccupancy.query.filter(
+        DayOccupancy.occupancy_date.in_(dates)
+    ).order_by(DayOccupancy.occupancy_date).with_for_update().populate_existing().all()
+
+    return {row.occupancy_date: row for row in rows}
+
+
+def sync_appointment_occupancy(appointment, previous_date=None, deleted=False):
+    """
+    Apply an appointment write to the occupancy of the affected dates
+    Must run inside the same transaction as the write (after it is flushed
+    or before a delete) so both commit or roll back together
+    Args:
+        appointment: Appointment object
+        previous_date: date the appointment was on before a reschedule (optional)
+        deleted: True when the appointment is being deleted
+    """
+    appointment_id = str(appointment.id)
+    dates = {appointment.appointment_date}
+    if previous_date:
+        dates.add(previous_date)
+
+    occupies = not deleted and appointment.status in ACTIVE_STATUSES
+
+    for occupancy_date in sorted(dates):
+        occupancy = lock_day_occupancy(occupancy_date)
+        intervals = [interval for interval in occupancy.intervals if interval[2] != appointment_id]
+
+        if occupies and occupancy_date == appointment.appointment_date:
+            start = time_to_minutes(appointment.appointment_time)
+            resource_id = str(appointment.resource_id) if appointment.resource_id else None
+            intervals.append([start, start + appointment.service.duration, appointment_id, resource_id])
+
+        occupancy.intervals = sorted(intervals)
+
+
+def release_occupancy(appointment_ids_by_date):
+    """
+    Remove many appointments from the occupancy of their dates
+    Used by bulk writes that make appointments inactive; locks dates in order
+    Args:
+        appointment_ids_by_date: dict of date -> set of appointment id strings
+    """
+    for occupancy_date in sorted(appointment_ids_by_date):
+        appointment_ids = appointment_ids_by_date[occupancy_date]
+        occupancy = lock_day_occupancy(occupancy_date)
+        occupancy.intervals = [interval for interval in occupancy.intervals if interval[2] not in appointment_ids]
+
+
+def sync_service_occupancy(service):
+    """
+    Rebuild booked ranges and occupancy for every appointment of a service
+    Used when a service's duration changes; raises IntegrityError if the new
+    duration makes active appointments overlap
+    Args:
+        service: Service object
+    Returns: list of rebuilt dates
+    """
+    starts_at = Appointment.appointment_date + Appointment.appointment_time
+    db.session.query(Appointment).filter(
+        Appointment.service_id == service.id
+    ).update({
+        Appointment.time_range: db.func.tsrange(
+            starts_at, starts_at + db.func.make_interval(0, 0, 0, 0, 0, service.duration), '[)'
+        )
+    }, synchronize_session=False)
+
+    rows = db.session.query(Appointment.appointment_date).filter(
+        Appointment.service_id == service.id,
+        Appointment.status.in_(ACTIVE_STATUSES)
+    ).distinct().all()
+
+    for row in rows:
+        occupancy = lock_day_occupancy(row.appointment_date)
+        occupancy.intervals = query_appointment_intervals(
+            row.appointment_date, row.appointment_date
+        ).get(row.appointment_date, [])
+
+    return [row.appointment_date for row in rows]
+
+
+def find_occupancy_drift(start_date=None, end_date=None):
+    """
+    Compare day_occupancy rows against the appointments table
+    Args:
+        start_date: first date to check (optional)
+        end_date: last date to check (optional)
+    Returns: dict of date -> (stored intervals or None, expected intervals) for mismatched dates
+    """
+    start_date = start_date or date.min
+    end_date = end_date or date.max
+
+    stored = {
+        row.occupancy_date: row.intervals
+        for row in DayOccupancy.query.filter(DayOccupancy.occupancy_date.between(start_date, end_date)).all()
+    }
+    expected = query_appointment_intervals(start_date, end_date)
+
+    drift = {}
+    for occupancy_date in set(stored) | set(expected):
+        stored_intervals = stored.get(occupancy_date)
+        expected_intervals = expected.get(occupancy_date, [])
+        if stored_intervals is None and not expected_intervals:
+            continue
+        if stored_intervals is None or sorted(stored_intervals) != expected_intervals:
+            drift[occupancy_date] = (stored_intervals, expected_intervals)
+
+    return drift
+
+
+def rebuild_occupancy(start_date=None, end_date=None):
+    """
+    Rewrite drifted day_occupancy rows from the appointments table
+    Args:
+        start_date: first date to rebuild (optional)
+        end_date: last date to rebuild (optional)
+    Returns: number of dates rewritten
+    """
+    drift = find_occupancy_drift(start_date, end_date)
+
+    for occupancy_date in sorted(drift):
+        occupancy = lock_day_occupancy(occupancy_date)
+        occupancy.intervals = query_appointment_intervals(
+            occupancy_date, occupancy_date
+        ).get(occupancy_date, [])
+
+    db.session.commit()
+    return len(drift)
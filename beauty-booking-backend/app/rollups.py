@@ -0,0 +1,173 @@
+"""
+Daily Rollup Maintenance
+Keeps the pre-aggregated daily_service_stats table in step with appointment writes
+"""
+from datetime import date, datetime
+from sqlalchemy.dialects.postgresql import insert
+from app.models import db, AppointmentHistory, Service, DailyServiceStats
+
+STATUSES = ('pending', 'confirmed', 'cancelled', 'completed')
+ROLLUP_COLUMNS = STATUSES + ('revenue', 'booked_minutes')
+
+
+def rollup_key(appointment):
+    """
+    Snapshot the fields of an appointment that decide its rollup contribution
+    Take it before a write and pass it to apply_appointment_rollup afterwards
+    Returns: (date, service_id, status) tuple
+    """
+    return (appointment.appointment_date, appointment.service_id, appointment.status)
+
+
+def apply_appointment_rollup(previous_key=None, appointment=None, deleted=False):
+    """
+    Apply an appointment write to the daily rollups
+    Must run inside the same transaction as the write so both commit or roll back together
+    Args:
+        previous_key: rollup_key taken before the write (None for a new appointment)
+        appointment: Appointment object after the write
+        deleted: True when the appointment is being deleted
+    """
+    changes = []
+    if previous_key:
+        changes.append((previous_key, -1))
+    if appointment is not None and not deleted:
+        changes.append((rollup_key(appointment), 1))
+
+    apply_rollup_changes(changes)
+
+
+def apply_rollup_changes(changes):
+    """
+    Add many appointment contributions to the rollups with a single upsert
+    Args:
+        changes: iterable of ((date, service_id, status), sign) with sign +1 or -1
+    """
+    deltas = {}
+    for (stats_date, service_id, status), sign in changes:
+        service = db.session.get(Service, service_id)
+        delta = deltas.setdefault((stats_date, service_id), dict.fromkeys(ROLLUP_COLUMNS, 0))
+        delta[status] += sign
+        if status == 'completed':
+            delta['revenue'] += sign * service.price
+        if status != 'cancelled':
+            delta['booked_minutes'] += sign * service.duration
+
+    # A write that leaves the status, date and service unchanged nets out to nothing
+    rows = [
+        {'stats_date': stats_date, 'service_id': service_id, **delta}
+        for (stats_date, service_id), delta in deltas.items() if any(delta.values())
+    ]
+    if not rows:
+        return
+
+    statement = insert(DailyServiceStats).values(rows)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['stats_date', 'service_id'],
+        set_={
+            **{column: getattr(DailyServiceStats, column) + getattr(statement.excluded, column) for column in ROLLUP_COLUMNS},
+            'updated_at': datetime.utcnow()
+        }
+    ))
+
+
+def aggregate_appointments(start_date=None, end_date=None, service_id=None):
+    """
+    Build the query that computes rollup rows straight from appointments
+    Reads the archive too, so moving closed rows out of the hot table changes no rollup
+    Returns: select of (stats_date, service_id, pending, confirmed, cancelled, completed, revenue, booked_minutes)
+    """
+    statement = db.select(
+        AppointmentHistory.appointment_date.label('stats_date'),
+        AppointmentHistory.service_id,
+        *[db.func.count().filter(AppointmentHistory.status == status).label(status) for status in STATUSES],
+        db.func.coalesce(db.func.sum(Service.price).filter(AppointmentHistory.status == 'completed'), 0).label('revenue'),
+        db.func.coalesce(db.func.sum(Service.duration).filter(AppointmentHistory.status != 'cancelled'), 0).label('booked_minutes')
+    ).join(
+        Service, AppointmentHistory.service_id == Service.id
+    ).where(
+        AppointmentHistory.appointment_date.between(start_date or date.min, end_date or date.max)
+    ).group_by(
+        AppointmentHistory.appointment_date, AppointmentHistory.service_id
+    )
+
+    if service_id:
+        statement = statement.where(AppointmentHistory.service_id == service_id)
+
+    return statement
+
+
+def replace_rollups(start_date=None, end_date=None, service_id=None):
+    """
+    Recompute rollup rows from appointments with one DELETE and one INSERT ... SELECT
+    Runs in the caller's transaction (used when a service's price or duration changes)
+    Args:
+        start_date: first date (optional)
+        end_date: last date (optional)
+        service_id: only this service (optional)
+    """
+    delete = db.delete(DailyServiceStats).where(
+        DailyServiceStats.stats_date.between(start_date or date.min, end_date or date.max)
+    )
+    if service_id:
+        delete = delete.where(DailyServiceStats.service_id == service_id)
+    db.session.execute(delete)
+
+    columns = ['stats_date', 'service_id', *ROLLUP_COLUMNS]
+    db.session.execute(
+        insert(DailyServiceStats).from_select(columns, aggregate_appointments(start_date, end_date, service_id))
+    )
+
+
+def find_rollup_drift(start_date=None, end_date=None):
+    """
+    Compare daily_service_stats rows against the appointments table
+    Args:
+        start_date: first date to check (optional)
+        end_date: last date to check (optional)
+    Returns: dict of (date, service_id) -> (stored figures or None, expected figures or None)
+    """
+    def figures(row):
+        return tuple(float(getattr(row, column)) if column == 'revenue' else getattr(row, column)
+                     for column in ROLLUP_COLUMNS)
+
+    stored = {
+        (row.stats_date, row.service_id): figures(row)
+        for row in DailyServiceStats.query.filter(
+            DailyServiceStats.stats_date.between(start_date or date.min, end_date or date.max)
+        ).all()
+    }
+    expected = {
+        (row.stats_date, row.service_id): figures(row)
+        for row in db.session.execute(aggregate_appointments(start_date, end_date))
+    }
+
+    # Rows that were zeroed out by deltas count as missing
+    empty = (0,) * len(STATUSES) + (0.0, 0)
+
+    drift = {}
+    for key in set(stored) | set(expected):
+        stored_figures = stored.get(key)
+        expected_figures = expected.get(key)
+        if stored_figures == empty and expected_figures is None:
+            continue
+        if stored_figures != expected_figures:
+            drift[key] = (stored_figures, expected_figures)
+
+    return drift
+
+
+def rebuild_rollups(start_date=None, end_date=None):
+    """
+    Rewrite the rollups of a date range from the appointments table
+    Args:
+        start_date: first date to rebuild (optional)
+        end_date: last date to rebuild (optional)
+    Returns: number of rollup rows in the range
+    """
+    replace_rollups(start_date, end_date)
+    db.session.commit()
+
+    return DailyServiceStats.query.filter(
+        DailyServiceStats.stats_date.between(start_date or date.min, end_date or date.max)
+    ).count()
@@ -138,7 +138,7 @@ def generate_reminder():
             return jsonify({'error': 'appointment_id is required'}), 400
 
         # Get appointment
-        appointment = Appointment.query.get(appointment_id)
+        appointment = Appointment.query_with_relations().get(appointment_id)
         if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
 
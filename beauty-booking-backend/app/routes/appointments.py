@@ -2,38 +2,118 @@
 Appointments Routes
 Handles appointment booking, management, and available slots
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date
-from app.models import db, Appointment, Service, User
+import csv
+import io
+import json
+import uuid
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from datetime import datetime, date, timedelta
+from sqlalchemy.exc import IntegrityError
+from app.models import (
+    db, Appointment, AppointmentHistory, ArchivedAppointment, Service, User, SlotHold, DailyServiceStats
+)
+from app.events import event_broker, stream_events, create_stream_token, load_stream_token
+from app.idempotency import idempotent, rollback_request
+from app.importer import ImportFormatError, parse_import_file, import_appointments
+from app.series import FREQUENCIES, MAX_SERIES_OCCURRENCES, MAX_SERIES_INTERVAL, expand_recurrence, book_series
+from app.waitlist import backfill_cancellation, complete_waitlist_offer, is_offer_hold, release_waitlist_offer
+from app.occupancy import lock_day_occupancy, sync_appointment_occupancy, release_occupancy
+from app.rollups import rollup_key, apply_appointment_rollup, apply_rollup_changes
+from app.slot_engine import (
+    ACTIVE_STATUSES, load_business_windows, load_busy_schedule, load_hold_schedule, load_resource_pool,
+    time_to_minutes
+)
+from app.slot_cache import slot_cache
+from app.versions import (
+    APPOINTMENTS_SCOPE, SERVICES_SCOPE, client_scope, bump_appointment_versions, load_versions,
+    make_etag, not_modified, with_etag
+)
 from app.utils import (
-    admin_required, parse_date, parse_time, is_date_available,
-    get_available_time_slots, check_appointment_conflict, get_date_today
+    admin_required, parse_date, parse_time, parse_date_range, parse_page_args, paginate_appointments,
+    is_date_available,
+    get_available_time_slots, get_available_time_slots_range, get_available_time_slots_batch,
+    find_next_available_slots,
+    check_appointment_conflict, check_locked_conflict, describe_conflict, is_exclusion_violation, choose_resource,
+    get_slot_step, get_date_today, get_datetime_now
 )
 
 appointments_bp = Blueprint('appointments', __name__)
 
+# Writes to an appointment moved to appointments_archive are refused with 409
+ARCHIVED_ERROR = 'Appointment is archived and can no longer be changed'
+
+# Longest range the availability calendar computes in one request
+MAX_CALENDAR_DAYS = 62
+
+# Most openings a next-available search returns
+MAX_NEXT_AVAILABLE_LIMIT = 50
+
+# Most appointments a bulk status change applies to in one request
+MAX_BULK_APPOINTMENTS = 1000
+
+# Most rows accepted by one import request (the CLI has no limit)
+MAX_IMPORT_ROWS = 5000
+
+# Longest range a rollup report covers in one request
+MAX_REPORT_DAYS = 731
+
+# Rows fetched from the server-side cursor (and written) per chunk of an export
+EXPORT_CHUNK_SIZE = 1000
+
+# Columns of an appointment export, in order
+EXPORT_COLUMNS = [
+    'id', 'appointment_date', 'appointment_time', 'status', 'service_id', 'service_name',
+    'service_price', 'service_duration', 'client_id', 'client_name', 'client_email',
+    'client_phone', 'resource_id', 'notes', 'created_at'
+]
+
 
 @appointments_bp.route('', methods=['GET'])
 @jwt_required()
 def get_appointments():
     """
-    Get appointments for the current user
+    Get appointments for the current user, newest first, one page at a time
     GET /api/appointments
     Query params:
         - status: filter by status (optional)
         - upcoming: true/false (optional, default=false)
+        - from, to: date range YYYY-MM-DD, inclusive (optional)
+        - limit: page size (optional, default=ITEMS_PER_PAGE)
+        - cursor: next_cursor of the previous page (optional)
+        - include_total: true to also count all matching appointments (optional)
         - lang: language code 'en' or 'es' (optional, default=en)
+    Responses carry an ETag; a matching If-None-Match is answered with 304
+    from the change versions alone
     """
     try:
         current_user_id = get_jwt_identity()
 
+        upcoming = request.args.get('upcoming', 'false').lower() == 'true'
+        etag = make_etag(
+            'appointments', current_user_id, load_versions(client_scope(current_user_id), SERVICES_SCOPE),
+            sorted(request.args.items(multi=True)), get_date_today() if upcoming else None
+        )
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         # Get language parameter
         lang = request.args.get('lang', 'en')
         if lang not in ['en', 'es']:
             lang = 'en'
 
-        query = Appointment.query.filter_by(client_id=current_user_id)
+        limit, cursor, error = parse_page_args(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        start_date, end_date, error = parse_date_range(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # Upcoming bookings are never archived, so only the hot table is read for them
+        model = Appointment if upcoming else AppointmentHistory
+        query = model.query_with_relations().filter_by(client_id=current_user_id)
 
         # Filter by status if provided
         status = request.args.get('status')
@@ -41,22 +121,29 @@ def get_appointments():
             query = query.filter_by(status=status)
 
         # Filter upcoming appointments
-        upcoming = request.args.get('upcoming', 'false').lower() == 'true'
         if upcoming:
             today = get_date_today()
-            query = query.filter(Appointment.appointment_date >= today)
-            query = query.filter(Appointment.status.in_(['pending', 'confirmed']))
+            query = query.filter(model.appointment_date >= today)
+            query = query.filter(model.status.in_(['pending', 'confirmed']))
 
-        # Order by date and time
-        appointments = query.order_by(
-            Appointment.appointment_date.desc(),
-            Appointment.appointment_time.desc()
-        ).all()
+        # Filter by date range
+        if start_date:
+            query = query.filter(model.appointment_date >= start_date)
+        if end_date:
+            query = query.filter(model.appointment_date <= end_date)
 
-        return jsonify({
+        response = {}
+        if request.args.get('include_total', 'false').lower() == 'true':
+            response['total'] = query.count()
+
+        appointments, next_cursor = paginate_appointments(query, limit, cursor, model=model)
+
+        response.update({
             'appointments': [apt.to_dict(lang=lang) for apt in appointments],
-            'count': len(appointments)
-        }), 200
+            'count': len(appointments),
+            'next_cursor': next_cursor
+        })
+        return with_etag(jsonify(response), etag), 200
 
     except Exception as e:
         return jsonify({'error': 'Failed to fetch appointments', 'message': str(e)}), 500
@@ -66,15 +153,36 @@ def get_appointments():
 @admin_required
 def get_all_appointments():
     """
-    Get all appointments (admin only)
+    Get all appointments (admin only), newest first, one page at a time
     GET /api/appointments/admin
     Query params:
         - status: filter by status (optional)
         - date: filter by date YYYY-MM-DD (optional)
+        - from, to: date range YYYY-MM-DD, inclusive (optional)
         - client_id: filter by client (optional)
+        - limit: page size (optional, default=ITEMS_PER_PAGE)
+        - cursor: next_cursor of the previous page (optional)
+        - include_total: true to also count all matching appointments (optional)
+    Responses carry an ETag (see GET /api/appointments)
     """
     try:
-        query = Appointment.query
+        etag = make_etag(
+            'admin-appointments', load_versions(APPOINTMENTS_SCOPE, SERVICES_SCOPE),
+            sorted(request.args.items(multi=True))
+        )
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        limit, cursor, error = parse_page_args(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        start_date, end_date, error = parse_date_range(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        query = AppointmentHistory.query_with_relations()
 
         # Filter by status
         status = request.args.get('status')
@@ -88,38 +196,236 @@ def get_all_appointments():
             if appointment_date:
                 query = query.filter_by(appointment_date=appointment_date)
 
+        # Filter by date range
+        if start_date:
+            query = query.filter(AppointmentHistory.appointment_date >= start_date)
+        if end_date:
+            query = query.filter(AppointmentHistory.appointment_date <= end_date)
+
         # Filter by client
         client_id = request.args.get('client_id')
         if client_id:
             query = query.filter_by(client_id=client_id)
 
-        # Order by date and time
-        appointments = query.order_by(
-            Appointment.appointment_date.desc(),
-            Appointment.appointment_time.desc()
-        ).all()
+        response = {}
+        if request.args.get('include_total', 'false').lower() == 'true':
+            response['total'] = query.count()
 
-        return jsonify({
+        appointments, next_cursor = paginate_appointments(query, limit, cursor, model=AppointmentHistory)
+
+        response.update({
             'appointments': [apt.to_dict() for apt in appointments],
-            'count': len(appointments)
-        }), 200
+            'count': len(appointments),
+            'next_cursor': next_cursor
+        })
+        return with_etag(jsonify(response), etag), 200
 
     except Exception as e:
         return jsonify({'error': 'Failed to fetch appointments', 'message': str(e)}), 500
 
 
+@appointments_bp.route('/export', methods=['GET'])
+@admin_required
+def export_appointments():
+    """
+    Stream appointment history as CSV or NDJSON (admin only)
+    GET /api/appointments/export
+    Query params:
+        - format: csv or ndjson (optional, default=csv)
+        - from, to: date range YYYY-MM-DD, inclusive (optional)
+        - status: filter by status (optional)
+        - service_id: filter by service (optional)
+    Rows are read through a server-side cursor and written chunk by chunk,
+    so memory use does not grow with the size of the export
+    """
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+        start_date, end_date, error = parse_date_range(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        status = request.args.get('status')
+        valid_statuses = ['pending', 'confirmed', 'cancelled', 'completed']
+        if status and status not in valid_statuses:
+            return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
+
+        service_id = request.args.get('service_id')
+        if service_id:
+            try:
+                service_id = uuid.UUID(service_id)
+            except ValueError:
+                return jsonify({'error': 'Invalid service_id'}), 400
+
+        # Plain columns from one joined query over hot and archived rows: no ORM objects pile up in the session
+        history = AppointmentHistory
+        statement = db.select(
+            history.id, history.appointment_date, history.appointment_time, history.status,
+            history.service_id, Service.name.label('service_name'), Service.price.label('service_price'),
+            Service.duration.label('service_duration'), history.client_id, User.name.label('client_name'),
+            User.email.label('client_email'), User.phone.label('client_phone'), history.resource_id,
+            history.notes, history.created_at
+        ).join(
+            Service, history.service_id == Service.id
+        ).join(
+            User, history.client_id == User.id
+        ).order_by(
+            history.appointment_date, history.appointment_time, history.id
+        )
+
+        if start_date:
+            statement = statement.where(history.appointment_date >= start_date)
+        if end_date:
+            statement = statement.where(history.appointment_date <= end_date)
+        if status:
+            statement = statement.where(history.status == status)
+        if service_id:
+            statement = statement.where(history.service_id == service_id)
+
+        def serialize(row):
+            values = dict(row._mapping)
+            for key, value in values.items():
+                if isinstance(value, uuid.UUID):
+                    values[key] = str(value)
+            values['appointment_date'] = row.appointment_date.isoformat()
+            values['appointment_time'] = row.appointment_time.strftime('%H:%M')
+            values['service_price'] = float(row.service_price)
+            values['created_at'] = row.created_at.isoformat() if row.created_at else None
+            return values
+
+        def generate():
+            # yield_per streams from a server-side cursor EXPORT_CHUNK_SIZE rows at a time
+            result = db.session.execute(statement, execution_options={'yield_per': EXPORT_CHUNK_SIZE})
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+
+            if export_format == 'csv':
+                writer.writeheader()
+
+            for chunk in result.partitions():
+                for row in chunk:
+                    if export_format == 'csv':
+                        writer.writerow(serialize(row))
+                    else:
+                        buffer.write(json.dumps(serialize(row)) + '\n')
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+            # A CSV header with no rows
+            if buffer.tell():
+                yield buffer.getvalue()
+
+            result.close()
+
+        filename = f'appointments-{get_date_today().isoformat()}.{export_format}'
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv' if export_format == 'csv' else 'application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to export appointments', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/events/token', methods=['POST'])
+@jwt_required()
+def create_events_token():
+    """
+    Issue a short-lived token for opening the event stream (admin only)
+    POST /api/appointments/events/token
+    Returns: token and expires_in (seconds)
+    """
+    try:
+        user = User.query.get(get_jwt_identity())
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        return jsonify({
+            'token': create_stream_token(user.id),
+            'expires_in': current_app.config.get('EVENTS_TOKEN_MAX_AGE', 60)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to issue stream token', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/events', methods=['GET'])
+def appointment_events():
+    """
+    Stream appointment changes as server-sent events (admin only)
+    GET /api/appointments/events
+    Query params:
+        - token: stream token from POST /api/appointments/events/token (EventSource
+          cannot send an Authorization header; other clients may send one instead)
+        - last_event_id: resume after this event (optional, the Last-Event-ID header also works)
+    Events: appointment.created, appointment.updated, appointment.cancelled,
+    appointment.deleted, appointments.bulk_updated, appointments.imported,
+    slots.invalidated and resync (events were missed: refetch)
+    """
+    try:
+        token = request.args.get('token')
+        if token:
+            user_id = load_stream_token(token)
+            if user_id is None:
+                return jsonify({'error': 'Invalid or expired stream token'}), 401
+        else:
+            verify_jwt_in_request(optional=True)
+            user_id = get_jwt_identity()
+            if user_id is None:
+                return jsonify({'error': 'Stream token required'}), 401
+
+        user = User.query.get(user_id)
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        if user.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        subscriber = event_broker.subscribe(last_event_id)
+
+        # The stream never touches the database, so release the connection now
+        db.session.remove()
+
+        return Response(
+            stream_events(subscriber, current_app.config.get('EVENTS_KEEPALIVE', 15)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to open event stream', 'message': str(e)}), 500
+
+
 @appointments_bp.route('/<appointment_id>', methods=['GET'])
 @jwt_required()
 def get_appointment(appointment_id):
     """
     Get a single appointment by ID
     GET /api/appointments/<appointment_id>
+    Responses carry an ETag (see GET /api/appointments)
     """
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
 
-        appointment = Appointment.query.get(appointment_id)
+        # Admins see every client's writes; a client only ever sees their own appointments
+        scope = APPOINTMENTS_SCOPE if user.role == 'admin' else client_scope(current_user_id)
+        etag = make_etag('appointment', appointment_id, current_user_id, load_versions(scope, SERVICES_SCOPE))
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        appointment = AppointmentHistory.query_with_relations().get(appointment_id)
 
         if not appointment:
             return jsonify({'error': 'Appointment not found'}), 404
@@ -128,9 +434,9 @@ def get_appointment(appointment_id):
         if user.role != 'admin' and str(appointment.client_id) != current_user_id:
             return jsonify({'error': 'Access denied'}), 403
 
-        return jsonify({
+        return with_etag(jsonify({
             'appointment': appointment.to_dict()
-        }), 200
+        }), etag), 200
 
     except Exception as e:
         return jsonify({'error': 'Failed to fetch appointment', 'message': str(e)}), 500
@@ -184,13 +490,220 @@ def get_available_slots():
         return jsonify({'error': 'Failed to fetch available slots', 'message': str(e)}), 500
 
 
+@appointments_bp.route('/available-slots/batch', methods=['GET'])
+def get_available_slots_batch():
+    """
+    Get available time slots for several services on a specific date
+    GET /api/appointments/available-slots/batch?date=YYYY-MM-DD&service_ids=id1,id2
+    Query params:
+        - date: date to check (required)
+        - service_ids: comma-separated service ids (optional, default=all active services)
+    """
+    try:
+        date_str = request.args.get('date')
+        if not date_str:
+            return jsonify({'error': 'date is required'}), 400
+
+        # Parse and validate date
+        appointment_date = parse_date(date_str)
+        if not appointment_date:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        # Check if date is in the past
+        if appointment_date < get_date_today():
+            return jsonify({'error': 'Cannot book appointments in the past'}), 400
+
+        service_ids = None
+        service_ids_str = request.args.get('service_ids')
+        if service_ids_str:
+            try:
+                service_ids = [uuid.UUID(value.strip()) for value in service_ids_str.split(',') if value.strip()]
+            except ValueError:
+                return jsonify({'error': 'Invalid service_ids. Use comma-separated service ids'}), 400
+
+        results = get_available_time_slots_batch(appointment_date, service_ids)
+
+        services = []
+        for service, slots in results:
+            services.append({
+                'service_id': str(service.id),
+                'service_name': service.name,
+                'duration': service.duration,
+                'available_slots': slots,
+                'count': len(slots)
+            })
+
+        response = {
+            'date': date_str,
+            'services': services,
+            'count': len(services)
+        }
+
+        # Report requested services that are missing or inactive
+        if service_ids is not None:
+            found_ids = {service.id for service, _ in results}
+            response['unavailable_service_ids'] = [
+                str(service_id) for service_id in service_ids if service_id not in found_ids
+            ]
+
+        return jsonify(response), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch available slots', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/next-available', methods=['GET'])
+def get_next_available():
+    """
+    Get the earliest available openings for a service
+    GET /api/appointments/next-available?service_id=xxx&after=YYYY-MM-DD&limit=N
+    Query params:
+        - service_id: service to book (required)
+        - after: first date to search, inclusive (optional, default=today)
+        - limit: number of openings to return (optional, default=1, max=50)
+    The search stops after NEXT_AVAILABLE_MAX_DAYS days
+    """
+    try:
+        service_id = request.args.get('service_id')
+        if not service_id:
+            return jsonify({'error': 'service_id is required'}), 400
+
+        today = get_date_today()
+
+        after_str = request.args.get('after')
+        start_date = parse_date(after_str) if after_str else today
+        if not start_date:
+            return jsonify({'error': 'Invalid after date format. Use YYYY-MM-DD'}), 400
+
+        # Never search the past
+        start_date = max(start_date, today)
+
+        try:
+            limit = int(request.args.get('limit', 1))
+            if limit < 1 or limit > MAX_NEXT_AVAILABLE_LIMIT:
+                return jsonify({'error': f'limit must be between 1 and {MAX_NEXT_AVAILABLE_LIMIT}'}), 400
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid limit format'}), 400
+
+        # Verify service exists
+        service = Service.query.get(service_id)
+        if not service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        if not service.active:
+            return jsonify({'error': 'Service is not active'}), 400
+
+        openings, searched_until = find_next_available_slots(
+            service_id, start_date, limit, current_app.config['NEXT_AVAILABLE_MAX_DAYS']
+        )
+
+        return jsonify({
+            'service_id': service_id,
+            'service_name': service.name,
+            'after': start_date.isoformat(),
+            'openings': [
+                {'date': opening_date.isoformat(), 'time': opening_time}
+                for opening_date, opening_time in openings
+            ],
+            'count': len(openings),
+            'searched_until': searched_until.isoformat()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to find next available slots', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/availability-calendar', methods=['GET'])
+def get_availability_calendar():
+    """
+    Get available time slots for a service over a range of dates
+    GET /api/appointments/availability-calendar?service_id=xxx&from=YYYY-MM-DD&to=YYYY-MM-DD
+    Query params:
+        - service_id: service to check (required)
+        - from: first date (optional, default=today)
+        - to: last date (optional, default=from + 30 days)
+        - include_slots: true/false (optional, default=true)
+    Past dates in the range are reported as closed
+    """
+    try:
+        service_id = request.args.get('service_id')
+        if not service_id:
+            return jsonify({'error': 'service_id is required'}), 400
+
+        today = get_date_today()
+
+        from_str = request.args.get('from')
+        start_date = parse_date(from_str) if from_str else today
+        if not start_date:
+            return jsonify({'error': 'Invalid from date format. Use YYYY-MM-DD'}), 400
+
+        to_str = request.args.get('to')
+        end_date = parse_date(to_str) if to_str else start_date + timedelta(days=30)
+        if not end_date:
+            return jsonify({'error': 'Invalid to date format. Use YYYY-MM-DD'}), 400
+
+        if end_date < start_date:
+            return jsonify({'error': 'to must not be before from'}), 400
+
+        if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+            return jsonify({'error': f'Date range cannot exceed {MAX_CALENDAR_DAYS} days'}), 400
+
+        include_slots = request.args.get('include_slots', 'true').lower() == 'true'
+
+        # Verify service exists
+        service = Service.query.get(service_id)
+        if not service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        if not service.active:
+            return jsonify({'error': 'Service is not active'}), 400
+
+        # Only compute bookable dates; earlier ones are closed
+        slots_by_date = {}
+        if end_date >= today:
+            slots_by_date = get_available_time_slots_range(service_id, max(start_date, today), end_date)
+
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            slots = slots_by_date.get(current_date, [])
+            day = {
+                'date': current_date.isoformat(),
+                'available': bool(slots),
+                'count': len(slots)
+            }
+            if include_slots:
+                day['available_slots'] = slots
+            days.append(day)
+            current_date += timedelta(days=1)
+
+        return jsonify({
+            'service_id': service_id,
+            'service_name': service.name,
+            'from': start_date.isoformat(),
+            'to': end_date.isoformat(),
+            'days': days,
+            'available_days': sum(1 for day in days if day['available'])
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch availability calendar', 'message': str(e)}), 500
+
+
 @appointments_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent
 def create_appointment():
     """
     Create a new appointment
     POST /api/appointments
-    Body: { service_id, appointment_date, appointment_time, notes (optional) }
+    Body: { service_id, appointment_date, appointment_time, notes (optional), hold_id (optional),
+            resource_id (optional) }
+    With hold_id, missing slot fields are taken from the client's slot hold,
+    which is converted into the appointment. When the salon has resources,
+    the booking goes to resource_id, the held resource, or the first free
+    qualifying resource. Retries sent with the same Idempotency-Key header
+    get the first response back instead of booking again
     """
     try:
         current_user_id = get_jwt_identity()
@@ -204,6 +717,26 @@ def create_appointment():
         date_str = data.get('appointment_date')
         time_str = data.get('appointment_time')
 
+        # Confirm a slot hold
+        hold = None
+        if data.get('hold_id'):
+            try:
+                hold = SlotHold.query.get(uuid.UUID(str(data['hold_id'])))
+            except ValueError:
+                return jsonify({'error': 'Invalid hold_id'}), 400
+
+            if not hold or str(hold.client_id) != current_user_id:
+                return jsonify({'error': 'Hold not found'}), 404
+
+            # An expired hold no longer reserves anything, even before the reaper removes it
+            # (and a lapsed waitlist offer goes back to the queue instead of being booked)
+            if hold.is_expired(get_datetime_now()):
+                return jsonify({'error': 'Hold has expired; select the time slot again'}), 410
+
+            service_id = service_id or str(hold.service_id)
+            date_str = date_str or hold.hold_date.isoformat()
+            time_str = time_str or hold.hold_time.strftime('%H:%M')
+
         if not service_id:
             return jsonify({'error': 'service_id is required'}), 400
 
@@ -239,12 +772,43 @@ def create_appointment():
         if not is_date_available(appointment_date):
             return jsonify({'error': 'Selected date is not available for appointments'}), 400
 
-        # Check for conflicts
-        has_conflict, conflict_msg = check_appointment_conflict(
-            service_id, appointment_date, appointment_time
-        )
-        if has_conflict:
-            return jsonify({'error': conflict_msg}), 409
+        if hold and (hold.service_id, hold.hold_date, hold.hold_time) != (service.id, appointment_date, appointment_time):
+            return jsonify({'error': 'Appointment does not match the held slot'}), 400
+
+        requested_resource_id = data.get('resource_id') or (hold.resource_id if hold else None)
+        if requested_resource_id:
+            try:
+                requested_resource_id = uuid.UUID(str(requested_resource_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid resource_id'}), 400
+
+        # Time held by other clients during checkout is not bookable. Holds are
+        # advisory; the exclusion constraint below is what prevents double booking
+        start = time_to_minutes(appointment_time)
+        resource_id = None
+        pool = load_resource_pool()
+        if pool.enabled:
+            # Pick the resource under the date's occupancy lock so concurrent
+            # bookings spread over resources instead of colliding on the first
+            lock_day_occupancy(appointment_date)
+            schedule = load_busy_schedule(appointment_date, exclude_hold_client_id=current_user_id)
+            resource_id = choose_resource(
+                pool, schedule, service.id, start, service.duration, requested_resource_id=requested_resource_id
+            )
+            if not resource_id:
+                rollback_request()
+                return jsonify({'error': 'No staff member is available for this service at the selected time'}), 409
+        else:
+            # Bookings left on a resource that is no longer active are not seen by the constraint
+            has_conflict, conflict_msg = check_locked_conflict(appointment_date, start, start + service.duration)
+            if has_conflict:
+                rollback_request()
+                return jsonify({'error': conflict_msg}), 409
+
+            other_holds = load_hold_schedule(appointment_date, exclude_client_id=current_user_id)
+            if other_holds.find_conflict(start, start + service.duration):
+                rollback_request()
+                return jsonify({'error': 'Selected time is currently held by another client'}), 409
 
         # Optional notes
         notes = data.get('notes', '').strip() if data.get('notes') else None
@@ -255,16 +819,39 @@ def create_appointment():
             service_id=service_id,
             appointment_date=appointment_date,
             appointment_time=appointment_time,
+            resource_id=uuid.UUID(resource_id) if resource_id else None,
             status='pending',
             notes=notes
         )
+        new_appointment.set_time_range(service.duration)
 
+        # The insert is the conflict check: overlapping bookings violate the exclusion constraint
         db.session.add(new_appointment)
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            rollback_request()
+            if not is_exclusion_violation(e):
+                raise
+            return jsonify({'error': describe_conflict(service_id, appointment_date, appointment_time)}), 409
+
+        if hold:
+            complete_waitlist_offer(hold, new_appointment)
+            db.session.delete(hold)
+
+        sync_appointment_occupancy(new_appointment)
+        apply_appointment_rollup(appointment=new_appointment)
+        bump_appointment_versions([new_appointment.client_id])
         db.session.commit()
 
+        slot_cache.invalidate_date(appointment_date)
+
+        appointment_data = new_appointment.to_dict()
+        event_broker.publish('appointment.created', appointment_data)
+
         return jsonify({
             'message': 'Appointment created successfully',
-            'appointment': new_appointment.to_dict()
+            'appointment': appointment_data
         }), 201
 
     except Exception as e:
@@ -272,13 +859,276 @@ def create_appointment():
         return jsonify({'error': 'Failed to create appointment', 'message': str(e)}), 500
 
 
+@appointments_bp.route('/series', methods=['POST'])
+@jwt_required()
+@idempotent
+def create_appointment_series():
+    """
+    Book a recurring series of appointments
+    POST /api/appointments/series
+    Body: {
+        service_id, start_date, appointment_time,
+        recurrence: { frequency: daily|weekly, interval (optional, default=1) },
+        count, mode: all_or_nothing|best_effort (optional, default=all_or_nothing),
+        notes (optional), resource_id (optional)
+    }
+    Every occurrence is checked in one pass against data loaded once for the
+    whole series; accepted occurrences are inserted together. all_or_nothing
+    books nothing when any occurrence is unavailable, best_effort books the
+    available ones and reports the rest
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        service = Service.query.get(data.get('service_id')) if data.get('service_id') else None
+        if not service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        if not service.active:
+            return jsonify({'error': 'Service is not active'}), 400
+
+        start_date = parse_date(data.get('start_date', ''))
+        if not start_date:
+            return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+
+        if start_date < get_date_today():
+            return jsonify({'error': 'Cannot book appointments in the past'}), 400
+
+        appointment_time = parse_time(data.get('appointment_time', ''))
+        if not appointment_time:
+            return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
+
+        recurrence = data.get('recurrence') or {}
+        frequency = recurrence.get('frequency')
+        if frequency not in FREQUENCIES:
+            return jsonify({'error': f'recurrence.frequency must be one of: {", ".join(FREQUENCIES)}'}), 400
+
+        try:
+            interval = int(recurrence.get('interval', 1))
+            count = int(data.get('count'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'count and recurrence.interval must be integers'}), 400
+
+        if not 1 <= interval <= MAX_SERIES_INTERVAL:
+            return jsonify({'error': f'recurrence.interval must be between 1 and {MAX_SERIES_INTERVAL}'}), 400
+
+        if not 1 <= count <= MAX_SERIES_OCCURRENCES:
+            return jsonify({'error': f'count must be between 1 and {MAX_SERIES_OCCURRENCES}'}), 400
+
+        mode = data.get('mode', 'all_or_nothing')
+        if mode not in ('all_or_nothing', 'best_effort'):
+            return jsonify({'error': 'mode must be all_or_nothing or best_effort'}), 400
+
+        requested_resource_id = None
+        if data.get('resource_id'):
+            try:
+                requested_resource_id = uuid.UUID(str(data['resource_id']))
+            except ValueError:
+                return jsonify({'error': 'Invalid resource_id'}), 400
+
+        notes = data.get('notes', '').strip() if data.get('notes') else None
+
+        dates = expand_recurrence(start_date, frequency, interval, count)
+        appointments, rejected = book_series(
+            service, uuid.UUID(current_user_id), dates, appointment_time, notes=notes,
+            requested_resource_id=requested_resource_id, all_or_nothing=(mode == 'all_or_nothing')
+        )
+
+        if not appointments:
+            rollback_request()
+            return jsonify({
+                'error': 'No appointments were booked' if len(rejected) == count
+                else 'Some occurrences are not available; nothing was booked',
+                'rejected': rejected
+            }), 409
+
+        # Serialize before the commit expires every row (which would reload them one by one)
+        appointments_data = [appointment.to_dict() for appointment in appointments]
+        db.session.commit()
+
+        for appointment in appointments_data:
+            slot_cache.invalidate_date(parse_date(appointment['appointment_date']))
+
+        for appointment_data in appointments_data:
+            event_broker.publish('appointment.created', appointment_data)
+
+        return jsonify({
+            'message': f'{len(appointments)} appointment(s) booked',
+            'series_id': appointments_data[0]['series_id'],
+            'appointments': appointments_data,
+            'count': len(appointments),
+            'rejected': rejected
+        }), 201
+
+    except IntegrityError as e:
+        rollback_request()
+        if not is_exclusion_violation(e):
+            return jsonify({'error': 'Failed to create appointment series', 'message': str(e)}), 500
+        return jsonify({'error': 'Time slot conflicts with an existing appointment. Please retry'}), 409
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create appointment series', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/holds', methods=['POST'])
+@jwt_required()
+def create_slot_hold():
+    """
+    Hold a time slot while the client completes the booking
+    POST /api/appointments/holds
+    Body: { service_id, appointment_date, appointment_time }
+    The hold expires after SLOT_HOLD_TTL seconds and replaces the client's previous holds
+    (except waitlist offers).
+    Confirm it with POST /api/appointments and the returned hold id as hold_id
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        # Validate required fields
+        service_id = data.get('service_id')
+        date_str = data.get('appointment_date')
+        time_str = data.get('appointment_time')
+
+        if not service_id:
+            return jsonify({'error': 'service_id is required'}), 400
+
+        if not date_str:
+            return jsonify({'error': 'appointment_date is required'}), 400
+
+        if not time_str:
+            return jsonify({'error': 'appointment_time is required'}), 400
+
+        # Parse and validate date
+        appointment_date = parse_date(date_str)
+        if not appointment_date:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        # Check if date is in the past
+        if appointment_date < get_date_today():
+            return jsonify({'error': 'Cannot book appointments in the past'}), 400
+
+        # Parse and validate time
+        appointment_time = parse_time(time_str)
+        if not appointment_time:
+            return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
+
+        # Verify service exists and is active
+        service = Service.query.get(service_id)
+        if not service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        if not service.active:
+            return jsonify({'error': 'Service is not active'}), 400
+
+        # Check if date is available
+        if not is_date_available(appointment_date):
+            return jsonify({'error': 'Selected date is not available for appointments'}), 400
+
+        # Serialize with bookings and other holds on this date
+        lock_day_occupancy(appointment_date)
+
+        # Release the client's previous checkout holds; waitlist offers stay until confirmed or withdrawn
+        previous_holds = SlotHold.query.filter(
+            SlotHold.client_id == current_user_id,
+            ~is_offer_hold()
+        ).all()
+        released_dates = {previous_hold.hold_date for previous_hold in previous_holds}
+        for previous_hold in previous_holds:
+            db.session.delete(previous_hold)
+        db.session.flush()
+
+        # The slot must be one that is currently offered
+        windows = load_business_windows(appointment_date)
+        schedule = load_busy_schedule(appointment_date)
+        pool = load_resource_pool()
+        start = time_to_minutes(appointment_time)
+        if start not in pool.free_starts(schedule, windows, service.duration, get_slot_step(), service.id):
+            db.session.rollback()
+            return jsonify({'error': 'Selected time is no longer available'}), 409
+
+        # With resources, the hold reserves one qualifying resource
+        resource_id = None
+        if pool.enabled:
+            resource_id = choose_resource(pool, schedule, service.id, start, service.duration)
+
+        new_hold = SlotHold(
+            client_id=current_user_id,
+            service_id=service.id,
+            resource_id=uuid.UUID(resource_id) if resource_id else None,
+            hold_date=appointment_date,
+            hold_time=appointment_time,
+            expires_at=get_datetime_now() + timedelta(seconds=current_app.config['SLOT_HOLD_TTL'])
+        )
+
+        db.session.add(new_hold)
+        db.session.commit()
+
+        for hold_date in released_dates | {appointment_date}:
+            slot_cache.invalidate_date(hold_date)
+
+        return jsonify({
+            'message': 'Time slot held successfully',
+            'hold': new_hold.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to hold time slot', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/holds/<hold_id>', methods=['DELETE'])
+@jwt_required()
+def release_slot_hold(hold_id):
+    """
+    Release a slot hold before it expires
+    DELETE /api/appointments/holds/<hold_id>
+    Releasing a waitlist offer puts its entry back on the waitlist
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        hold = SlotHold.query.get(hold_id)
+
+        if not hold:
+            return jsonify({'error': 'Hold not found'}), 404
+
+        # Users can only release their own holds, admins can release all
+        if user.role != 'admin' and str(hold.client_id) != current_user_id:
+            return jsonify({'error': 'Access denied'}), 403
+
+        hold_date = hold.hold_date
+        release_waitlist_offer(hold)
+        db.session.delete(hold)
+        db.session.commit()
+
+        slot_cache.invalidate_date(hold_date)
+
+        return jsonify({
+            'message': 'Hold released successfully'
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to release hold', 'message': str(e)}), 500
+
+
 @appointments_bp.route('/<appointment_id>', methods=['PUT'])
 @jwt_required()
 def update_appointment(appointment_id):
     """
     Update an appointment
     PUT /api/appointments/<appointment_id>
-    Body: { status, notes, appointment_date, appointment_time } (all optional)
+    Body: { status, notes, appointment_date, appointment_time, resource_id } (all optional)
     Clients can only cancel their appointments
     Admins can update any field
     """
@@ -289,6 +1139,10 @@ def update_appointment(appointment_id):
         appointment = Appointment.query.get(appointment_id)
 
         if not appointment:
+            # Archived history is read-only; only say so to whoever may see it
+            archived = db.session.get(ArchivedAppointment, appointment_id)
+            if archived and (user.role == 'admin' or str(archived.client_id) == current_user_id):
+                return jsonify({'error': ARCHIVED_ERROR}), 409
             return jsonify({'error': 'Appointment not found'}), 404
 
         # Check permissions
@@ -302,6 +1156,13 @@ def update_appointment(appointment_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
+        # Remember the booked slot so the occupancy can follow any change
+        previous_slot = (
+            appointment.appointment_date, appointment.appointment_time, appointment.status, appointment.resource_id
+        )
+        previous_rollup_key = rollup_key(appointment)
+        requested_resource_id = None
+
         # Clients can only cancel
         if is_owner and not is_admin:
             if 'status' in data:
@@ -360,11 +1221,85 @@ def update_appointment(appointment_id):
 
                 appointment.appointment_time = new_time
 
+            # Update resource
+            if data.get('resource_id'):
+                try:
+                    requested_resource_id = uuid.UUID(str(data['resource_id']))
+                except ValueError:
+                    return jsonify({'error': 'Invalid resource_id'}), 400
+
+        current_slot = (
+            appointment.appointment_date, appointment.appointment_time, appointment.status,
+            requested_resource_id or appointment.resource_id
+        )
+        slot_changed = previous_slot != current_slot
+        if slot_changed:
+            if previous_slot[:2] != (appointment.appointment_date, appointment.appointment_time):
+                appointment.set_time_range(appointment.service.duration)
+
+            # Keep the booked resource when it is still free, otherwise move to another qualifying one
+            with db.session.no_autoflush:
+                pool = load_resource_pool()
+                if pool.enabled and appointment.status in ACTIVE_STATUSES:
+                    lock_day_occupancy(appointment.appointment_date)
+                    schedule = load_busy_schedule(appointment.appointment_date, include_holds=False)
+                    resource_id = choose_resource(
+                        pool, schedule.without(appointment.id), appointment.service_id,
+                        time_to_minutes(appointment.appointment_time), appointment.service.duration,
+                        requested_resource_id=requested_resource_id, preferred_resource_id=appointment.resource_id
+                    )
+                    if not resource_id:
+                        db.session.rollback()
+                        return jsonify({'error': 'No staff member is available for this service at the selected time'}), 409
+                    appointment.resource_id = uuid.UUID(resource_id)
+                elif appointment.status in ACTIVE_STATUSES:
+                    start = time_to_minutes(appointment.appointment_time)
+                    has_conflict, conflict_msg = check_locked_conflict(
+                        appointment.appointment_date, start, start + appointment.service.duration,
+                        exclude_appointment_id=appointment.id
+                    )
+                    if has_conflict:
+                        db.session.rollback()
+                        return jsonify({'error': conflict_msg}), 409
+
+            # Reactivations and reschedules in the same lane are rejected by the exclusion constraint on overlap
+            try:
+                db.session.flush()
+            except IntegrityError as e:
+                db.session.rollback()
+                if not is_exclusion_violation(e):
+                    raise
+                return jsonify({'error': 'Time slot conflicts with an existing appointment'}), 409
+
+            sync_appointment_occupancy(appointment, previous_date=previous_slot[0])
+            apply_appointment_rollup(previous_rollup_key, appointment)
+
+        # A cancellation frees time for the waitlist: offer it or book it in the same transaction
+        freed = appointment.status == 'cancelled' and previous_rollup_key[2] in ACTIVE_STATUSES
+        backfill = backfill_cancellation(appointment) if freed else None
+        client_ids = [appointment.client_id] + ([backfill[0].client_id] if backfill else [])
+
+        bump_appointment_versions(client_ids)
         db.session.commit()
 
+        if slot_changed:
+            slot_cache.invalidate_date(previous_slot[0])
+            if appointment.appointment_date != previous_slot[0]:
+                slot_cache.invalidate_date(appointment.appointment_date)
+
+        appointment_data = appointment.to_dict()
+        cancelled = appointment.status == 'cancelled' and previous_rollup_key[2] != 'cancelled'
+        event_broker.publish('appointment.cancelled' if cancelled else 'appointment.updated', appointment_data)
+
+        if backfill:
+            entry, backfilled_appointment = backfill
+            if backfilled_appointment:
+                event_broker.publish('appointment.created', backfilled_appointment.to_dict())
+            event_broker.publish('waitlist.matched', entry.to_dict())
+
         return jsonify({
             'message': 'Appointment updated successfully',
-            'appointment': appointment.to_dict()
+            'appointment': appointment_data
         }), 200
 
     except Exception as e:
@@ -372,6 +1307,219 @@ def update_appointment(appointment_id):
         return jsonify({'error': 'Failed to update appointment', 'message': str(e)}), 500
 
 
+@appointments_bp.route('/bulk-status', methods=['POST'])
+@admin_required
+def bulk_update_status():
+    """
+    Change the status of many appointments at once (admin only)
+    POST /api/appointments/bulk-status
+    Body: { status, ids } or { status, filter: { date, from, to, status, service_id } }
+    Valid rows are updated with one UPDATE in a single transaction; rows that
+    fail validation are reported per id and left unchanged. Cancelled or
+    completed appointments cannot be reactivated in bulk (use PUT, which
+    checks the slot is still free)
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        valid_statuses = ['pending', 'confirmed', 'cancelled', 'completed']
+        new_status = data.get('status')
+        if new_status not in valid_statuses:
+            return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
+
+        ids = data.get('ids')
+        filters = data.get('filter')
+        if (ids is None) == (filters is None):
+            return jsonify({'error': 'Provide either ids or filter'}), 400
+
+        failed = []
+        query = db.session.query(
+            Appointment.id, Appointment.appointment_date, Appointment.service_id, Appointment.status,
+            Appointment.client_id
+        )
+
+        if ids is not None:
+            if not isinstance(ids, list) or not ids:
+                return jsonify({'error': 'ids must be a non-empty list'}), 400
+            if len(ids) > MAX_BULK_APPOINTMENTS:
+                return jsonify({'error': f'Cannot update more than {MAX_BULK_APPOINTMENTS} appointments at once'}), 400
+
+            requested_ids = {}
+            for appointment_id in ids:
+                try:
+                    requested_ids[uuid.UUID(str(appointment_id))] = str(appointment_id)
+                except ValueError:
+                    failed.append({'id': str(appointment_id), 'error': 'Invalid appointment id'})
+            query = query.filter(Appointment.id.in_(list(requested_ids)))
+        else:
+            if not isinstance(filters, dict) or not filters:
+                return jsonify({'error': 'filter must name at least one of date, from, to, status, service_id'}), 400
+
+            if filters.get('date'):
+                filter_date = parse_date(filters['date'])
+                if not filter_date:
+                    return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+                query = query.filter(Appointment.appointment_date == filter_date)
+
+            start_date, end_date, error = parse_date_range(filters)
+            if error:
+                return jsonify({'error': error}), 400
+            if start_date:
+                query = query.filter(Appointment.appointment_date >= start_date)
+            if end_date:
+                query = query.filter(Appointment.appointment_date <= end_date)
+
+            if filters.get('status'):
+                if filters['status'] not in valid_statuses:
+                    return jsonify({'error': 'Invalid filter status'}), 400
+                query = query.filter(Appointment.status == filters['status'])
+
+            if filters.get('service_id'):
+                try:
+                    query = query.filter(Appointment.service_id == uuid.UUID(str(filters['service_id'])))
+                except ValueError:
+                    return jsonify({'error': 'Invalid service_id'}), 400
+
+        # Lock the targeted rows (in id order, so concurrent bulk calls cannot deadlock)
+        rows = query.order_by(Appointment.id).limit(MAX_BULK_APPOINTMENTS + 1).with_for_update().all()
+        if len(rows) > MAX_BULK_APPOINTMENTS:
+            db.session.rollback()
+            return jsonify({'error': f'Filter matches more than {MAX_BULK_APPOINTMENTS} appointments'}), 400
+
+        if ids is not None:
+            found = {row.id for row in rows}
+            missing = [appointment_id for appointment_id in requested_ids if appointment_id not in found]
+            archived = set(db.session.scalars(
+                db.select(ArchivedAppointment.id).where(ArchivedAppointment.id.in_(missing))
+            )) if missing else set()
+            failed.extend(
+                {'id': requested_ids[appointment_id],
+                 'error': ARCHIVED_ERROR if appointment_id in archived else 'Appointment not found'}
+                for appointment_id in missing
+            )
+
+        reactivating = new_status in ACTIVE_STATUSES
+        update_ids = []
+        updated_clients = set()
+        unchanged = 0
+        released = {}
+        rollup_changes = []
+        for row in rows:
+            if row.status == new_status:
+                unchanged += 1
+                continue
+
+            if reactivating and row.status not in ACTIVE_STATUSES:
+                failed.append({'id': str(row.id), 'error': f'Cannot reactivate a {row.status} appointment in bulk'})
+                continue
+
+            update_ids.append(row.id)
+            updated_clients.add(row.client_id)
+            if row.status in ACTIVE_STATUSES and not reactivating:
+                released.setdefault(row.appointment_date, set()).add(str(row.id))
+            rollup_changes.append(((row.appointment_date, row.service_id, row.status), -1))
+            rollup_changes.append(((row.appointment_date, row.service_id, new_status), 1))
+
+        if update_ids:
+            db.session.query(Appointment).filter(
+                Appointment.id.in_(update_ids)
+            ).update({Appointment.status: new_status}, synchronize_session=False)
+
+            release_occupancy(released)
+            apply_rollup_changes(rollup_changes)
+            bump_appointment_versions(updated_clients)
+
+        db.session.commit()
+
+        for released_date in released:
+            slot_cache.invalidate_date(released_date)
+
+        if update_ids:
+            event_broker.publish('appointments.bulk_updated', {
+                'ids': [str(appointment_id) for appointment_id in update_ids],
+                'status': new_status
+            })
+
+        return jsonify({
+            'message': f'{len(update_ids)} appointment(s) updated',
+            'updated': len(update_ids),
+            'unchanged': unchanged,
+            'failed': failed
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update appointments', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/import', methods=['POST'])
+@admin_required
+def import_appointments_file():
+    """
+    Bulk import appointments from CSV or JSON (admin only)
+    POST /api/appointments/import
+    Body: a multipart 'file' upload, a text/csv body, or a JSON list of rows
+    Query params:
+        - format: csv or json (optional, guessed from the file name or content type)
+        - dry_run: validate only (optional, default=false)
+    Row fields: client_email or client_id, service_id or service_name,
+    appointment_date, appointment_time, status (default confirmed), notes, resource_id
+    Valid rows are inserted together; rejected rows are listed by row number.
+    Business hours are not enforced, so past bookings can be migrated
+    """
+    try:
+        upload = request.files.get('file')
+        if upload:
+            content = upload.read().decode('utf-8-sig')
+            file_format = 'json' if (upload.filename or '').lower().endswith('.json') else 'csv'
+        else:
+            content = request.get_data(as_text=True)
+            file_format = 'json' if request.is_json else 'csv'
+
+        file_format = request.args.get('format', file_format).lower()
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+
+        if not content.strip():
+            return jsonify({'error': 'No data provided'}), 400
+
+        try:
+            rows = parse_import_file(content, file_format)
+        except (ImportFormatError, csv.Error) as e:
+            return jsonify({'error': str(e)}), 400
+
+        if not rows:
+            return jsonify({'error': 'No rows to import'}), 400
+
+        if len(rows) > MAX_IMPORT_ROWS:
+            return jsonify({'error': f'Cannot import more than {MAX_IMPORT_ROWS} rows at once'}), 400
+
+        try:
+            report = import_appointments(rows, dry_run=dry_run)
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_exclusion_violation(e):
+                raise
+            return jsonify({'error': 'Import conflicted with a concurrent booking, nothing was imported. Please retry'}), 409
+
+        for imported_date in report['dates']:
+            slot_cache.invalidate_date(parse_date(imported_date))
+
+        if report['imported']:
+            event_broker.publish('appointments.imported', {'count': report['imported'], 'dates': report['dates']})
+
+        return jsonify({
+            'message': f"{report['imported']} appointment(s) imported",
+            **report
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import appointments', 'message': str(e)}), 500
+
+
 @appointments_bp.route('/<appointment_id>', methods=['DELETE'])
 @admin_required
 def delete_appointment(appointment_id):
@@ -383,11 +1531,24 @@ def delete_appointment(appointment_id):
         appointment = Appointment.query.get(appointment_id)
 
         if not appointment:
+            if db.session.get(ArchivedAppointment, appointment_id):
+                return jsonify({'error': ARCHIVED_ERROR}), 409
             return jsonify({'error': 'Appointment not found'}), 404
 
+        appointment_date = appointment.appointment_date
+        sync_appointment_occupancy(appointment, deleted=True)
+        apply_appointment_rollup(rollup_key(appointment), deleted=True)
+        bump_appointment_versions([appointment.client_id])
         db.session.delete(appointment)
         db.session.commit()
 
+        slot_cache.invalidate_date(appointment_date)
+
+        event_broker.publish('appointment.deleted', {
+            'id': appointment_id,
+            'appointment_date': appointment_date.isoformat()
+        })
+
         return jsonify({
             'message': 'Appointment deleted successfully'
         }), 200
@@ -403,47 +1564,166 @@ def get_appointment_stats():
     """
     Get appointment statistics (admin only)
     GET /api/appointments/stats
-    Returns counts by status and upcoming appointments
+    Query params:
+        - from, to: only count appointments in this date range YYYY-MM-DD, inclusive (optional)
+        - breakdown: 'service' to add per-service counts and revenue (optional)
+    Returns counts by status, upcoming appointments and revenue, read from the
+    daily rollups so the cost depends on the number of days, not appointments
     """
     try:
+        start_date, end_date, error = parse_date_range(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        breakdown = request.args.get('breakdown')
+        if breakdown and breakdown != 'service':
+            return jsonify({'error': "breakdown must be 'service'"}), 400
+
         today = get_date_today()
+        next_week = today + timedelta(days=7)
+        statuses = ['pending', 'confirmed', 'cancelled', 'completed']
+        stats = DailyServiceStats
+        active = stats.pending + stats.confirmed
+
+        def total_of(expression, *conditions):
+            summed = db.func.sum(expression)
+            return db.func.coalesce(summed.filter(*conditions) if conditions else summed, 0)
+
+        # Every figure is an aggregate over one scan of the rollup rows
+        aggregates = [total_of(getattr(stats, status)).label(status) for status in statuses] + [
+            total_of(active, stats.stats_date == today).label('today'),
+            total_of(active, stats.stats_date.between(today, next_week)).label('upcoming_week'),
+            total_of(stats.revenue).label('revenue'),
+            total_of(stats.pending + stats.confirmed + stats.cancelled + stats.completed).label('total'),
+        ]
+
+        if breakdown == 'service':
+            query = db.session.query(Service.id, Service.name, *aggregates).select_from(stats).join(
+                Service, stats.service_id == Service.id
+            )
+        else:
+            query = db.session.query(*aggregates)
+
+        if start_date:
+            query = query.filter(stats.stats_date >= start_date)
+        if end_date:
+            query = query.filter(stats.stats_date <= end_date)
+
+        if breakdown == 'service':
+            rows = query.group_by(Service.id, Service.name).order_by(Service.name).all()
+        else:
+            rows = [query.one()]
+
+        # Totals are the sum of the per-service groups when broken down
+        def total(field):
+            return int(sum(getattr(row, field) for row in rows))
+
+        response = {
+            'by_status': {status: total(status) for status in statuses},
+            'today': total('today'),
+            'upcoming_week': total('upcoming_week'),
+            'total_revenue': float(sum(row.revenue for row in rows)),
+            'total_appointments': total('total')
+        }
+
+        if start_date or end_date:
+            response['from'] = start_date.isoformat() if start_date else None
+            response['to'] = end_date.isoformat() if end_date else None
+
+        if breakdown == 'service':
+            response['by_service'] = [{
+                'service_id': str(row.id),
+                'service_name': row.name,
+                'by_status': {status: int(getattr(row, status)) for status in statuses},
+                'total_revenue': float(row.revenue),
+                'total_appointments': int(row.total)
+            } for row in rows]
+
+        return jsonify(response), 200
 
-        # Count by status
-        pending_count = Appointment.query.filter_by(status='pending').count()
-        confirmed_count = Appointment.query.filter_by(status='confirmed').count()
-        cancelled_count = Appointment.query.filter_by(status='cancelled').count()
-        completed_count = Appointment.query.filter_by(status='completed').count()
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch statistics', 'message': str(e)}), 500
 
-        # Today's appointments
-        today_count = Appointment.query.filter_by(appointment_date=today).filter(
-            Appointment.status.in_(['pending', 'confirmed'])
-        ).count()
 
-        # Upcoming appointments (next 7 days)
-        from datetime import timedelta
-        next_week = today + timedelta(days=7)
-        upcoming_count = Appointment.query.filter(
-            Appointment.appointment_date.between(today, next_week)
+@appointments_bp.route('/report', methods=['GET'])
+@admin_required
+def get_appointment_report():
+    """
+    Get a day-by-day appointment report from the daily rollups (admin only)
+    GET /api/appointments/report
+    Query params:
+        - from, to: date range YYYY-MM-DD, inclusive (optional, default=last 30 days)
+        - service_id: only this service (optional)
+    """
+    try:
+        start_date, end_date, error = parse_date_range(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+
+        end_date = end_date or get_date_today()
+        start_date = start_date or end_date - timedelta(days=29)
+        if start_date > end_date:
+            return jsonify({'error': 'to must not be before from'}), 400
+
+        if (end_date - start_date).days + 1 > MAX_REPORT_DAYS:
+            return jsonify({'error': f'Date range cannot exceed {MAX_REPORT_DAYS} days'}), 400
+
+        stats = DailyServiceStats
+        statuses = ['pending', 'confirmed', 'cancelled', 'completed']
+        query = db.session.query(
+            stats.stats_date,
+            *[db.func.sum(getattr(stats, status)).label(status) for status in statuses],
+            db.func.sum(stats.revenue).label('revenue'),
+            db.func.sum(stats.booked_minutes).label('booked_minutes')
         ).filter(
-            Appointment.status.in_(['pending', 'confirmed'])
-        ).count()
+            stats.stats_date.between(start_date, end_date)
+        )
 
-        # Calculate total revenue from completed appointments
-        completed_appointments = Appointment.query.filter_by(status='completed').all()
-        total_revenue = sum(float(apt.service.price) for apt in completed_appointments if apt.service)
+        service_id = request.args.get('service_id')
+        if service_id:
+            try:
+                query = query.filter(stats.service_id == uuid.UUID(service_id))
+            except ValueError:
+                return jsonify({'error': 'Invalid service_id'}), 400
+
+        rows = query.group_by(stats.stats_date).order_by(stats.stats_date).all()
+
+        days = [{
+            'date': row.stats_date.isoformat(),
+            'by_status': {status: int(getattr(row, status)) for status in statuses},
+            'total_appointments': int(sum(getattr(row, status) for status in statuses)),
+            'revenue': float(row.revenue),
+            'booked_minutes': int(row.booked_minutes)
+        } for row in rows]
 
         return jsonify({
-            'by_status': {
-                'pending': pending_count,
-                'confirmed': confirmed_count,
-                'cancelled': cancelled_count,
-                'completed': completed_count
-            },
-            'today': today_count,
-            'upcoming_week': upcoming_count,
-            'total_revenue': total_revenue,
-            'total_appointments': Appointment.query.count()
+            'from': start_date.isoformat(),
+            'to': end_date.isoformat(),
+            'service_id': service_id,
+            'days': days,
+            'totals': {
+                'by_status': {status: sum(day['by_status'][status] for day in days) for status in statuses},
+                'total_appointments': sum(day['total_appointments'] for day in days),
+                'revenue': sum(day['revenue'] for day in days),
+                'booked_minutes': sum(day['booked_minutes'] for day in days)
+            }
         }), 200
 
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch statistics', 'message': str(e)}), 500
+        return jsonify({'error': 'Failed to fetch report', 'message': str(e)}), 500
+
+
+@appointments_bp.route('/slot-cache', methods=['GET'])
+@admin_required
+def get_slot_cache_stats():
+    """
+    Get slot cache counters (admin only)
+    GET /api/appointments/slot-cache
+    """
+    try:
+        return jsonify({
+            'slot_cache': slot_cache.stats()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch slot cache stats', 'message': str(e)}), 500
@@ -5,12 +5,28 @@ Handles user registration, login, and profile management
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from app.models import db, User
+from app.idempotency import idempotent
 from app.utils import validate_email, validate_password, validate_phone
+from app.versions import APPOINTMENTS_SCOPE, client_scope, bump_versions
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def drop_access_token(body):
+    """Keep the access token out of a stored register response"""
+    body.pop('access_token', None)
+    return body
+
+
+def reissue_access_token(body):
+    """Give a replayed register response a fresh access token"""
+    if body.get('user'):
+        body['access_token'] = create_access_token(identity=str(body['user']['id']))
+    return body
+
+
 @auth_bp.route('/register', methods=['POST'])
+@idempotent(redact=drop_access_token, restore=reissue_access_token)
 def register():
     """
     Register a new user
@@ -187,6 +203,8 @@ def update_profile():
                     return jsonify({'error': error_msg}), 400
             user.phone = phone
 
+        # Appointments embed their client's contact details
+        bump_versions(APPOINTMENTS_SCOPE, client_scope(user.id))
         db.session.commit()
 
         return jsonify({
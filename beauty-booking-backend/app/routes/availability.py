@@ -5,6 +5,7 @@ Handles business hours configuration
 from flask import Blueprint, request, jsonify
 from app.models import db, Availability
 from app.utils import admin_required, parse_time
+from app.slot_cache import slot_cache
 
 availability_bp = Blueprint('availability', __name__)
 
@@ -125,6 +126,8 @@ def create_availability():
         db.session.add(new_schedule)
         db.session.commit()
 
+        slot_cache.invalidate_weekday(day_of_week)
+
         return jsonify({
             'message': 'Availability schedule created successfully',
             'schedule': new_schedule.to_dict()
@@ -153,6 +156,8 @@ def update_availability(availability_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
+        previous_day_of_week = schedule.day_of_week
+
         # Update day_of_week if provided
         if 'day_of_week' in data:
             try:
@@ -186,6 +191,9 @@ def update_availability(availability_id):
 
         db.session.commit()
 
+        slot_cache.invalidate_weekday(previous_day_of_week)
+        slot_cache.invalidate_weekday(schedule.day_of_week)
+
         return jsonify({
             'message': 'Availability schedule updated successfully',
             'schedule': schedule.to_dict()
@@ -209,9 +217,12 @@ def delete_availability(availability_id):
         if not schedule:
             return jsonify({'error': 'Availability schedule not found'}), 404
 
+        day_of_week = schedule.day_of_week
         db.session.delete(schedule)
         db.session.commit()
 
+        slot_cache.invalidate_weekday(day_of_week)
+
         return jsonify({
             'message': 'Availability schedule deleted successfully'
         }), 200
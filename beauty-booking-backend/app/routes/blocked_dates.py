@@ -5,6 +5,7 @@ Handles blocked dates (holidays, closed days)
 from flask import Blueprint, request, jsonify
 from app.models import db, BlockedDate
 from app.utils import admin_required, parse_date, get_date_today
+from app.slot_cache import slot_cache
 
 blocked_dates_bp = Blueprint('blocked_dates', __name__)
 
@@ -96,6 +97,8 @@ def create_blocked_date():
         db.session.add(new_blocked_date)
         db.session.commit()
 
+        slot_cache.invalidate_date(blocked_date)
+
         return jsonify({
             'message': 'Date blocked successfully',
             'blocked_date': new_blocked_date.to_dict()
@@ -124,6 +127,8 @@ def update_blocked_date(blocked_date_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
+        previous_date = blocked_date_record.blocked_date
+
         # Update date if provided
         if 'blocked_date' in data:
             new_date = parse_date(data['blocked_date'])
@@ -146,6 +151,9 @@ def update_blocked_date(blocked_date_id):
 
         db.session.commit()
 
+        slot_cache.invalidate_date(previous_date)
+        slot_cache.invalidate_date(blocked_date_record.blocked_date)
+
         return jsonify({
             'message': 'Blocked date updated successfully',
             'blocked_date': blocked_date_record.to_dict()
@@ -169,9 +177,12 @@ def delete_blocked_date(blocked_date_id):
         if not blocked_date:
             return jsonify({'error': 'Blocked date not found'}), 404
 
+        unblocked_date = blocked_date.blocked_date
         db.session.delete(blocked_date)
         db.session.commit()
 
+        slot_cache.invalidate_date(unblocked_date)
+
         return jsonify({
             'message': 'Date unblocked successfully'
         }), 200
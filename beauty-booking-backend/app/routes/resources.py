@@ -0,0 +1,212 @@
+"""
+Resources Routes
+Handles staff members and chairs that perform services in parallel
+"""
+from flask import Blueprint, request, jsonify
+from app.models import db, Resource, Service
+from app.utils import admin_required
+from app.slot_cache import slot_cache
+
+resources_bp = Blueprint('resources', __name__)
+
+
+def load_services(service_ids):
+    """
+    Load the services a resource can perform
+    Args:
+        service_ids: list of service UUIDs
+    Returns: (list of Service objects or None, error_message or None)
+    """
+    if not isinstance(service_ids, list):
+        return None, 'service_ids must be a list'
+
+    try:
+        services = Service.query.filter(Service.id.in_(service_ids)).all() if service_ids else []
+    except Exception:
+        db.session.rollback()
+        return None, 'Invalid service_ids'
+
+    if len(services) != len(set(service_ids)):
+        return None, 'One or more services not found'
+
+    return services, None
+
+
+@resources_bp.route('', methods=['GET'])
+def get_resources():
+    """
+    Get resources (public endpoint)
+    GET /api/resources
+    Query params:
+        - active (optional, default=true)
+        - service_id: only resources that perform this service (optional)
+    """
+    try:
+        active_only = request.args.get('active', 'true').lower() == 'true'
+        service_id = request.args.get('service_id')
+
+        query = Resource.query
+        if active_only:
+            query = query.filter_by(active=True)
+
+        resources = query.order_by(Resource.name, Resource.id).all()
+
+        # A resource without services performs every service
+        if service_id:
+            resources = [
+                resource for resource in resources
+                if not resource.services or any(str(service.id) == service_id for service in resource.services)
+            ]
+
+        return jsonify({
+            'resources': [resource.to_dict() for resource in resources],
+            'count': len(resources)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch resources', 'message': str(e)}), 500
+
+
+@resources_bp.route('/<resource_id>', methods=['GET'])
+def get_resource(resource_id):
+    """
+    Get a single resource by ID (public endpoint)
+    GET /api/resources/<resource_id>
+    """
+    try:
+        resource = Resource.query.get(resource_id)
+
+        if not resource:
+            return jsonify({'error': 'Resource not found'}), 404
+
+        return jsonify({
+            'resource': resource.to_dict()
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch resource', 'message': str(e)}), 500
+
+
+@resources_bp.route('', methods=['POST'])
+@admin_required
+def create_resource():
+    """
+    Create a new resource (admin only)
+    POST /api/resources
+    Body: { name, service_ids (optional, default=all services), active (optional) }
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        name = data.get('name', '').strip()
+
+        if not name:
+            return jsonify({'error': 'Resource name is required'}), 400
+
+        if len(name) > 100:
+            return jsonify({'error': 'Resource name is too long'}), 400
+
+        services, error = load_services(data.get('service_ids', []))
+        if error:
+            return jsonify({'error': error}), 400
+
+        new_resource = Resource(
+            name=name,
+            active=bool(data.get('active', True)),
+            services=services
+        )
+
+        db.session.add(new_resource)
+        db.session.commit()
+
+        # Slots now count this resource's capacity
+        slot_cache.clear()
+
+        return jsonify({
+            'message': 'Resource created successfully',
+            'resource': new_resource.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to create resource', 'message': str(e)}), 500
+
+
+@resources_bp.route('/<resource_id>', methods=['PUT'])
+@admin_required
+def update_resource(resource_id):
+    """
+    Update a resource (admin only)
+    PUT /api/resources/<resource_id>
+    Body: { name, service_ids, active } (all optional)
+    """
+    try:
+        resource = Resource.query.get(resource_id)
+
+        if not resource:
+            return jsonify({'error': 'Resource not found'}), 404
+
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        if 'name' in data:
+            name = data['name'].strip()
+            if not name:
+                return jsonify({'error': 'Resource name cannot be empty'}), 400
+            if len(name) > 100:
+                return jsonify({'error': 'Resource name is too long'}), 400
+            resource.name = name
+
+        if 'service_ids' in data:
+            services, error = load_services(data['service_ids'])
+            if error:
+                return jsonify({'error': error}), 400
+            resource.services = services
+
+        if 'active' in data:
+            resource.active = bool(data['active'])
+
+        db.session.commit()
+
+        slot_cache.clear()
+
+        return jsonify({
+            'message': 'Resource updated successfully',
+            'resource': resource.to_dict()
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update resource', 'message': str(e)}), 500
+
+
+@resources_bp.route('/<resource_id>', methods=['DELETE'])
+@admin_required
+def delete_resource(resource_id):
+    """
+    Delete a resource (admin only)
+    Actually soft-deletes by setting active=False; its booked appointments are kept
+    DELETE /api/resources/<resource_id>
+    """
+    try:
+        resource = Resource.query.get(resource_id)
+
+        if not resource:
+            return jsonify({'error': 'Resource not found'}), 404
+
+        resource.active = False
+        db.session.commit()
+
+        slot_cache.clear()
+
+        return jsonify({
+            'message': 'Resource deleted successfully'
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete resource', 'message': str(e)}), 500
@@ -2,10 +2,16 @@
 Services Routes
 Handles CRUD operations for beauty services
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
+from sqlalchemy.exc import IntegrityError
 from app.models import db, Service
-from app.utils import admin_required
+from app.utils import admin_required, is_exclusion_violation
+from app.occupancy import sync_service_occupancy
+from app.rollups import replace_rollups
+from app.slot_cache import slot_cache
+from app.service_catalog import service_catalog, CATALOG_LANGUAGES
+from app.versions import SERVICES_SCOPE, bump_versions
 
 services_bp = Blueprint('services', __name__)
 
@@ -18,6 +24,8 @@ def get_services():
     Query params:
         - active (optional, default=true)
         - lang (optional, default=en) - Language code: 'en' or 'es'
+    Served from the precompiled catalog cache with a strong ETag;
+    a matching If-None-Match is answered with 304
     """
     try:
         # Check if we should filter by active status
@@ -25,18 +33,20 @@ def get_services():
 
         # Get language parameter
         lang = request.args.get('lang', 'en')
-        if lang not in ['en', 'es']:
+        if lang not in CATALOG_LANGUAGES:
             lang = 'en'
 
-        if active_only:
-            services = Service.query.filter_by(active=True).order_by(Service.name).all()
+        catalog = service_catalog.get(lang, active_only)
+
+        if catalog.etag in request.if_none_match:
+            response = current_app.response_class(status=304)
         else:
-            services = Service.query.order_by(Service.name).all()
+            response = current_app.response_class(catalog.body, status=200, mimetype='application/json')
 
-        return jsonify({
-            'services': [service.to_dict(lang=lang) for service in services],
-            'count': len(services)
-        }), 200
+        # Public catalog: shared caches may keep it but must revalidate
+        response.set_etag(catalog.etag)
+        response.headers['Cache-Control'] = 'public, no-cache'
+        return response
 
     except Exception as e:
         return jsonify({'error': 'Failed to fetch services', 'message': str(e)}), 500
@@ -134,6 +144,8 @@ def create_service():
         db.session.add(new_service)
         db.session.commit()
 
+        service_catalog.invalidate()
+
         return jsonify({
             'message': 'Service created successfully',
             'service': new_service.to_dict()
@@ -162,6 +174,9 @@ def update_service(service_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
+        rebuilt_dates = []
+        rollups_stale = False
+
         # Update name if provided
         if 'name' in data:
             name = data['name'].strip()
@@ -181,6 +196,7 @@ def update_service(service_id):
                 price = float(data['price'])
                 if price < 0:
                     return jsonify({'error': 'Price must be positive'}), 400
+                rollups_stale = rollups_stale or price != float(service.price)
                 service.price = price
             except (ValueError, TypeError):
                 return jsonify({'error': 'Invalid price format'}), 400
@@ -193,10 +209,23 @@ def update_service(service_id):
                     return jsonify({'error': 'Duration must be greater than 0'}), 400
                 if duration > 480:
                     return jsonify({'error': 'Duration cannot exceed 480 minutes (8 hours)'}), 400
+                duration_changed = duration != service.duration
+                rollups_stale = rollups_stale or duration_changed
                 service.duration = duration
             except (ValueError, TypeError):
                 return jsonify({'error': 'Invalid duration format'}), 400
 
+            # Booked intervals of this service change length
+            if duration_changed:
+                try:
+                    db.session.flush()
+                    rebuilt_dates = sync_service_occupancy(service)
+                except IntegrityError as e:
+                    db.session.rollback()
+                    if not is_exclusion_violation(e):
+                        raise
+                    return jsonify({'error': 'New duration would overlap existing appointments'}), 409
+
         # Update image_url if provided
         if 'image_url' in data:
             service.image_url = data['image_url'].strip() if data['image_url'] else None
@@ -205,8 +234,22 @@ def update_service(service_id):
         if 'active' in data:
             service.active = bool(data['active'])
 
+        # Revenue and booked minutes of this service's rollups follow its price and duration
+        if rollups_stale:
+            db.session.flush()
+            replace_rollups(service_id=service.id)
+
+        # Appointments embed their service, so their ETags change too
+        bump_versions(SERVICES_SCOPE)
         db.session.commit()
 
+        service_catalog.invalidate()
+
+        # A new duration also moves other services' slots on the rebuilt dates
+        slot_cache.invalidate_service(service.id)
+        for rebuilt_date in rebuilt_dates:
+            slot_cache.invalidate_date(rebuilt_date)
+
         return jsonify({
             'message': 'Service updated successfully',
             'service': service.to_dict()
@@ -233,8 +276,12 @@ def delete_service(service_id):
 
         # Soft delete - just mark as inactive
         service.active = False
+        bump_versions(SERVICES_SCOPE)
         db.session.commit()
 
+        service_catalog.invalidate()
+        slot_cache.invalidate_service(service.id)
+
         return jsonify({
             'message': 'Service deleted successfully'
         }), 200
@@ -0,0 +1,173 @@
+"""
+Waitlist Routes
+Handles clients waiting for a slot to free up on a given date
+"""
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.models import db, WaitlistEntry, Service, User, SlotHold
+from app.idempotency import idempotent
+from app.slot_engine import time_to_minutes
+from app.slot_cache import slot_cache
+from app.utils import parse_date, parse_time, get_date_today
+
+waitlist_bp = Blueprint('waitlist', __name__)
+
+# Most entries a client can have waiting at once
+MAX_WAITING_ENTRIES = 10
+
+
+@waitlist_bp.route('', methods=['GET'])
+@jwt_required()
+def get_waitlist():
+    """
+    Get waitlist entries
+    GET /api/waitlist
+    Query params:
+        - status: waiting, offered or booked (optional)
+        - date: YYYY-MM-DD (optional)
+    Clients see their own entries, admins see every entry
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        query = WaitlistEntry.query
+        if user.role != 'admin':
+            query = query.filter_by(client_id=current_user_id)
+
+        status = request.args.get('status')
+        if status:
+            query = query.filter_by(status=status)
+
+        if request.args.get('date'):
+            window_date = parse_date(request.args['date'])
+            if not window_date:
+                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            query = query.filter_by(window_date=window_date)
+
+        entries = query.order_by(
+            WaitlistEntry.window_date, WaitlistEntry.window_start, WaitlistEntry.created_at
+        ).all()
+
+        return jsonify({
+            'entries': [entry.to_dict() for entry in entries],
+            'count': len(entries)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch waitlist', 'message': str(e)}), 500
+
+
+@waitlist_bp.route('', methods=['POST'])
+@jwt_required()
+@idempotent
+def join_waitlist():
+    """
+    Join the waitlist for a service on a date
+    POST /api/waitlist
+    Body: { service_id, date, start_time, end_time, auto_book (optional), notes (optional) }
+    When a cancellation frees time inside the window, the entry is either
+    booked directly (auto_book) or offered as a slot hold to confirm with
+    POST /api/appointments
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+
+        if not data:
+            return jsonify({'error': 'No data provided'}), 400
+
+        # Validate required fields
+        for field in ('service_id', 'date', 'start_time', 'end_time'):
+            if not data.get(field):
+                return jsonify({'error': f'{field} is required'}), 400
+
+        window_date = parse_date(data['date'])
+        if not window_date:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+
+        if window_date < get_date_today():
+            return jsonify({'error': 'Cannot join the waitlist for a past date'}), 400
+
+        window_start = parse_time(data['start_time'])
+        window_end = parse_time(data['end_time'])
+        if not window_start or not window_end:
+            return jsonify({'error': 'Invalid time format. Use HH:MM'}), 400
+
+        # Verify service exists and is active
+        service = Service.query.get(data['service_id'])
+        if not service:
+            return jsonify({'error': 'Service not found'}), 404
+
+        if not service.active:
+            return jsonify({'error': 'Service is not active'}), 400
+
+        if time_to_minutes(window_end) - time_to_minutes(window_start) < service.duration:
+            return jsonify({'error': 'The time window is shorter than the service'}), 400
+
+        waiting = WaitlistEntry.query.filter_by(client_id=current_user_id, status='waiting').count()
+        if waiting >= MAX_WAITING_ENTRIES:
+            return jsonify({'error': f'You can have at most {MAX_WAITING_ENTRIES} waitlist entries'}), 400
+
+        # Optional notes
+        notes = data.get('notes', '').strip() if data.get('notes') else None
+
+        new_entry = WaitlistEntry(
+            client_id=current_user_id,
+            service_id=service.id,
+            window_date=window_date,
+            window_start=window_start,
+            window_end=window_end,
+            auto_book=bool(data.get('auto_book', False)),
+            notes=notes
+        )
+
+        db.session.add(new_entry)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Joined the waitlist successfully',
+            'entry': new_entry.to_dict()
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to join waitlist', 'message': str(e)}), 500
+
+
+@waitlist_bp.route('/<entry_id>', methods=['DELETE'])
+@jwt_required()
+def leave_waitlist(entry_id):
+    """
+    Leave the waitlist, releasing a pending offer
+    DELETE /api/waitlist/<entry_id>
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+
+        entry = WaitlistEntry.query.get(entry_id)
+
+        if not entry:
+            return jsonify({'error': 'Waitlist entry not found'}), 404
+
+        # Users can only remove their own entries, admins can remove all
+        if user.role != 'admin' and str(entry.client_id) != current_user_id:
+            return jsonify({'error': 'Access denied'}), 403
+
+        hold = SlotHold.query.get(entry.hold_id) if entry.status == 'offered' and entry.hold_id else None
+        if hold:
+            db.session.delete(hold)
+        db.session.delete(entry)
+        db.session.commit()
+
+        if hold:
+            slot_cache.invalidate_date(hold.hold_date)
+
+        return jsonify({
+            'message': 'Left the waitlist successfully'
+        }), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to leave waitlist', 'message': str(e)}), 500
@@ -0,0 +1,132 @@
+"""
+Recurring Appointment Series
+Expands a recurrence rule and books every occurrence with batched checks
+"""
+import uuid
+from datetime import timedelta
+from app.models import db, Appointment
+from app.occupancy import lock_days_occupancy
+from app.rollups import apply_rollup_changes
+from app.slot_engine import (
+    BusySchedule, load_blocked_dates, load_weekly_windows, load_resource_pool, query_hold_intervals,
+    get_day_of_week, time_to_minutes
+)
+from app.utils import choose_resource
+from app.versions import bump_appointment_versions
+
+# Days between occurrences for an interval of 1
+FREQUENCIES = {'daily': 1, 'weekly': 7}
+
+MAX_SERIES_OCCURRENCES = 52
+MAX_SERIES_INTERVAL = 12
+
+
+def expand_recurrence(start_date, frequency, interval, count):
+    """
+    List the dates of a series
+    Args:
+        start_date: date of the first occurrence
+        frequency: 'daily' or 'weekly'
+        interval: repeat every `interval` days/weeks
+        count: number of occurrences
+    Returns: list of date objects
+    """
+    step = timedelta(days=FREQUENCIES[frequency] * interval)
+    return [start_date + step * index for index in range(count)]
+
+
+def book_series(service, client_id, dates, appointment_time, notes=None, requested_resource_id=None,
+                all_or_nothing=True):
+    """
+    Validate every occurrence in one pass and insert the accepted ones together
+    Blocked dates, business hours, holds and the resource pool are loaded once
+    for the whole series and the occupancy rows of all dates are locked up
+    front, so the query count does not grow with the number of occurrences.
+    Runs in the caller's transaction; the caller commits (or rolls back when
+    nothing was booked)
+    Args:
+        service: Service object
+        client_id: UUID of the client
+        dates: occurrence dates
+        appointment_time: time object shared by every occurrence
+        notes: notes copied to every occurrence (optional)
+        requested_resource_id: resource every occurrence must use (optional)
+        all_or_nothing: book nothing when any occurrence is rejected
+    Returns: (list of new Appointment objects, list of rejected {date, time, error})
+    """
+    start = time_to_minutes(appointment_time)
+    end = start + service.duration
+
+    blocked_dates = load_blocked_dates(dates[0], dates[-1])
+    weekly_windows = load_weekly_windows()
+    occupancies = lock_days_occupancy(dates)
+    holds = query_hold_intervals(dates[0], dates[-1], exclude_client_id=client_id)
+    pool = load_resource_pool()
+
+    accepted = []
+    rejected = []
+    for occurrence_date in dates:
+        windows = weekly_windows.get(get_day_of_week(occurrence_date))
+        error = None
+        resource_id = None
+
+        if occurrence_date in blocked_dates or not windows:
+            error = 'Selected date is not available for appointments'
+        elif not any(window_start <= start and end <= window_end for window_start, window_end in windows):
+            error = 'Selected time is outside business hours'
+        else:
+            schedule = BusySchedule(
+                list(occupancies[occurrence_date].intervals) + holds.get(occurrence_date, ([], None))[0]
+            )
+            if pool.enabled:
+                resource_id = choose_resource(
+                    pool, schedule, service.id, start, service.duration, requested_resource_id=requested_resource_id
+                )
+                if not resource_id:
+                    error = 'No staff member is available for this service at the selected time'
+            elif schedule.find_conflict(start, end):
+                error = 'Time slot conflicts with an existing appointment'
+
+        if error:
+            rejected.append({
+                'date': occurrence_date.isoformat(),
+                'time': appointment_time.strftime('%H:%M'),
+                'error': error
+            })
+        else:
+            accepted.append((occurrence_date, resource_id))
+
+    if not accepted or (rejected and all_or_nothing):
+        return [], rejected
+
+    series_id = uuid.uuid4()
+    appointments = []
+    for occurrence_date, resource_id in accepted:
+        appointment = Appointment(
+            client_id=client_id,
+            service_id=service.id,
+            series_id=series_id,
+            appointment_date=occurrence_date,
+            appointment_time=appointment_time,
+            resource_id=uuid.UUID(resource_id) if resource_id else None,
+            status='pending',
+            notes=notes
+        )
+        appointment.set_time_range(service.duration)
+        appointments.append(appointment)
+
+    # One multi-row INSERT; the exclusion constraint still guards every row
+    db.session.add_all(appointments)
+    db.session.flush()
+
+    for appointment in appointments:
+        occupancy = occupancies[appointment.appointment_date]
+        resource_id = str(appointment.resource_id) if appointment.resource_id else None
+        occupancy.intervals = sorted(occupancy.intervals + [[start, end, str(appointment.id), resource_id]])
+
+    apply_rollup_changes((
+        ((appointment.appointment_date, service.id, appointment.status), 1) for appointment in appointments
+    ))
+    bump_appointment_versions([client_id])
+
+    return appointments, rejected
@@ -0,0 +1,108 @@
+"""
+Service Catalog Cache
+In-process cache of the encoded GET /api/services response per (lang, active)
+"""
+import hashlib
+import threading
+import time
+from flask import current_app
+from app.models import Service
+
+# Languages the catalog is served in (others fall back to English)
+CATALOG_LANGUAGES = ('en', 'es')
+
+
+class CatalogEntry:
+    """Encoded catalog body with the version it was built from and its strong ETag"""
+
+    __slots__ = ('body', 'etag', 'version', 'expires_at')
+
+    def __init__(self, body, version, expires_at):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.version = version
+        self.expires_at = expires_at
+
+
+class ServiceCatalogCache:
+    """
+    Cache of the fully encoded service catalog
+
+    The catalog changes a few times a month, so each (lang, active) variant
+    is serialized once and served as bytes. Service writes bump the version,
+    which drops every variant; a build that raced a write is not stored. The
+    cache is per process; with several workers, other processes converge
+    within the TTL. The ETag is a hash of the body, so it is the same on
+    every worker serving the same catalog
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.enabled = True
+        self.version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def configure(self, ttl=None, enabled=None):
+        """Apply settings from the app config"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if enabled is not None:
+                self.enabled = enabled
+        self.invalidate()
+
+    def get(self, lang, active_only):
+        """
+        Get the catalog for a language, building it on a miss
+        Args:
+            lang: language code ('en' or 'es')
+            active_only: only list active services
+        Returns: CatalogEntry
+        """
+        key = (lang, active_only)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return entry
+
+        version = self.version
+        entry = CatalogEntry(build_catalog_body(lang, active_only), version, time.monotonic() + self.ttl)
+
+        with self._lock:
+            if self.enabled and version == self.version:
+                self._entries[key] = entry
+        return entry
+
+    def invalidate(self):
+        """Drop every variant after a service write"""
+        with self._lock:
+            self.version += 1
+            self._entries = {}
+
+
+def build_catalog_body(lang, active_only):
+    """
+    Query and encode the service catalog
+    Returns: JSON body as bytes
+    """
+    query = Service.query
+    if active_only:
+        query = query.filter_by(active=True)
+    services = query.order_by(Service.name).all()
+
+    # Same encoder as jsonify, so the cached body matches an uncached response
+    return current_app.json.dumps({
+        'services': [service.to_dict(lang=lang) for service in services],
+        'count': len(services)
+    }).encode()
+
+
+service_catalog = ServiceCatalogCache()
+
+
+def init_service_catalog(app):
+    """Configure the service catalog cache from app config"""
+    service_catalog.configure(
+        ttl=app.config.get('SERVICE_CATALOG_TTL'),
+        enabled=app.config.get('SERVICE_CATALOG_ENABLED')
+    )
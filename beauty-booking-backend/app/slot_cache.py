@@ -0,0 +1,270 @@
+"""
+Slot Cache
+In-process LRU/TTL cache of available slots keyed by (service_id, date),
+kept coherent across workers by change versions
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db
+from app.events import event_broker
+from app.slot_engine import get_day_of_week
+from app.versions import SLOTS_SCOPE, slot_date_scope, slot_service_scope, bump_versions, load_versions
+
+
+class SlotCache:
+    """
+    LRU cache of computed slot lists with per-entry expiry
+
+    Each entry records the generation it was computed at: the versions of the
+    'slots', 'slots:<date>' and 'slots:service:<id>' change_versions rows.
+    Invalidations bump those rows, so every worker stops serving an entry as
+    soon as any of them writes, and an answer computed before an invalidation
+    carries an older generation and is never served. Entries are also indexed
+    by date and by service so a write drops exactly the local keys it affects.
+    Every invalidation is also published as a 'slots.invalidated' event.
+    """
+
+    def __init__(self, max_entries=2048, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._keys_by_date = {}
+        self._keys_by_service = {}
+        self._seen_versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.invalidations = 0
+
+    def configure(self, max_entries=None, ttl=None, enabled=None):
+        """Apply settings from the app config"""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if ttl is not None:
+                self.ttl = ttl
+            if enabled is not None:
+                self.enabled = enabled
+            self._clear_entries()
+
+    def generation(self, service_id, slot_date):
+        """
+        Read the generation of a service's slots on a date (one primary key lookup)
+        Returns: tuple of versions, or None when the cache is disabled
+        """
+        return self.generations([service_id], slot_date)[0]
+
+    def generations(self, service_ids, slot_date):
+        """
+        Read the generations of several services' slots on one date with a single query
+        Returns: list of version tuples in the order given (None when the cache is disabled)
+        """
+        if not self.enabled:
+            return [None] * len(service_ids)
+
+        service_keys = [service_key(service_id) for service_id in service_ids]
+        scopes = [SLOTS_SCOPE, slot_date_scope(slot_date)] + [slot_service_scope(key) for key in service_keys]
+        versions = dict(zip(scopes, load_versions(*scopes)))
+
+        with self._lock:
+            for scope, version in versions.items():
+                if version > self._seen_versions.get(scope, 0):
+                    self._seen_versions[scope] = version
+
+        shared = (versions[scopes[0]], versions[scopes[1]])
+        return [shared + (versions[slot_service_scope(key)],) for key in service_keys]
+
+    def get(self, service_id, slot_date, generation):
+        """
+        Get cached slots for a service and date
+        Args:
+            generation: current generation from generation()/generations()
+        Returns: list of time strings or None on a miss
+        """
+        if generation is None:
+            return None
+
+        key = (service_key(service_id), slot_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic() or entry[2] != generation:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def set(self, service_id, slot_date, slots, generation, ttl=None):
+        """
+        Store slots for a service and date
+        An answer older than an invalidation this process has already seen is dropped
+        Args:
+            generation: generation read before the slots were computed
+            ttl: seconds until the entry expires (optional, capped at the cache TTL)
+        """
+        if not self.enabled or generation is None:
+            return
+
+        key = (service_key(service_id), slot_date)
+        scopes = (SLOTS_SCOPE, slot_date_scope(slot_date), slot_service_scope(key[0]))
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if any(version < self._seen_versions.get(scope, 0) for scope, version in zip(scopes, generation)):
+                self.discarded += 1
+                return
+
+            self._entries[key] = (list(slots), time.monotonic() + ttl, generation)
+            self._entries.move_to_end(key)
+            self._keys_by_date.setdefault(slot_date, set()).add(key)
+            self._keys_by_service.setdefault(key[0], set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_date(self, slot_date):
+        """Drop every service's slots for a date"""
+        with self._lock:
+            for key in list(self._keys_by_date.get(slot_date, ())):
+                self._remove(key)
+        self._bump(slot_date_scope(slot_date))
+        event_broker.publish('slots.invalidated', {'date': slot_date.isoformat()})
+
+    def invalidate_weekday(self, day_of_week):
+        """Drop cached slots for every date falling on a day of week (0=Sunday)"""
+        with self._lock:
+            for slot_date in [d for d in self._keys_by_date if get_day_of_week(d) == day_of_week]:
+                for key in list(self._keys_by_date.get(slot_date, ())):
+                    self._remove(key)
+        # Other workers do not know which dates they hold, so every answer goes stale
+        self._bump(SLOTS_SCOPE)
+        event_broker.publish('slots.invalidated', {'day_of_week': day_of_week})
+
+    def invalidate_service(self, service_id):
+        """Drop every date's slots for a service"""
+        key = service_key(service_id)
+        with self._lock:
+            for cached_key in list(self._keys_by_service.get(key, ())):
+                self._remove(cached_key)
+        self._bump(slot_service_scope(key))
+        event_broker.publish('slots.invalidated', {'service_id': key})
+
+    def clear(self):
+        """Drop all entries, in every worker"""
+        with self._lock:
+            self._clear_entries()
+        self._bump(SLOTS_SCOPE)
+        event_broker.publish('slots.invalidated', {'all': True})
+
+    def stats(self):
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+                'discarded': self.discarded,
+                'invalidations': self.invalidations
+            }
+
+    def _bump(self, scope):
+        """
+        Bump a slot scope in its own transaction
+        Invalidations run after the write committed; the session has released
+        its connection by then, so this reuses it rather than taking a second one.
+        A failed bump must not fail the committed write: other workers then
+        converge within the TTL
+        """
+        try:
+            with db.engine.begin() as connection:
+                versions = bump_versions(scope, connection=connection)
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f'Slot cache invalidation of {scope} not shared with other workers: {e}')
+            versions = {}
+
+        with self._lock:
+            self.invalidations += 1
+            for bumped_scope, version in versions.items():
+                if version > self._seen_versions.get(bumped_scope, 0):
+                    self._seen_versions[bumped_scope] = version
+
+    def _clear_entries(self):
+        """Drop all local entries (caller holds the lock)"""
+        self._entries.clear()
+        self._keys_by_date.clear()
+        self._keys_by_service.clear()
+
+    def _remove(self, key):
+        """Remove a key and its index entries (caller holds the lock)"""
+        self._entries.pop(key, None)
+        for index, index_key in ((self._keys_by_date, key[1]), (self._keys_by_service, key[0])):
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+
+
+def service_key(service_id):
+    """Normalize a service id so every string form of the same UUID shares one key"""
+    try:
+        return str(uuid.UUID(str(service_id)))
+    except ValueError:
+        return str(service_id)
+
+
+slot_cache = SlotCache()
+
+
+def init_slot_cache(app):
+    """
+    Configure the slot cache from app config and optionally warm it up
+    SLOT_CACHE_WARMUP_DAYS > 0 precomputes that many days for every active service
+    """
+    slot_cache.configure(
+        max_entries=app.config.get('SLOT_CACHE_MAX_ENTRIES'),
+        ttl=app.config.get('SLOT_CACHE_TTL'),
+        enabled=app.config.get('SLOT_CACHE_ENABLED')
+    )
+
+    warmup_days = app.config.get('SLOT_CACHE_WARMUP_DAYS', 0)
+    if slot_cache.enabled and warmup_days > 0:
+        with app.app_context():
+            try:
+                warmed = warm_slot_cache(warmup_days)
+                app.logger.info(f'Slot cache warmed with {warmed} entries')
+            except Exception as e:
+                # Startup must not depend on the database being ready
+                app.logger.warning(f'Slot cache warm-up skipped: {e}')
+
+
+def warm_slot_cache(days):
+    """
+    Precompute slots for every active service over the next `days` days
+    Goes through the batch read, so each date's schedule is built once and
+    entries expire with the slot holds they were computed around
+    Returns: number of entries stored
+    """
+    from datetime import timedelta
+    from app.utils import get_available_time_slots_batch, get_date_today
+
+    start_date = get_date_today()
+    stored = 0
+
+    for offset in range(days):
+        stored += len(get_available_time_slots_batch(start_date + timedelta(days=offset)))
+
+    return stored
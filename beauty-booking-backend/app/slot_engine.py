@@ -0,0 +1,475 @@
+"""
+Slot Engine
+Interval-based computation of free time slots and appointment conflicts
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time
+import numpy as np
+from flask import current_app
+from app.models import (
+    db, Appointment, Service, Availability, BlockedDate, DayOccupancy, SlotHold,
+    Resource, resource_services
+)
+
+# Appointment statuses that occupy time on the calendar
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+# Fallback spacing between candidate start times (minutes)
+DEFAULT_SLOT_STEP = 30
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def time_to_minutes(value):
+    """Convert a time object to minutes since midnight"""
+    return value.hour * 60 + value.minute
+
+
+def minutes_to_time(minutes):
+    """Convert minutes since midnight to a time object"""
+    return time(hour=minutes // 60, minute=minutes % 60)
+
+
+def format_minutes(minutes):
+    """Format minutes since midnight as HH:MM"""
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def get_day_of_week(check_date):
+    """
+    Get our day_of_week index for a date
+    Converts Python weekday (0=Monday) to our format (0=Sunday)
+    """
+    return (check_date.weekday() + 1) % 7
+
+
+def get_slot_step():
+    """Get the configured spacing between candidate start times (minutes)"""
+    return current_app.config.get('APPOINTMENT_SLOT_DURATION', DEFAULT_SLOT_STEP)
+
+
+class BusySchedule:
+    """
+    Busy time of a single day as sorted intervals (minutes since midnight)
+
+    Built once per day, then answers slot and conflict questions without
+    rescanning the underlying appointments.
+    """
+
+    def __init__(self, intervals=(), expires_at=None):
+        """
+        Args:
+            intervals: iterable of (start, end, appointment_id[, resource_id]) tuples
+            expires_at: when the earliest slot hold in the intervals lapses (optional)
+        """
+        self.expires_at = expires_at
+        self._resource_occupancy = None
+
+        # Raw intervals sorted by start, kept to report which booking conflicts
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self._starts = [interval[0] for interval in self.intervals]
+        self._max_ends = []
+        max_end = None
+        for interval in self.intervals:
+            max_end = interval[1] if max_end is None else max(max_end, interval[1])
+            self._max_ends.append(max_end)
+
+        # Merged, non-overlapping intervals used by the sweeps
+        self.merged_starts = []
+        self.merged_ends = []
+        for start, end, *_ in self.intervals:
+            if self.merged_ends and start < self.merged_ends[-1]:
+                self.merged_ends[-1] = max(self.merged_ends[-1], end)
+            else:
+                self.merged_starts.append(start)
+                self.merged_ends.append(end)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def without(self, exclude_id):
+        """Get a copy of the schedule without one appointment's interval (for reschedules)"""
+        return BusySchedule(
+            (interval for interval in self.intervals if str(interval[2]) != str(exclude_id)),
+            expires_at=self.expires_at
+        )
+
+    def resource_occupancy(self, resource_ids):
+        """Get the per-resource minute occupancy of this day (built once per schedule)"""
+        if self._resource_occupancy is None or self._resource_occupancy.resource_ids != list(resource_ids):
+            self._resource_occupancy = ResourceOccupancy(resource_ids, self.intervals)
+        return self._resource_occupancy
+
+    def is_free(self, start, end):
+        """Check whether [start, end) overlaps no busy interval"""
+        index = bisect_right(self.merged_ends, start)
+        return index == len(self.merged_starts) or self.merged_starts[index] >= end
+
+    def find_conflict(self, start, end, exclude_id=None):
+        """
+        Find the earliest interval overlapping [start, end)
+        Args:
+            start: start in minutes since midnight
+            end: end in minutes since midnight
+            exclude_id: appointment id to ignore (for reschedules)
+        Returns: (start, end, appointment_id) tuple or None
+        """
+        # Only intervals starting before `end` can overlap; of those, the
+        # first one whose running max end passes `start` is where overlaps begin
+        limit = bisect_left(self._starts, end)
+        index = bisect_right(self._max_ends, start, 0, limit)
+        for interval in self.intervals[index:limit]:
+            if interval[1] > start and (exclude_id is None or str(interval[2]) != str(exclude_id)):
+                return interval
+        return None
+
+    def free_starts(self, windows, duration, step=DEFAULT_SLOT_STEP):
+        """
+        Sweep business windows for start times that fit a service
+        Args:
+            windows: list of (start, end) business hours in minutes
+            duration: service duration in minutes
+            step: spacing between candidate start times
+        Returns: sorted list of start minutes
+        """
+        starts = set()
+        busy_count = len(self.merged_starts)
+
+        for window_start, window_end in windows:
+            index = 0
+            current = window_start
+            while current + duration <= window_end:
+                # Skip busy intervals that end before the candidate starts
+                while index < busy_count and self.merged_ends[index] <= current:
+                    index += 1
+                if index == busy_count or self.merged_starts[index] >= current + duration:
+                    starts.add(current)
+                current += step
+
+        return sorted(starts)
+
+
+def candidate_starts(windows, duration, step):
+    """
+    Get every start time on the slot grid of the business windows that fits a duration
+    Returns: sorted NumPy array of start minutes
+    """
+    ranges = [np.arange(start, end - duration + 1, step) for start, end in windows]
+    if not ranges:
+        return np.empty(0, dtype=np.int64)
+    return np.unique(np.concatenate(ranges))
+
+
+class ResourceOccupancy:
+    """
+    Busy minutes of a single day per resource, as a NumPy array
+
+    Row r holds the cumulative busy minutes of resource r, so whether a
+    resource is free over [start, end) is prefix[end] - prefix[start] == 0
+    and any set of starts is checked for every resource in one operation.
+    """
+
+    def __init__(self, resource_ids, intervals):
+        """
+        Args:
+            resource_ids: list of resource id strings (row order)
+            intervals: iterable of [start, end, appointment_id, resource_id]; a
+                missing/None resource_id occupies every resource
+        """
+        self.resource_ids = list(resource_ids)
+        self._rows = {resource_id: row for row, resource_id in enumerate(self.resource_ids)}
+
+        busy = np.zeros((len(self.resource_ids), MINUTES_PER_DAY), dtype=np.int32)
+        for interval in intervals:
+            start, end = interval[0], min(interval[1], MINUTES_PER_DAY)
+            resource_id = interval[3] if len(interval) > 3 else None
+            if resource_id is None:
+                busy[:, start:end] = 1
+            elif resource_id in self._rows:
+                busy[self._rows[resource_id], start:end] = 1
+
+        self._prefix = np.zeros((len(self.resource_ids), MINUTES_PER_DAY + 1), dtype=np.int32)
+        np.cumsum(busy, axis=1, out=self._prefix[:, 1:])
+
+    def free_matrix(self, starts, duration, resource_ids):
+        """
+        Check each resource at each start
+        Args:
+            starts: NumPy array of start minutes
+            duration: minutes needed
+            resource_ids: resources to consider
+        Returns: (resource id list, bool array of shape (resources, starts))
+        """
+        known = [resource_id for resource_id in resource_ids if resource_id in self._rows]
+        prefix = self._prefix[[self._rows[resource_id] for resource_id in known]]
+        ends = np.minimum(starts + duration, MINUTES_PER_DAY)
+        return known, (prefix[:, ends] - prefix[:, starts]) == 0
+
+    def free_starts(self, windows, duration, step, resource_ids):
+        """
+        Sweep business windows for starts where at least one resource is free
+        Returns: sorted list of start minutes
+        """
+        starts = candidate_starts(windows, duration, step)
+        known, free = self.free_matrix(starts, duration, resource_ids)
+        if not known or not starts.size:
+            return []
+        return starts[free.any(axis=0)].tolist()
+
+    def free_resources(self, start, duration, resource_ids):
+        """Get the resources (in the given order) free over [start, start + duration)"""
+        known, free = self.free_matrix(np.array([start]), duration, resource_ids)
+        return [resource_id for resource_id, is_free in zip(known, free[:, 0]) if is_free]
+
+
+class ResourcePool:
+    """
+    Active resources and the services each one can perform
+
+    Without active resources the salon is a single resource and every
+    answer comes from the plain BusySchedule sweep.
+    """
+
+    def __init__(self, services_by_resource=None):
+        """
+        Args:
+            services_by_resource: ordered dict of resource id -> set of service ids
+                (an empty set means the resource performs every service)
+        """
+        self.services_by_resource = services_by_resource or {}
+        self.resource_ids = list(self.services_by_resource)
+
+    @property
+    def enabled(self):
+        return bool(self.resource_ids)
+
+    def for_service(self, service_id):
+        """Get the resources that can perform a service"""
+        service_id = str(service_id)
+        return [
+            resource_id for resource_id, service_ids in self.services_by_resource.items()
+            if not service_ids or service_id in service_ids
+        ]
+
+    def free_starts(self, schedule, windows, duration, step, service_id):
+        """Get start minutes where the service fits on at least one qualifying resource"""
+        if not self.enabled:
+            return schedule.free_starts(windows, duration, step)
+
+        occupancy = schedule.resource_occupancy(self.resource_ids)
+        return occupancy.free_starts(windows, duration, step, self.for_service(service_id))
+
+    def free_resources(self, schedule, start, duration, service_id):
+        """Get the qualifying resources free for a booking, in pool order"""
+        occupancy = schedule.resource_occupancy(self.resource_ids)
+        return occupancy.free_resources(start, duration, self.for_service(service_id))
+
+
+def load_resource_pool():
+    """
+    Load active resources and their services with a single query
+    Returns: ResourcePool
+    """
+    rows = db.session.query(
+        Resource.id, resource_services.c.service_id
+    ).outerjoin(
+        resource_services, resource_services.c.resource_id == Resource.id
+    ).filter(
+        Resource.active.is_(True)
+    ).order_by(
+        Resource.name, Resource.id
+    ).all()
+
+    services_by_resource = {}
+    for row in rows:
+        service_ids = services_by_resource.setdefault(str(row.id), set())
+        if row.service_id:
+            service_ids.add(str(row.service_id))
+
+    return ResourcePool(services_by_resource)
+
+
+def load_business_windows(check_date):
+    """
+    Get the active business hours for a date
+    Args:
+        check_date: date object
+    Returns: sorted list of (start, end) tuples in minutes
+    """
+    rows = db.session.query(Availability.start_time, Availability.end_time).filter(
+        Availability.day_of_week == get_day_of_week(check_date),
+        Availability.active.is_(True)
+    ).all()
+
+    return sorted((time_to_minutes(row.start_time), time_to_minutes(row.end_time)) for row in rows)
+
+
+def query_appointment_intervals(start_date, end_date):
+    """
+    Compute busy intervals straight from appointments with a single joined query
+    Args:
+        start_date: first date (inclusive)
+        end_date: last date (inclusive)
+    Returns: dict of date -> sorted list of [start, end, appointment_id, resource_id]
+             (dates without bookings are omitted)
+    """
+    rows = db.session.query(
+        Appointment.id, Appointment.appointment_date, Appointment.appointment_time,
+        Appointment.resource_id, Service.duration
+    ).join(
+        Service, Appointment.service_id == Service.id
+    ).filter(
+        Appointment.appointment_date.between(start_date, end_date),
+        Appointment.status.in_(ACTIVE_STATUSES)
+    ).all()
+
+    intervals_by_date = {}
+    for row in rows:
+        start = time_to_minutes(row.appointment_time)
+        intervals_by_date.setdefault(row.appointment_date, []).append(
+            [start, start + row.duration, str(row.id), str(row.resource_id) if row.resource_id else None]
+        )
+    for intervals in intervals_by_date.values():
+        intervals.sort()
+
+    return intervals_by_date
+
+
+def query_hold_intervals(start_date, end_date, exclude_client_id=None):
+    """
+    Get intervals held by unexpired slot holds with a single joined query
+    Args:
+        start_date: first date (inclusive)
+        end_date: last date (inclusive)
+        exclude_client_id: ignore this client's own holds (optional)
+    Returns: dict of date -> (list of [start, end, 'hold:<id>', resource_id], earliest expires_at)
+    """
+    query = db.session.query(
+        SlotHold.id, SlotHold.hold_date, SlotHold.hold_time, SlotHold.resource_id,
+        SlotHold.expires_at, Service.duration
+    ).join(
+        Service, SlotHold.service_id == Service.id
+    ).filter(
+        SlotHold.hold_date.between(start_date, end_date),
+        SlotHold.expires_at > datetime.utcnow()
+    )
+
+    if exclude_client_id:
+        query = query.filter(SlotHold.client_id != exclude_client_id)
+
+    holds_by_date = {}
+    for row in query.all():
+        start = time_to_minutes(row.hold_time)
+        intervals, expires_at = holds_by_date.get(row.hold_date, ([], row.expires_at))
+        intervals.append([
+            start, start + row.duration, f'hold:{row.id}', str(row.resource_id) if row.resource_id else None
+        ])
+        holds_by_date[row.hold_date] = (intervals, min(expires_at, row.expires_at))
+
+    return holds_by_date
+
+
+def load_busy_schedule(check_date, include_holds=True, exclude_hold_client_id=None):
+    """
+    Build the busy schedule for a date
+    Reads the materialized day_occupancy row, falling back to the
+    appointments table for dates that have no row yet
+    Args:
+        check_date: date object
+        include_holds: also block time held by unexpired slot holds
+        exclude_hold_client_id: ignore this client's own holds (optional)
+    Returns: BusySchedule
+    """
+    occupancy = db.session.get(DayOccupancy, check_date)
+    if occupancy is not None:
+        intervals = list(occupancy.intervals)
+    else:
+        intervals = query_appointment_intervals(check_date, check_date).get(check_date, [])
+
+    expires_at = None
+    if include_holds:
+        hold_intervals, expires_at = query_hold_intervals(
+            check_date, check_date, exclude_client_id=exclude_hold_client_id
+        ).get(check_date, ([], None))
+        intervals.extend(hold_intervals)
+
+    return BusySchedule(intervals, expires_at=expires_at)
+
+
+def load_hold_schedule(check_date, exclude_client_id=None):
+    """
+    Build a schedule of only the unexpired slot holds on a date
+    Args:
+        check_date: date object
+        exclude_client_id: ignore this client's own holds (optional)
+    Returns: BusySchedule
+    """
+    hold_intervals, expires_at = query_hold_intervals(
+        check_date, check_date, exclude_client_id=exclude_client_id
+    ).get(check_date, ([], None))
+
+    return BusySchedule(hold_intervals, expires_at=expires_at)
+
+
+def load_weekly_windows():
+    """
+    Get all active business hours grouped by day of week
+    Returns: dict of day_of_week -> sorted list of (start, end) tuples in minutes
+    """
+    rows = db.session.query(
+        Availability.day_of_week, Availability.start_time, Availability.end_time
+    ).filter(
+        Availability.active.is_(True)
+    ).all()
+
+    weekly = {}
+    for row in rows:
+        weekly.setdefault(row.day_of_week, []).append(
+            (time_to_minutes(row.start_time), time_to_minutes(row.end_time))
+        )
+    for windows in weekly.values():
+        windows.sort()
+
+    return weekly
+
+
+def load_blocked_dates(start_date, end_date):
+    """
+    Get blocked dates within a range (inclusive)
+    Returns: set of date objects
+    """
+    rows = db.session.query(BlockedDate.blocked_date).filter(
+        BlockedDate.blocked_date.between(start_date, end_date)
+    ).all()
+
+    return {row.blocked_date for row in rows}
+
+
+def load_busy_schedules(start_date, end_date, include_holds=True):
+    """
+    Build busy schedules for every date in a range
+    Reads day_occupancy rows for the range in one query; dates without a
+    row are filled from a single appointments query
+    Args:
+        include_holds: also block time held by unexpired slot holds
+    Returns: dict of date -> BusySchedule (dates without bookings are omitted)
+    """
+    rows = DayOccupancy.query.filter(
+        DayOccupancy.occupancy_date.between(start_date, end_date)
+    ).all()
+    intervals_by_date = {row.occupancy_date: list(row.intervals) for row in rows}
+
+    if len(intervals_by_date) < (end_date - start_date).days + 1:
+        for day, intervals in query_appointment_intervals(start_date, end_date).items():
+            intervals_by_date.setdefault(day, intervals)
+
+    expires_by_date = {}
+    if include_holds:
+        for day, (hold_intervals, expires_at) in query_hold_intervals(start_date, end_date).items():
+            intervals_by_date.setdefault(day, []).extend(hold_intervals)
+            expires_by_date[day] = expires_at
+
+    return {
+        day: BusySchedule(intervals, expires_at=expires_by_date.get(day))
+        for day, intervals in intervals_by_date.items() if intervals
+    }
@@ -2,11 +2,22 @@
 Utility Functions
 Helper functions used across the application
 """
+import base64
+import json
+import uuid
 from datetime import datetime, time, timedelta, date
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, current_app
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import tuple_
 from app.models import User, Appointment, Availability, BlockedDate
+from app.slot_engine import (
+    BusySchedule, load_business_windows, load_busy_schedule, load_busy_schedules,
+    load_weekly_windows, load_blocked_dates, load_resource_pool, get_slot_step,
+    time_to_minutes, format_minutes, get_day_of_week
+)
+from app.slot_cache import slot_cache
+from app.occupancy import lock_day_occupancy
 
 
 def admin_required(fn):
@@ -124,6 +135,105 @@ def parse_date(date_str):
     return None
 
 
+def parse_date_range(args):
+    """
+    Parse optional from/to query params (YYYY-MM-DD, inclusive)
+    Returns: (start_date or None, end_date or None, error_message or None)
+    """
+    start_date = end_date = None
+
+    if args.get('from'):
+        start_date = parse_date(args.get('from'))
+        if not start_date:
+            return None, None, 'Invalid from date. Use YYYY-MM-DD'
+
+    if args.get('to'):
+        end_date = parse_date(args.get('to'))
+        if not end_date:
+            return None, None, 'Invalid to date. Use YYYY-MM-DD'
+
+    if start_date and end_date and end_date < start_date:
+        return None, None, 'to must not be before from'
+
+    return start_date, end_date, None
+
+
+def encode_cursor(appointment):
+    """
+    Encode an appointment's sort key (date, time, id) as an opaque page cursor
+    Returns: URL-safe string
+    """
+    key = [appointment.appointment_date.isoformat(), appointment.appointment_time.isoformat(), str(appointment.id)]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a page cursor made by encode_cursor
+    Returns: (date, time, UUID) tuple or None if the cursor is invalid
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date_str, time_str, appointment_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (
+            datetime.strptime(date_str, '%Y-%m-%d').date(),
+            time.fromisoformat(time_str),
+            uuid.UUID(appointment_id)
+        )
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_page_args(args):
+    """
+    Parse limit/cursor query params
+    limit defaults to ITEMS_PER_PAGE and is capped at MAX_ITEMS_PER_PAGE
+    Returns: (limit, decoded cursor or None, error_message or None)
+    """
+    try:
+        limit = int(args.get('limit', current_app.config['ITEMS_PER_PAGE']))
+    except ValueError:
+        return None, None, 'limit must be an integer'
+
+    if limit < 1:
+        return None, None, 'limit must be at least 1'
+
+    cursor = None
+    if args.get('cursor'):
+        cursor = decode_cursor(args.get('cursor'))
+        if not cursor:
+            return None, None, 'Invalid cursor'
+
+    return min(limit, current_app.config['MAX_ITEMS_PER_PAGE']), cursor, None
+
+
+def paginate_appointments(query, limit, cursor=None, model=Appointment):
+    """
+    Fetch one page of appointments, newest first
+    Uses keyset pagination on (appointment_date, appointment_time, id), so a
+    deep page reads the same index range as the first one
+    Args:
+        query: filtered Appointment query (unordered)
+        limit: page size
+        cursor: decoded cursor of the previous page's last row (optional)
+        model: mapped class the query selects (Appointment or AppointmentHistory)
+    Returns: (list of appointments, next cursor string or None on the last page)
+    """
+    sort_key = tuple_(model.appointment_date, model.appointment_time, model.id)
+    if cursor:
+        query = query.filter(sort_key < tuple_(*cursor))
+
+    # One extra row tells whether another page exists
+    appointments = query.order_by(
+        model.appointment_date.desc(),
+        model.appointment_time.desc(),
+        model.id.desc()
+    ).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(appointments[limit - 1]) if len(appointments) > limit else None
+    return appointments[:limit], next_cursor
+
+
 def is_date_blocked(check_date):
     """
     Check if a date is blocked
@@ -159,12 +269,8 @@ def is_date_available(check_date):
         return False
 
     # Check if there's availability configured for this day of week
-    day_of_week = check_date.weekday()
-    # Convert Python weekday (0=Monday) to our format (0=Sunday)
-    day_of_week = (day_of_week + 1) % 7
-
     availability = Availability.query.filter_by(
-        day_of_week=day_of_week,
+        day_of_week=get_day_of_week(check_date),
         active=True
     ).first()
 
@@ -174,79 +280,220 @@ def is_date_available(check_date):
 def get_available_time_slots(service_id, appointment_date):
     """
     Get all available time slots for a service on a specific date
+    Served from the slot cache when possible
     Args:
         service_id: UUID of the service
         appointment_date: date object or string
     Returns: list of time strings (HH:MM)
     """
-    from app.models import Service
-
     if isinstance(appointment_date, str):
         appointment_date = parse_date(appointment_date)
 
     if not appointment_date:
         return []
 
-    # Check if date is available
-    if not is_date_available(appointment_date):
-        return []
+    generation = slot_cache.generation(service_id, appointment_date)
+    cached = slot_cache.get(service_id, appointment_date, generation)
+    if cached is not None:
+        return cached
+
+    available_slots, ttl = compute_available_time_slots(service_id, appointment_date)
+    slot_cache.set(service_id, appointment_date, available_slots, generation, ttl=ttl)
+
+    return available_slots
+
+
+def compute_available_time_slots(service_id, appointment_date):
+    """
+    Compute available time slots for a service on a specific date (uncached)
+    Args:
+        service_id: UUID of the service
+        appointment_date: date object
+    Returns: (list of time strings (HH:MM), seconds until a slot hold in the answer lapses or None)
+    """
+    from app.models import Service
+
+    # Check if date is blocked
+    if is_date_blocked(appointment_date):
+        return [], None
 
     # Get service duration
     service = Service.query.get(service_id)
     if not service or not service.active:
-        return []
+        return [], None
 
-    # Get day of week
-    day_of_week = (appointment_date.weekday() + 1) % 7
+    # Get business hours for this day (none means closed)
+    windows = load_business_windows(appointment_date)
+    if not windows:
+        return [], None
 
-    # Get availability for this day
-    availability = Availability.query.filter_by(
-        day_of_week=day_of_week,
-        active=True
-    ).all()
+    # Sweep the day's busy intervals once for every start that fits
+    schedule = load_busy_schedule(appointment_date)
+    pool = load_resource_pool()
+    free_starts = pool.free_starts(schedule, windows, service.duration, get_slot_step(), service.id)
 
-    if not availability:
-        return []
+    return [format_minutes(start) for start in free_starts], get_schedule_ttl(schedule)
+
+
+def get_schedule_ttl(schedule):
+    """
+    Get how long an answer computed from a schedule stays valid
+    Returns: seconds until the earliest slot hold lapses, or None without holds
+    """
+    if schedule is None or schedule.expires_at is None:
+        return None
+
+    return max((schedule.expires_at - get_datetime_now()).total_seconds(), 0)
+
+
+def get_available_time_slots_range(service_id, start_date, end_date):
+    """
+    Get available time slots for a service on every date in a range
+    Loads blocked dates, business hours and appointments for the whole
+    range up front, so the query count does not grow with the range length
+    Args:
+        service_id: UUID of the service
+        start_date: first date (inclusive)
+        end_date: last date (inclusive)
+    Returns: dict of date -> list of time strings (HH:MM)
+    """
+    from app.models import Service
 
-    # Get existing appointments for this date
-    existing_appointments = Appointment.query.filter_by(
-        appointment_date=appointment_date
-    ).filter(
-        Appointment.status.in_(['pending', 'confirmed'])
-    ).all()
+    slots_by_date = {}
+    day_count = (end_date - start_date).days + 1
+    dates = [start_date + timedelta(days=offset) for offset in range(max(day_count, 0))]
 
-    # Generate all possible time slots
-    all_slots = []
-    slot_duration = 30  # minutes
+    service = Service.query.get(service_id)
+    if not service or not service.active:
+        return {day: [] for day in dates}
 
-    for avail in availability:
-        current_time = datetime.combine(appointment_date, avail.start_time)
-        end_time = datetime.combine(appointment_date, avail.end_time)
+    blocked_dates = load_blocked_dates(start_date, end_date)
+    weekly_windows = load_weekly_windows()
+    schedules = load_busy_schedules(start_date, end_date)
+    pool = load_resource_pool()
+    step = get_slot_step()
+    empty_schedule = BusySchedule()
 
-        while current_time + timedelta(minutes=service.duration) <= end_time:
-            all_slots.append(current_time.time())
-            current_time += timedelta(minutes=slot_duration)
+    for day in dates:
+        windows = weekly_windows.get(get_day_of_week(day))
+        if day in blocked_dates or not windows:
+            slots_by_date[day] = []
+            continue
 
-    # Remove slots that conflict with existing appointments
-    available_slots = []
-    for slot in all_slots:
-        slot_datetime = datetime.combine(appointment_date, slot)
-        slot_end = slot_datetime + timedelta(minutes=service.duration)
+        schedule = schedules.get(day, empty_schedule)
+        slots_by_date[day] = [
+            format_minutes(start) for start in pool.free_starts(schedule, windows, service.duration, step, service.id)
+        ]
 
-        is_available = True
-        for appointment in existing_appointments:
-            appt_datetime = datetime.combine(appointment.appointment_date, appointment.appointment_time)
-            appt_end = appt_datetime + timedelta(minutes=appointment.service.duration)
+    return slots_by_date
 
-            # Check for overlap
-            if (slot_datetime < appt_end and slot_end > appt_datetime):
-                is_available = False
-                break
 
-        if is_available:
-            available_slots.append(slot.strftime('%H:%M'))
+def find_next_available_slots(service_id, start_date, limit, max_days):
+    """
+    Find the earliest openings for a service, walking forward day by day
+    Blocked dates and appointments are fetched in windows that double in
+    size (7, 14, 28... days) and the walk stops once `limit` openings are found
+    Args:
+        service_id: UUID of the service
+        start_date: first date to search (inclusive)
+        limit: number of openings wanted
+        max_days: hard cap on the number of days searched
+    Returns: (list of (date, time string) tuples, last date searched)
+    """
+    from app.models import Service
 
-    return available_slots
+    openings = []
+    horizon = start_date + timedelta(days=max_days - 1)
+
+    service = Service.query.get(service_id)
+    weekly_windows = load_weekly_windows()
+    # Closed every day: nothing can open before the horizon
+    if not service or not service.active or not weekly_windows:
+        return openings, horizon
+
+    pool = load_resource_pool()
+    step = get_slot_step()
+    empty_schedule = BusySchedule()
+    window_start = start_date
+    window_days = 7
+
+    while window_start <= horizon:
+        window_end = min(window_start + timedelta(days=window_days - 1), horizon)
+        blocked_dates = load_blocked_dates(window_start, window_end)
+        schedules = load_busy_schedules(window_start, window_end)
+
+        day = window_start
+        while day <= window_end:
+            windows = weekly_windows.get(get_day_of_week(day))
+            if windows and day not in blocked_dates:
+                schedule = schedules.get(day, empty_schedule)
+                for start in pool.free_starts(schedule, windows, service.duration, step, service.id):
+                    openings.append((day, format_minutes(start)))
+                    if len(openings) >= limit:
+                        return openings, day
+            day += timedelta(days=1)
+
+        window_start = window_end + timedelta(days=1)
+        window_days *= 2
+
+    return openings, horizon
+
+
+def get_available_time_slots_batch(appointment_date, service_ids=None):
+    """
+    Get available time slots for several services on the same date
+    Cached services are served from the slot cache; for the rest the day's
+    occupancy is built once and each service only adds a duration sweep
+    Args:
+        appointment_date: date object or string
+        service_ids: list of service UUIDs (optional, default=all active services)
+    Returns: list of (Service, list of time strings (HH:MM)) tuples ordered by service name
+    """
+    from app.models import Service
+
+    if isinstance(appointment_date, str):
+        appointment_date = parse_date(appointment_date)
+
+    query = Service.query.filter_by(active=True)
+    if service_ids is not None:
+        query = query.filter(Service.id.in_(service_ids))
+    services = query.order_by(Service.name).all()
+
+    if not appointment_date:
+        return [(service, []) for service in services]
+
+    slots_by_service = {}
+    generations = dict(zip(
+        [service.id for service in services],
+        slot_cache.generations([service.id for service in services], appointment_date)
+    ))
+    for service in services:
+        cached = slot_cache.get(service.id, appointment_date, generations[service.id])
+        if cached is not None:
+            slots_by_service[service.id] = cached
+
+    missing = [service for service in services if service.id not in slots_by_service]
+    if missing:
+        windows = None
+        if not is_date_blocked(appointment_date):
+            windows = load_business_windows(appointment_date)
+
+        schedule = load_busy_schedule(appointment_date) if windows else None
+        pool = load_resource_pool()
+        step = get_slot_step()
+        ttl = get_schedule_ttl(schedule)
+
+        for service in missing:
+            slots = []
+            if schedule is not None:
+                slots = [
+                    format_minutes(start)
+                    for start in pool.free_starts(schedule, windows, service.duration, step, service.id)
+                ]
+            slot_cache.set(service.id, appointment_date, slots, generations[service.id], ttl=ttl)
+            slots_by_service[service.id] = slots
+
+    return [(service, slots_by_service[service.id]) for service in services]
 
 
 def check_appointment_conflict(service_id, appointment_date, appointment_time, exclude_appointment_id=None):
@@ -265,34 +512,103 @@ def check_appointment_conflict(service_id, appointment_date, appointment_time, e
     if not service:
         return True, "Service not found"
 
-    # Create datetime objects for comparison
-    new_start = datetime.combine(appointment_date, appointment_time)
-    new_end = new_start + timedelta(minutes=service.duration)
+    new_start = time_to_minutes(appointment_time)
+    new_end = new_start + service.duration
 
-    # Get existing appointments for this date
-    query = Appointment.query.filter_by(
-        appointment_date=appointment_date
-    ).filter(
-        Appointment.status.in_(['pending', 'confirmed'])
-    )
+    schedule = load_busy_schedule(appointment_date, include_holds=False)
 
-    if exclude_appointment_id:
-        query = query.filter(Appointment.id != exclude_appointment_id)
+    # With several resources, only a time where no qualifying resource is free conflicts
+    pool = load_resource_pool()
+    if pool.enabled:
+        if exclude_appointment_id:
+            schedule = schedule.without(exclude_appointment_id)
+        if pool.free_resources(schedule, new_start, service.duration, service.id):
+            return False, None
+        return True, f"No staff member is available for this service at {format_minutes(new_start)}"
 
-    existing_appointments = query.all()
+    conflict = schedule.find_conflict(new_start, new_end, exclude_id=exclude_appointment_id)
 
-    # Check for conflicts
-    for appointment in existing_appointments:
-        appt_start = datetime.combine(appointment.appointment_date, appointment.appointment_time)
-        appt_end = appt_start + timedelta(minutes=appointment.service.duration)
+    if conflict:
+        return True, f"Time slot conflicts with existing appointment at {format_minutes(conflict[0])}"
 
-        # Check for overlap
-        if (new_start < appt_end and new_end > appt_start):
-            return True, f"Time slot conflicts with existing appointment at {appointment.appointment_time.strftime('%H:%M')}"
+    return False, None
+
+
+def check_locked_conflict(appointment_date, start, end, exclude_appointment_id=None):
+    """
+    Lock a date's occupancy and check a booking against every active appointment on it
+    The exclusion constraint only rejects overlaps in the same lane (the same
+    resource, or both without one), while a booking without a resource blocks
+    every lane. Writes that book without choosing a resource check here, under
+    the day lock that resource bookings take too, so the two cannot overlap
+    Args:
+        appointment_date: date object
+        start: start in minutes since midnight
+        end: end in minutes since midnight
+        exclude_appointment_id: UUID to exclude from check (for updates)
+    Returns: (has_conflict: bool, message: str or None)
+    """
+    occupancy = lock_day_occupancy(appointment_date)
+    conflict = BusySchedule(occupancy.intervals).find_conflict(start, end, exclude_id=exclude_appointment_id)
+
+    if conflict:
+        return True, f"Time slot conflicts with existing appointment at {format_minutes(conflict[0])}"
 
     return False, None
 
 
+def choose_resource(pool, schedule, service_id, start, duration, requested_resource_id=None, preferred_resource_id=None):
+    """
+    Pick the resource for a booking when the salon has several
+    Args:
+        pool: ResourcePool
+        schedule: BusySchedule of the date
+        service_id: UUID of the service
+        start: start in minutes since midnight
+        duration: minutes needed
+        requested_resource_id: resource that must be used (optional)
+        preferred_resource_id: resource to keep if it is free (optional)
+    Returns: resource id string, or None when no qualifying resource is free
+    """
+    free = pool.free_resources(schedule, start, duration, service_id)
+
+    if requested_resource_id:
+        return str(requested_resource_id) if str(requested_resource_id) in free else None
+
+    if preferred_resource_id and str(preferred_resource_id) in free:
+        return str(preferred_resource_id)
+
+    return free[0] if free else None
+
+
+def describe_conflict(service_id, appointment_date, appointment_time, exclude_appointment_id=None):
+    """
+    Describe why a booking was rejected as overlapping
+    Used after the database refused an insert, to name the conflicting appointment
+    Returns: error message string
+    """
+    has_conflict, conflict_msg = check_appointment_conflict(
+        service_id, appointment_date, appointment_time, exclude_appointment_id
+    )
+    if has_conflict:
+        return conflict_msg
+
+    return "Time slot conflicts with an existing appointment"
+
+
+def is_exclusion_violation(error):
+    """
+    Check whether a database error is an exclusion constraint violation
+    (SQLSTATE 23P01, raised for overlapping bookings)
+    Args:
+        error: sqlalchemy.exc.IntegrityError
+    Returns: bool
+    """
+    orig = getattr(error, 'orig', None)
+    sqlstate = getattr(orig, 'sqlstate', None) or getattr(orig, 'pgcode', None)
+    return sqlstate == '23P01'
+
+
 def format_currency(amount):
     """Format decimal amount as currency string"""
     return f"${amount:.2f}"
@@ -306,3 +622,8 @@ def get_datetime_now():
 def get_date_today():
     """Get current date (useful for testing)"""
     return date.today()
+
+
+def get_time_now():
+    """Get current time of day, on the same clock as get_date_today (useful for testing)"""
+    return datetime.now().time()
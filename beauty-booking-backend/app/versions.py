@@ -0,0 +1,103 @@
+"""
+Change Versions
+Cheap per-scope counters behind the ETags of appointment lists and details
+"""
+import hashlib
+from datetime import datetime
+from flask import request, current_app
+from sqlalchemy.dialects.postgresql import insert
+from app.models import db, ChangeVersion
+
+# Bumped by every appointment write (admin views)
+APPOINTMENTS_SCOPE = 'appointments'
+
+# Bumped by service writes (appointments embed their service)
+SERVICES_SCOPE = 'services'
+
+# Bumped when every cached slot answer is stale (business hours, resources)
+SLOTS_SCOPE = 'slots'
+
+
+def client_scope(client_id):
+    """Scope bumped by writes to one client's appointments or profile"""
+    return f'client:{client_id}'
+
+
+def slot_date_scope(slot_date):
+    """Scope bumped when the cached slots of one date are stale"""
+    return f'slots:{slot_date.isoformat()}'
+
+
+def slot_service_scope(service_id):
+    """Scope bumped when the cached slots of one service are stale"""
+    return f'slots:service:{service_id}'
+
+
+def bump_versions(*scopes, connection=None):
+    """
+    Increment the version of each scope with a single upsert
+    Must run inside the same transaction as the write so a rolled back write
+    leaves the versions unchanged. Rows are written in a fixed order so
+    concurrent bumps cannot deadlock
+    Args:
+        connection: run on this connection instead of the session (optional)
+    Returns: dict of scope -> new version
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return {}
+
+    statement = insert(ChangeVersion).values([{'scope': scope, 'version': 1} for scope in scopes])
+    statement = statement.on_conflict_do_update(
+        index_elements=['scope'],
+        set_={'version': ChangeVersion.version + 1, 'updated_at': datetime.utcnow()}
+    ).returning(ChangeVersion.scope, ChangeVersion.version)
+    return dict((connection or db.session).execute(statement).all())
+
+
+def bump_appointment_versions(client_ids):
+    """
+    Record appointment writes for the given clients
+    Args:
+        client_ids: iterable of client ids whose appointments changed
+    """
+    bump_versions(APPOINTMENTS_SCOPE, *(client_scope(client_id) for client_id in client_ids))
+
+
+def load_versions(*scopes):
+    """
+    Read the current version of several scopes with one primary key lookup
+    Returns: tuple of versions in the order given (0 for scopes never bumped)
+    """
+    rows = dict(db.session.query(ChangeVersion.scope, ChangeVersion.version).filter(
+        ChangeVersion.scope.in_(scopes)
+    ).all())
+
+    return tuple(rows.get(scope, 0) for scope in scopes)
+
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the versions and request parameters a response depends on
+    Returns: unquoted ETag string
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+
+
+def not_modified(etag):
+    """
+    Answer a conditional GET whose If-None-Match still matches
+    Returns: empty 304 response, or None when the client copy is stale
+    """
+    if etag not in request.if_none_match:
+        return None
+
+    response = current_app.response_class(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag):
+    """Attach the ETag to a response and ask clients to revalidate before reuse"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,255 @@
+"""
+Waitlist
+Hands the time freed by a cancellation to the longest-waiting client it fits
+"""
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, exists
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Appointment, Service, SlotHold, WaitlistEntry
+from app.occupancy import lock_day_occupancy, sync_appointment_occupancy
+from app.rollups import apply_appointment_rollup
+from app.slot_engine import (
+    BusySchedule, load_business_windows, load_resource_pool, query_hold_intervals,
+    get_slot_step, time_to_minutes, minutes_to_time
+)
+from app.utils import choose_resource, is_exclusion_violation, get_date_today, get_datetime_now, get_time_now
+
+# Waiting entries examined per cancellation, oldest first
+MAX_WAITLIST_CANDIDATES = 50
+
+
+def find_freed_gap(schedule, windows, start, end, resource_id=None, not_before=None):
+    """
+    Widen a freed interval to the free gap around it
+    Only bookings in the same lane (the same resource, or any booking without
+    one) close the gap, and it never leaves the business window it is in.
+    Busy time overlapping the freed interval (a hold, a booking without a
+    resource) clips it: intervals starting at or before the freed start close
+    the gap on the left, the others on the right
+    Args:
+        schedule: BusySchedule of the date without the cancelled booking
+        windows: business windows of the date
+        start: freed start in minutes since midnight
+        end: freed end in minutes since midnight
+        resource_id: resource the cancelled booking was on (optional)
+        not_before: first minute that can still be offered, for today (optional)
+    Returns: (gap_start, gap_end) in minutes, or None when none of the freed time is bookable
+    """
+    window = next(((window_start, window_end) for window_start, window_end in windows
+                   if window_start <= start and end <= window_end), None)
+    if window is None:
+        return None
+
+    gap_start, gap_end = window
+    if not_before is not None:
+        gap_start = max(gap_start, not_before)
+
+    for interval in schedule.intervals:
+        lane = interval[3] if len(interval) > 3 else None
+        if resource_id and lane and lane != resource_id:
+            continue
+        if interval[0] <= start:
+            gap_start = max(gap_start, interval[1])
+        else:
+            gap_end = min(gap_end, interval[0])
+
+    if gap_start >= min(gap_end, end):
+        return None
+
+    return gap_start, gap_end
+
+
+def find_waitlist_candidates(window_date, gap_start, gap_end, exclude_client_id=None):
+    """
+    Get the oldest waiting entries whose service fits inside both their window and the gap
+    A range scan of the partial waiting index on (window_date, window_start);
+    entries are locked so a concurrent withdrawal cannot race the match
+    Args:
+        window_date: date of the gap
+        gap_start: gap start in minutes since midnight
+        gap_end: gap end in minutes since midnight
+        exclude_client_id: skip this client's entries (optional)
+    Returns: list of (WaitlistEntry, service duration) tuples
+    """
+    gap_start_time = minutes_to_time(gap_start)
+    gap_end_time = minutes_to_time(gap_end)
+    fit_start = func.greatest(WaitlistEntry.window_start, gap_start_time)
+    fit_end = func.least(WaitlistEntry.window_end, gap_end_time)
+
+    query = db.session.query(WaitlistEntry, Service.duration).join(
+        Service, WaitlistEntry.service_id == Service.id
+    ).filter(
+        WaitlistEntry.status == 'waiting',
+        WaitlistEntry.window_date == window_date,
+        WaitlistEntry.window_start < gap_end_time,
+        WaitlistEntry.window_end > gap_start_time,
+        fit_end - fit_start >= func.make_interval(0, 0, 0, 0, 0, Service.duration),
+        Service.active.is_(True)
+    )
+
+    if exclude_client_id:
+        query = query.filter(WaitlistEntry.client_id != exclude_client_id)
+
+    return query.order_by(
+        WaitlistEntry.created_at, WaitlistEntry.id
+    ).limit(MAX_WAITLIST_CANDIDATES).with_for_update(of=WaitlistEntry, skip_locked=True).all()
+
+
+def pick_waitlist_start(entry, duration, gap, schedule, pool, preferred_start, preferred_resource_id=None):
+    """
+    Find where an entry's service fits in the gap, closest to the freed start
+    Returns: (start minute, resource id or None), or None when it does not fit
+    """
+    first = max(time_to_minutes(entry.window_start), gap[0])
+    last = min(time_to_minutes(entry.window_end), gap[1]) - duration
+    starts = set(range(first, last + 1, get_slot_step()))
+    if first <= preferred_start <= last:
+        starts.add(preferred_start)
+
+    for start in sorted(starts, key=lambda start: (abs(start - preferred_start), start)):
+        if pool.enabled:
+            resource_id = choose_resource(
+                pool, schedule, entry.service_id, start, duration, preferred_resource_id=preferred_resource_id
+            )
+            if resource_id:
+                return start, resource_id
+        elif schedule.is_free(start, start + duration):
+            return start, None
+
+    return None
+
+
+def backfill_cancellation(appointment):
+    """
+    Offer or book the time freed by a cancelled appointment
+    Runs in the cancelling transaction, after its occupancy update, so the
+    match is committed (or rolled back) together with the cancellation.
+    Entries with auto_book get a pending appointment; the others get a slot
+    hold for WAITLIST_OFFER_TTL seconds, confirmed with POST /api/appointments
+    Args:
+        appointment: the cancelled Appointment
+    Returns: (WaitlistEntry, new Appointment or None), or None when no entry matched
+    """
+    window_date = appointment.appointment_date
+    if window_date < get_date_today():
+        return None
+
+    windows = load_business_windows(window_date)
+    start = time_to_minutes(appointment.appointment_time)
+    end = start + appointment.service.duration
+    resource_id = str(appointment.resource_id) if appointment.resource_id else None
+
+    occupancy = lock_day_occupancy(window_date)
+    hold_intervals, _ = query_hold_intervals(window_date, window_date).get(window_date, ([], None))
+    schedule = BusySchedule(list(occupancy.intervals) + hold_intervals)
+
+    # Time already past today cannot be offered
+    not_before = time_to_minutes(get_time_now()) if window_date == get_date_today() else None
+    gap = find_freed_gap(schedule, windows, start, end, resource_id, not_before=not_before)
+    if gap is None:
+        return None
+
+    candidates = find_waitlist_candidates(window_date, gap[0], gap[1], exclude_client_id=appointment.client_id)
+    if not candidates:
+        return None
+
+    pool = load_resource_pool()
+    for entry, duration in candidates:
+        slot = pick_waitlist_start(entry, duration, gap, schedule, pool, start, preferred_resource_id=resource_id)
+        if slot:
+            break
+    else:
+        return None
+
+    slot_start, slot_resource_id = slot
+    slot_time = minutes_to_time(slot_start)
+    slot_resource_id = uuid.UUID(slot_resource_id) if slot_resource_id else None
+
+    if entry.auto_book:
+        new_appointment = Appointment(
+            client_id=entry.client_id,
+            service_id=entry.service_id,
+            appointment_date=window_date,
+            appointment_time=slot_time,
+            resource_id=slot_resource_id,
+            status='pending',
+            notes=entry.notes
+        )
+        new_appointment.set_time_range(duration)
+
+        # A booking racing in without the occupancy lock loses only the backfill, not the cancellation
+        try:
+            with db.session.begin_nested():
+                db.session.add(new_appointment)
+        except IntegrityError as e:
+            if not is_exclusion_violation(e):
+                raise
+            return None
+
+        sync_appointment_occupancy(new_appointment)
+        apply_appointment_rollup(appointment=new_appointment)
+        entry.status = 'booked'
+        entry.appointment_id = new_appointment.id
+    else:
+        new_appointment = None
+        hold = SlotHold(
+            client_id=entry.client_id,
+            service_id=entry.service_id,
+            resource_id=slot_resource_id,
+            hold_date=window_date,
+            hold_time=slot_time,
+            expires_at=get_datetime_now() + timedelta(seconds=current_app.config['WAITLIST_OFFER_TTL'])
+        )
+        db.session.add(hold)
+        db.session.flush()
+        entry.status = 'offered'
+        entry.hold_id = hold.id
+
+    entry.matched_at = get_datetime_now()
+    return entry, new_appointment
+
+
+def complete_waitlist_offer(hold, appointment):
+    """
+    Mark the waitlist entry offered through a slot hold as booked
+    Args:
+        hold: SlotHold being converted into the appointment
+        appointment: the new Appointment
+    """
+    WaitlistEntry.query.filter_by(hold_id=hold.id, status='offered').update(
+        {'status': 'booked', 'appointment_id': appointment.id}, synchronize_session=False
+    )
+
+
+def is_offer_hold():
+    """SQL condition true for slot holds that carry a pending waitlist offer"""
+    return exists().where(WaitlistEntry.hold_id == SlotHold.id, WaitlistEntry.status == 'offered')
+
+
+def release_waitlist_offer(hold):
+    """
+    Put the entry offered through a released slot hold back on the waitlist
+    Args:
+        hold: SlotHold being deleted
+    """
+    WaitlistEntry.query.filter_by(hold_id=hold.id, status='offered').update(
+        {'status': 'waiting', 'hold_id': None}, synchronize_session=False
+    )
+
+
+def requeue_lapsed_offers():
+    """
+    Put entries whose offer hold expired or was released back on the waitlist
+    Returns: number of entries requeued
+    """
+    live_hold = exists().where(
+        SlotHold.id == WaitlistEntry.hold_id,
+        SlotHold.expires_at > datetime.utcnow()
+    )
+
+    return WaitlistEntry.query.filter(
+        WaitlistEntry.status == 'offered',
+        ~live_hold
+    ).update({'status': 'waiting', 'hold_id': None}, synchronize_session=False)
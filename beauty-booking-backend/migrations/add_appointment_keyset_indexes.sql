@@ -0,0 +1,13 @@
+-- Migration: Index appointment list ordering for keyset pagination
+-- Description: Backs the (appointment_date, appointment_time, id) page order of the
+--              admin and per-client appointment lists so deep pages cost the same as the first
+-- Date: 2026-10-17
+
+CREATE INDEX IF NOT EXISTS idx_appointment_date_time_id
+ON appointments (appointment_date, appointment_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_client_date_time_id
+ON appointments (client_id, appointment_date, appointment_time, id);
+
+-- Superseded by idx_appointment_date_time_id (same leading columns)
+DROP INDEX IF EXISTS idx_appointment_date_time;
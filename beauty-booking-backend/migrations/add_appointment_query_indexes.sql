@@ -0,0 +1,20 @@
+-- Migration: Index appointment status filters and active intervals
+-- Description: Adds a (status, date, time, id) index for status filters over date ranges
+--              in page order, and a partial covering index of pending/confirmed rows per
+--              date for the slot engine; drops the indexes they supersede.
+--              Found with benchmarks/query_plans.py
+-- Date: 2026-10-17
+
+CREATE INDEX IF NOT EXISTS idx_appointment_status_date_time_id
+ON appointments (status, appointment_date, appointment_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_active_date_time
+ON appointments (appointment_date, appointment_time)
+INCLUDE (service_id, resource_id)
+WHERE status IN ('pending', 'confirmed');
+
+-- Superseded by idx_appointment_status_date_time_id (same leading column)
+DROP INDEX IF EXISTS idx_appointment_status;
+
+-- Superseded by idx_appointment_date_time_id (same leading column)
+DROP INDEX IF EXISTS ix_appointments_appointment_date;
@@ -0,0 +1,6 @@
+-- Migration: Add recurring appointment series
+-- Description: Adds appointments.series_id, shared by the occurrences booked together
+--              through POST /api/appointments/series
+-- Date: 2026-10-17
+
+ALTER TABLE appointments ADD COLUMN IF NOT EXISTS series_id UUID;
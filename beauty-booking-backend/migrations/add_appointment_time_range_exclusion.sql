@@ -0,0 +1,33 @@
+-- Migration: Database-enforced non-overlapping bookings
+-- Description: Stores each appointment's booked [start, end) range and adds an exclusion
+--              constraint so pending/confirmed appointments can never overlap
+-- Date: 2026-10-17
+
+-- Add the booked range column
+ALTER TABLE appointments
+ADD COLUMN IF NOT EXISTS time_range TSRANGE;
+
+-- Backfill from appointment date/time and the service duration
+UPDATE appointments a
+SET time_range = tsrange(
+    a.appointment_date + a.appointment_time,
+    a.appointment_date + a.appointment_time + make_interval(mins => s.duration),
+    '[)'
+)
+FROM services s
+WHERE s.id = a.service_id AND a.time_range IS NULL;
+
+ALTER TABLE appointments
+ALTER COLUMN time_range SET NOT NULL;
+
+-- Reject overlapping active bookings. If this fails, existing data already
+-- contains double bookings; find them with:
+--   SELECT a.id, b.id FROM appointments a JOIN appointments b
+--     ON a.id < b.id AND a.time_range && b.time_range
+--   WHERE a.status IN ('pending', 'confirmed') AND b.status IN ('pending', 'confirmed');
+ALTER TABLE appointments
+ADD CONSTRAINT no_overlapping_appointments
+EXCLUDE USING gist (time_range WITH &&)
+WHERE (status IN ('pending', 'confirmed'));
+
+COMMENT ON COLUMN appointments.time_range IS 'Booked [start, end) timestamps derived from date, time and service duration';
@@ -0,0 +1,36 @@
+-- Migration: Add the archive of closed appointments
+-- Description: Adds appointments_archive, where flask archive-appointments moves completed
+--              and cancelled appointments older than ARCHIVE_AFTER_DAYS in batches. Slot,
+--              conflict and occupancy reads only touch the hot appointments table; history
+--              reads (lists, detail, export, rollup rebuilds) read both through a UNION ALL
+-- Date: 2026-10-17
+
+-- Same foreign keys as appointments: a user or resource with archived history
+-- cannot be deleted, exactly as with live appointments
+CREATE TABLE IF NOT EXISTS appointments_archive (
+    id UUID PRIMARY KEY,
+    client_id UUID NOT NULL REFERENCES users(id),
+    service_id UUID NOT NULL REFERENCES services(id),
+    resource_id UUID REFERENCES resources(id),
+    series_id UUID,
+    appointment_date DATE NOT NULL,
+    appointment_time TIME NOT NULL,
+    status appointment_status NOT NULL,
+    notes TEXT,
+    time_range TSRANGE NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    archived_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- Same page-order indexes as the hot table, so history pages merge two index scans
+CREATE INDEX IF NOT EXISTS idx_appointment_archive_date_time_id
+ON appointments_archive (appointment_date, appointment_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_archive_client_date_time_id
+ON appointments_archive (client_id, appointment_date, appointment_time, id);
+
+CREATE INDEX IF NOT EXISTS idx_appointment_archive_status_date_time_id
+ON appointments_archive (status, appointment_date, appointment_time, id);
+
+-- Move closed history out of the hot table (schedule periodically, e.g. nightly):
+--   flask archive-appointments
@@ -0,0 +1,10 @@
+-- Migration: Add change versions
+-- Description: Adds change_versions, per-scope counters bumped by appointment, service and
+--              profile writes; appointment list/detail ETags are built from them
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS change_versions (
+    scope VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
@@ -0,0 +1,36 @@
+-- Migration: Add daily appointment rollups
+-- Description: Adds daily_service_stats with counts per status, revenue and booked minutes
+--              per service per day, kept up to date by appointment writes
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS daily_service_stats (
+    stats_date DATE NOT NULL,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE CASCADE,
+    pending INTEGER NOT NULL DEFAULT 0,
+    confirmed INTEGER NOT NULL DEFAULT 0,
+    cancelled INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    booked_minutes INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    PRIMARY KEY (stats_date, service_id)
+);
+
+-- Backfill from existing appointments (same as: flask rebuild-rollups)
+INSERT INTO daily_service_stats (stats_date, service_id, pending, confirmed, cancelled, completed, revenue, booked_minutes)
+SELECT
+    a.appointment_date,
+    a.service_id,
+    count(*) FILTER (WHERE a.status = 'pending'),
+    count(*) FILTER (WHERE a.status = 'confirmed'),
+    count(*) FILTER (WHERE a.status = 'cancelled'),
+    count(*) FILTER (WHERE a.status = 'completed'),
+    coalesce(sum(s.price) FILTER (WHERE a.status = 'completed'), 0),
+    coalesce(sum(s.duration) FILTER (WHERE a.status <> 'cancelled'), 0)
+FROM appointments a
+JOIN services s ON s.id = a.service_id
+GROUP BY a.appointment_date, a.service_id
+ON CONFLICT (stats_date, service_id) DO NOTHING;
+
+-- Check rollups against appointments at any time with:
+--   flask rebuild-rollups --verify
@@ -0,0 +1,18 @@
+-- Migration: Add materialized per-day occupancy
+-- Description: Adds the day_occupancy table holding the busy intervals of each date,
+--              maintained by appointment writes in the same transaction
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS day_occupancy (
+    occupancy_date DATE PRIMARY KEY,
+    intervals JSONB NOT NULL DEFAULT '[]'::jsonb,
+    updated_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+COMMENT ON TABLE day_occupancy IS 'Busy intervals per date, derived from pending/confirmed appointments';
+COMMENT ON COLUMN day_occupancy.intervals IS 'Sorted [start_minute, end_minute, appointment_id, resource_id] entries (resource_id null without a resource)';
+
+-- Populate from existing appointments after applying:
+--   flask rebuild-occupancy
+-- Check for drift at any time with:
+--   flask rebuild-occupancy --verify
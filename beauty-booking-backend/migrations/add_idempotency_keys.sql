@@ -0,0 +1,25 @@
+-- Migration: Add idempotency keys
+-- Description: Adds idempotency_keys, holding the first response to a create request sent
+--              with an Idempotency-Key header so retries replay it instead of running again
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope VARCHAR(128) NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    request_hash VARCHAR(64) NOT NULL,
+    status_code INTEGER,
+    response_body TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+
+-- status_code and response_body stay NULL while the first request holding the key runs
+ALTER TABLE idempotency_keys ALTER COLUMN status_code DROP NOT NULL;
+ALTER TABLE idempotency_keys ALTER COLUMN response_body DROP NOT NULL;
+
+-- The reaper deletes by expiry
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+
+-- Expired keys are ignored by requests and removed in bulk with:
+--   flask reap-idempotency-keys
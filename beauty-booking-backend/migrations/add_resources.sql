@@ -0,0 +1,48 @@
+-- Migration: Add resources (staff and chairs) that perform services in parallel
+-- Description: Adds resources and resource_services, assigns appointments and slot holds
+--              to a resource, and scopes the overlap constraint to each resource
+-- Date: 2026-10-17
+
+-- Equality on uuid inside a GiST exclusion constraint needs btree_gist
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE TABLE IF NOT EXISTS resources (
+    id UUID PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- A resource without rows here performs every service
+CREATE TABLE IF NOT EXISTS resource_services (
+    resource_id UUID NOT NULL REFERENCES resources(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE CASCADE,
+    PRIMARY KEY (resource_id, service_id)
+);
+
+ALTER TABLE appointments
+ADD COLUMN IF NOT EXISTS resource_id UUID REFERENCES resources(id);
+
+ALTER TABLE slot_holds
+ADD COLUMN IF NOT EXISTS resource_id UUID REFERENCES resources(id) ON DELETE CASCADE;
+
+-- Overlaps are only rejected on the same resource; appointments without a
+-- resource share one all-zero id, which keeps single-resource salons unchanged.
+-- An appointment without a resource against one on a resource is not covered
+-- here: booking writes check that under the day_occupancy row lock
+ALTER TABLE appointments
+DROP CONSTRAINT IF EXISTS no_overlapping_appointments;
+
+ALTER TABLE appointments
+ADD CONSTRAINT no_overlapping_appointments
+EXCLUDE USING gist (
+    (coalesce(resource_id, '00000000-0000-0000-0000-000000000000'::uuid)) WITH =,
+    time_range WITH &&
+)
+WHERE (status IN ('pending', 'confirmed'));
+
+COMMENT ON COLUMN appointments.resource_id IS 'Resource performing the appointment (NULL when the salon has no resources)';
+
+-- Day occupancy intervals now carry the resource id; refresh them with:
+--   flask rebuild-occupancy
+COMMENT ON COLUMN day_occupancy.intervals IS 'Sorted [start_minute, end_minute, appointment_id, resource_id] entries (resource_id null without a resource)';
@@ -0,0 +1,22 @@
+-- Migration: Add short-lived slot holds
+-- Description: Adds the slot_holds table used to reserve a time slot while a client
+--              completes checkout
+-- Date: 2026-10-17
+
+CREATE TABLE IF NOT EXISTS slot_holds (
+    id UUID PRIMARY KEY,
+    client_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id),
+    hold_date DATE NOT NULL,
+    hold_time TIME NOT NULL,
+    expires_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- Slot reads look up unexpired holds per date; the reaper deletes by expiry
+CREATE INDEX IF NOT EXISTS idx_slot_hold_date_expires ON slot_holds (hold_date, expires_at);
+CREATE INDEX IF NOT EXISTS ix_slot_holds_expires_at ON slot_holds (expires_at);
+CREATE INDEX IF NOT EXISTS ix_slot_holds_client_id ON slot_holds (client_id);
+
+-- Expired holds are ignored by reads and removed in bulk with:
+--   flask reap-holds
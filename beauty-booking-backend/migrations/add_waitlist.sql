@@ -0,0 +1,39 @@
+-- Migration: Add the appointment waitlist
+-- Description: Adds waitlist_entries, matched against the time freed by each
+--              cancellation and then offered (as a slot hold) or booked
+-- Date: 2026-10-17
+
+DO $$
+BEGIN
+    CREATE TYPE waitlist_status AS ENUM ('waiting', 'offered', 'booked');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS waitlist_entries (
+    id UUID PRIMARY KEY,
+    client_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    service_id UUID NOT NULL REFERENCES services(id) ON DELETE CASCADE,
+    window_date DATE NOT NULL,
+    window_start TIME NOT NULL,
+    window_end TIME NOT NULL,
+    auto_book BOOLEAN NOT NULL DEFAULT FALSE,
+    status waitlist_status NOT NULL DEFAULT 'waiting',
+    notes TEXT,
+    hold_id UUID,
+    appointment_id UUID REFERENCES appointments(id) ON DELETE SET NULL,
+    matched_at TIMESTAMP,
+    created_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- Cancellations range-scan the waiting entries of one date by window start;
+-- the included columns answer the overlap and ordering checks from the index
+CREATE INDEX IF NOT EXISTS idx_waitlist_waiting_date_window
+    ON waitlist_entries (window_date, window_start)
+    INCLUDE (window_end, service_id, created_at)
+    WHERE status = 'waiting';
+CREATE INDEX IF NOT EXISTS ix_waitlist_entries_client_id ON waitlist_entries (client_id);
+CREATE INDEX IF NOT EXISTS ix_waitlist_entries_hold_id ON waitlist_entries (hold_id);
+
+-- Offers whose hold lapsed go back to waiting with:
+--   flask reap-holds
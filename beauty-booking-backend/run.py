@@ -2,6 +2,7 @@
 Application Entry Point
 Run this file to start the Flask development server
 """
+import click
 from app import create_app
 from app.models import db
 
@@ -9,10 +10,26 @@ from app.models import db
 app = create_app()
 
 
+def parse_date_option(ctx, param, value):
+    """Click callback parsing a YYYY-MM-DD option, so a typo fails instead of dropping the bound"""
+    from app.utils import parse_date
+
+    if value is None:
+        return None
+
+    parsed = parse_date(value)
+    if parsed is None:
+        raise click.BadParameter(f"'{value}' is not a date (use YYYY-MM-DD)")
+    return parsed
+
+
 @app.cli.command()
 def init_db():
     """Initialize the database (create all tables)"""
     with app.app_context():
+        # The per-resource overlap constraint compares uuids in a GiST index
+        db.session.execute(db.text('CREATE EXTENSION IF NOT EXISTS btree_gist'))
+        db.session.commit()
         db.create_all()
         print("Database tables created successfully!")
 
@@ -139,5 +156,156 @@ def seed_db():
         print("2. Log in as client: client@example.com / client123")
 
 
+@app.cli.command()
+@click.option('--verify', is_flag=True, help='Only report drifted dates, do not rewrite them')
+@click.option('--from', 'start_date', default=None, callback=parse_date_option,
+              help='First date to check (YYYY-MM-DD)')
+@click.option('--to', 'end_date', default=None, callback=parse_date_option,
+              help='Last date to check (YYYY-MM-DD)')
+def rebuild_occupancy(verify, start_date, end_date):
+    """Rebuild (or verify) the day_occupancy table from appointments"""
+    from app.occupancy import find_occupancy_drift, rebuild_occupancy as rebuild
+
+    with app.app_context():
+        if verify:
+            drift = find_occupancy_drift(start_date, end_date)
+            for occupancy_date in sorted(drift):
+                stored, expected = drift[occupancy_date]
+                stored_count = 'missing' if stored is None else len(stored)
+                print(f"{occupancy_date}: stored={stored_count} expected={len(expected)}")
+
+            if drift:
+                print(f"\nOccupancy drift found on {len(drift)} date(s). Run without --verify to repair.")
+                raise SystemExit(1)
+
+            print("Occupancy matches appointments")
+            return
+
+        rebuilt = rebuild(start_date, end_date)
+        print(f"Rebuilt occupancy for {rebuilt} date(s)")
+
+
+@app.cli.command()
+@click.option('--verify', is_flag=True, help='Only report drifted rollup rows, do not rewrite them')
+@click.option('--from', 'start_date', default=None, callback=parse_date_option,
+              help='First date to check (YYYY-MM-DD)')
+@click.option('--to', 'end_date', default=None, callback=parse_date_option,
+              help='Last date to check (YYYY-MM-DD)')
+def rebuild_rollups(verify, start_date, end_date):
+    """Backfill/rebuild (or verify) the daily_service_stats rollups from appointments"""
+    from app.rollups import find_rollup_drift, rebuild_rollups as rebuild
+
+    with app.app_context():
+        if verify:
+            drift = find_rollup_drift(start_date, end_date)
+            for (stats_date, service_id) in sorted(drift, key=lambda key: (key[0], str(key[1]))):
+                stored, expected = drift[(stats_date, service_id)]
+                print(f"{stats_date} {service_id}: stored={stored} expected={expected}")
+
+            if drift:
+                print(f"\nRollup drift found in {len(drift)} row(s). Run without --verify to repair.")
+                raise SystemExit(1)
+
+            print("Rollups match appointments")
+            return
+
+        written = rebuild(start_date, end_date)
+        print(f"Rebuilt {written} rollup row(s)")
+
+
+@app.cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'json']), default=None,
+              help='File format (default: from the file extension)')
+@click.option('--dry-run', is_flag=True, help='Validate only, import nothing')
+@click.option('--report', 'report_path', default=None, help='Write the rejection report to this JSON file')
+def import_appointments(path, file_format, dry_run, report_path):
+    """Bulk import appointments from a CSV or JSON file"""
+    import json
+    from app.importer import ImportFormatError, parse_import_file, import_appointments as run_import
+    from app.slot_cache import slot_cache
+
+    file_format = file_format or ('json' if path.lower().endswith('.json') else 'csv')
+    with open(path, encoding='utf-8-sig') as import_file:
+        content = import_file.read()
+
+    with app.app_context():
+        try:
+            rows = parse_import_file(content, file_format)
+        except ImportFormatError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+
+        report = run_import(rows, dry_run=dry_run)
+        slot_cache.clear()
+
+    for rejection in report['rejected']:
+        print(f"Row {rejection['row']}: {rejection['error']}")
+
+    if report_path:
+        with open(report_path, 'w') as report_file:
+            json.dump(report, report_file, indent=2, default=str)
+            report_file.write('\n')
+
+    action = 'Validated' if dry_run else 'Imported'
+    print(f"\n{action} {report['valid']} of {report['total_rows']} row(s), rejected {len(report['rejected'])}")
+
+
+@app.cli.command()
+@click.option('--before', 'before_date', default=None,
+              help='Archive appointments dated before this date (YYYY-MM-DD, default: ARCHIVE_AFTER_DAYS ago)')
+@click.option('--batch-size', default=None, type=int, help='Rows moved per transaction (default: ARCHIVE_BATCH_SIZE)')
+def archive_appointments(before_date, batch_size):
+    """Move completed and cancelled appointments older than the cutoff into appointments_archive"""
+    from datetime import timedelta
+    from app.archive import archive_appointments as run_archive
+    from app.utils import parse_date, get_date_today
+
+    with app.app_context():
+        if before_date:
+            cutoff = parse_date(before_date)
+            if not cutoff:
+                print("Error: Invalid date format. Use YYYY-MM-DD")
+                raise SystemExit(1)
+        else:
+            cutoff = get_date_today() - timedelta(days=app.config['ARCHIVE_AFTER_DAYS'])
+
+        moved = run_archive(
+            cutoff, batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+            on_batch=lambda total: print(f"  ...{total} moved")
+        )
+        print(f"Archived {moved} appointment(s) dated before {cutoff.isoformat()}")
+
+
+@app.cli.command()
+def reap_holds():
+    """Delete expired slot holds in bulk and requeue lapsed waitlist offers (schedule this, e.g. every few minutes)"""
+    from datetime import datetime
+    from app.models import SlotHold
+    from app.waitlist import requeue_lapsed_offers
+
+    with app.app_context():
+        requeued = requeue_lapsed_offers()
+        deleted = SlotHold.query.filter(
+            SlotHold.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        print(f"Removed {deleted} expired slot hold(s), requeued {requeued} waitlist offer(s)")
+
+
+@app.cli.command()
+def reap_idempotency_keys():
+    """Delete stored idempotency key responses past their TTL (schedule this, e.g. hourly)"""
+    from datetime import datetime
+    from app.models import IdempotencyKey
+
+    with app.app_context():
+        deleted = IdempotencyKey.query.filter(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        print(f"Removed {deleted} expired idempotency key(s)")
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -152,6 +152,7 @@ export const translations = {
     appointments: {
       title: 'Mis Citas',
       noAppointments: 'No se encontraron citas',
+      loadMore: 'Cargar más',
       cancelAppointment: 'Cancelar Cita',
       confirmCancel: '¿Estás seguro de que quieres cancelar esta cita? Esta acción no se puede deshacer.',
       keepAppointment: 'Mantener Cita',
@@ -334,6 +335,7 @@ export const translations = {
     appointments: {
       title: 'My Appointments',
       noAppointments: 'No appointments found',
+      loadMore: 'Load more',
       cancelAppointment: 'Cancel Appointment',
       confirmCancel: 'Are you sure you want to cancel this appointment? This action cannot be undone.',
       keepAppointment: 'Keep Appointment',
@@ -2,24 +2,110 @@
  * Admin Appointments Page
  * Manage all appointments
  */
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { appointmentsAPI } from '../../services/api';
 import Card from '../../components/common/Card';
+import Button from '../../components/common/Button';
 import Loading from '../../components/common/Loading';
 import { format } from 'date-fns';
 
+// Order of GET /api/appointments/admin: latest date and time first
+const compareAppointments = (a, b) =>
+  b.appointment_date.localeCompare(a.appointment_date) ||
+  b.appointment_time.localeCompare(a.appointment_time) ||
+  b.id.localeCompare(a.id);
+
+// Milliseconds before reopening a stream the browser gave up on (matches the server's retry)
+const RESUBSCRIBE_DELAY = 3000;
+
 const AdminAppointments = () => {
   const [appointments, setAppointments] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Whether more pages exist, read by the event handlers registered once on mount
+  const hasMoreRef = useRef(false);
 
   useEffect(() => {
     fetchAppointments();
+
+    // Apply changes pushed by the server instead of re-downloading the list
+    let events = null;
+    let closed = false;
+    let retryTimer = null;
+
+    const add = (event) => {
+      const created = JSON.parse(event.data);
+      setAppointments((current) => {
+        const rest = current.filter((item) => item.id !== created.id);
+        // A row sorting after the last loaded one belongs to a later page and arrives with "Load more"
+        if (hasMoreRef.current && rest.length && compareAppointments(created, rest[rest.length - 1]) > 0) {
+          return rest;
+        }
+        return [...rest, created].sort(compareAppointments);
+      });
+    };
+    const replace = (event) => {
+      const changed = JSON.parse(event.data);
+      setAppointments((current) =>
+        current.map((item) => (item.id === changed.id ? changed : item)).sort(compareAppointments)
+      );
+    };
+    const remove = (event) => {
+      const { id } = JSON.parse(event.data);
+      setAppointments((current) => current.filter((item) => item.id !== id));
+    };
+    const setStatus = (event) => {
+      const { ids, status } = JSON.parse(event.data);
+      setAppointments((current) => current.map((item) => (ids.includes(item.id) ? { ...item, status } : item)));
+    };
+    const refetch = () => fetchAppointments();
+
+    const subscribe = async () => {
+      try {
+        events = await appointmentsAPI.subscribeToEvents();
+      } catch (err) {
+        console.error('Failed to open the event stream:', err);
+        return;
+      }
+      if (closed) {
+        events.close();
+        return;
+      }
+
+      events.addEventListener('appointment.created', add);
+      events.addEventListener('appointment.updated', replace);
+      events.addEventListener('appointment.cancelled', replace);
+      events.addEventListener('appointment.deleted', remove);
+      events.addEventListener('appointments.bulk_updated', setStatus);
+      events.addEventListener('appointments.imported', refetch);
+      events.addEventListener('resync', refetch);
+
+      // The browser reconnects on its own, but not once the stream token has expired
+      events.onerror = () => {
+        if (events.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = setTimeout(() => {
+            refetch();
+            subscribe();
+          }, RESUBSCRIBE_DELAY);
+        }
+      };
+    };
+    subscribe();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      events?.close();
+    };
   }, []);
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (cursor = null) => {
     try {
-      const response = await appointmentsAPI.getAllAppointments();
-      setAppointments(response.data.appointments);
+      const response = await appointmentsAPI.getAllAppointments(cursor ? { cursor } : {});
+      setAppointments((current) => cursor ? [...current, ...response.data.appointments] : response.data.appointments);
+      setNextCursor(response.data.next_cursor);
+      hasMoreRef.current = Boolean(response.data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch appointments:', err);
     } finally {
@@ -27,6 +113,12 @@ const AdminAppointments = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchAppointments(nextCursor);
+    setLoadingMore(false);
+  };
+
   if (loading) {
     return <Loading fullScreen text="Loading appointments..." />;
   }
@@ -86,6 +178,14 @@ const AdminAppointments = () => {
             </table>
           </div>
         </Card>
+
+        {nextCursor && (
+          <div className="mt-6 text-center">
+            <Button variant="outline" onClick={handleLoadMore} loading={loadingMore}>
+              Load more
+            </Button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -2,7 +2,7 @@
  * Book Appointment Page
  * Service selection and appointment booking
  */
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useMemo } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import { servicesAPI, appointmentsAPI } from '../../services/api';
 import { useLanguage } from '../../contexts/LanguageContext';
@@ -24,6 +24,9 @@ const BookAppointment = () => {
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState('');
 
+  // Resubmitting the same slot (e.g. after a dropped connection) reuses the key, so it cannot book twice
+  const bookingKey = useMemo(() => crypto.randomUUID(), [selectedService, selectedDate, selectedTime]);
+
   useEffect(() => {
     fetchServices();
   }, [language]); // Re-fetch when language changes
@@ -65,7 +68,7 @@ const BookAppointment = () => {
         service_id: selectedService,
         appointment_date: selectedDate,
         appointment_time: selectedTime,
-      });
+      }, bookingKey);
 
       navigate('/dashboard');
     } catch (err) {
@@ -16,16 +16,19 @@ const MyAppointments = () => {
   const { t, language } = useLanguage();
   const [appointments, setAppointments] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [cancelModal, setCancelModal] = useState({ open: false, appointmentId: null });
 
   useEffect(() => {
     fetchAppointments();
   }, [language]); // Re-fetch when language changes
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (cursor = null) => {
     try {
-      const response = await appointmentsAPI.getMyAppointments({}, language);
-      setAppointments(response.data.appointments);
+      const response = await appointmentsAPI.getMyAppointments(cursor ? { cursor } : {}, language);
+      setAppointments((current) => cursor ? [...current, ...response.data.appointments] : response.data.appointments);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch appointments:', err);
     } finally {
@@ -33,6 +36,12 @@ const MyAppointments = () => {
     }
   };
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    await fetchAppointments(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleCancel = async () => {
     try {
       await appointmentsAPI.update(cancelModal.appointmentId, { status: 'cancelled' });
@@ -107,6 +116,14 @@ const MyAppointments = () => {
                 </div>
               </Card>
             ))}
+
+            {nextCursor && (
+              <div className="text-center">
+                <Button variant="outline" onClick={handleLoadMore} loading={loadingMore}>
+                  {t('appointments.loadMore')}
+                </Button>
+              </div>
+            )}
           </div>
         )}
 
@@ -40,12 +40,15 @@ api.interceptors.response.use(
   }
 );
 
+// Retrying a create with the same key replays the first response instead of creating twice
+const idempotent = (key) => (key ? { headers: { 'Idempotency-Key': key } } : undefined);
+
 // ======================
 // AUTH API
 // ======================
 
 export const authAPI = {
-  register: (data) => api.post('/auth/register', data),
+  register: (data, idempotencyKey) => api.post('/auth/register', data, idempotent(idempotencyKey)),
   login: (data) => api.post('/auth/login', data),
   getProfile: () => api.get('/auth/profile'),
   updateProfile: (data) => api.put('/auth/profile', data),
@@ -72,14 +75,44 @@ export const appointmentsAPI = {
   getMyAppointments: (params = {}, lang = 'en') => api.get('/appointments', { params: { ...params, lang } }),
   getAllAppointments: (params = {}, lang = 'en') => api.get('/appointments/admin', { params: { ...params, lang } }),
   getById: (id, lang = 'en') => api.get(`/appointments/${id}`, { params: { lang } }),
+  exportAppointments: (params = {}, format = 'csv') =>
+    api.get('/appointments/export', { params: { ...params, format }, responseType: 'blob' }),
   getAvailableSlots: (serviceId, date) =>
     api.get('/appointments/available-slots', {
       params: { service_id: serviceId, date }
     }),
-  create: (data) => api.post('/appointments', data),
+  getAvailableSlotsBatch: (date, serviceIds = null) =>
+    api.get('/appointments/available-slots/batch', {
+      params: { date, service_ids: serviceIds ? serviceIds.join(',') : undefined }
+    }),
+  getNextAvailable: (serviceId, after = undefined, limit = 1) =>
+    api.get('/appointments/next-available', {
+      params: { service_id: serviceId, after, limit }
+    }),
+  getAvailabilityCalendar: (serviceId, from, to, includeSlots = true) =>
+    api.get('/appointments/availability-calendar', {
+      params: { service_id: serviceId, from, to, include_slots: includeSlots }
+    }),
+  create: (data, idempotencyKey) => api.post('/appointments', data, idempotent(idempotencyKey)),
+  createSeries: (data, idempotencyKey) => api.post('/appointments/series', data, idempotent(idempotencyKey)),
+  holdSlot: (data) => api.post('/appointments/holds', data),
+  releaseHold: (holdId) => api.delete(`/appointments/holds/${holdId}`),
   update: (id, data) => api.put(`/appointments/${id}`, data),
+  bulkUpdateStatus: (data) => api.post('/appointments/bulk-status', data),
+  importAppointments: (file, params = {}) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    return api.post('/appointments/import', formData, { params });
+  },
   delete: (id) => api.delete(`/appointments/${id}`),
-  getStats: () => api.get('/appointments/stats'),
+  getStats: (params = {}) => api.get('/appointments/stats', { params }),
+  getReport: (params = {}) => api.get('/appointments/report', { params }),
+  // Server-sent change feed (admin); EventSource cannot send headers, so a short-lived
+  // stream token goes in the URL instead of the access token
+  subscribeToEvents: async () => {
+    const response = await api.post('/appointments/events/token');
+    return new EventSource(`${api.defaults.baseURL}/appointments/events?token=${encodeURIComponent(response.data.token)}`);
+  },
 };
 
 // ======================
@@ -106,6 +139,29 @@ export const blockedDatesAPI = {
   delete: (id) => api.delete(`/blocked-dates/${id}`),
 };
 
+// ======================
+// RESOURCES API
+// ======================
+
+export const resourcesAPI = {
+  getAll: (serviceId = null, activeOnly = true) =>
+    api.get('/resources', { params: { active: activeOnly, ...(serviceId && { service_id: serviceId }) } }),
+  getById: (id) => api.get(`/resources/${id}`),
+  create: (data) => api.post('/resources', data),
+  update: (id, data) => api.put(`/resources/${id}`, data),
+  delete: (id) => api.delete(`/resources/${id}`),
+};
+
+// ======================
+// WAITLIST API
+// ======================
+
+export const waitlistAPI = {
+  getAll: (params = {}) => api.get('/waitlist', { params }),
+  join: (data, idempotencyKey) => api.post('/waitlist', data, idempotent(idempotencyKey)),
+  leave: (id) => api.delete(`/waitlist/${id}`),
+};
+
 // ======================
 // AI API
 // ======================